@@ -0,0 +1,59 @@
+# GPLv3 License
+#
+# Copyright (C) 2021 Ubisoft
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Tests of the images sequences search, to be run with the Python of Blender, the add-on being installed:
+    blender -b --python-expr "import pytest; pytest.main(['tests'])"
+"""
+
+import pytest
+
+pytest.importorskip("bpy")
+
+from videotracks.utils import utils_media
+
+
+@pytest.fixture(autouse=True)
+def clearCache():
+    utils_media.clearDirectorySequencesCache()
+    yield
+    utils_media.clearDirectorySequencesCache()
+
+
+def _touch(folder, names):
+    for name in names:
+        folder.joinpath(name).write_bytes(b"")
+
+
+def test_frame_number_before_a_suffix_with_digits(tmp_path):
+    _touch(tmp_path, ["img_0001_v2.png", "img_0002_v2.png", "img_0004_v2.png"])
+    seq = utils_media.findImagesSequence(str(tmp_path.joinpath("img_####_v2.png")))
+    assert [1, 2, 4] == list(seq["frames"]) and [3] == seq["missing_frames"]
+    assert seq is utils_media.findImagesSequence(str(tmp_path.joinpath("img_%04d_v2.png")))
+
+
+def test_prefix_ending_with_a_digit(tmp_path):
+    _touch(tmp_path, ["img10001.png", "img10002.png", "img20001.png"])
+    seq = utils_media.findImagesSequence(str(tmp_path.joinpath("img1####.png")))
+    assert {1: "img10001.png", 2: "img10002.png"} == seq["frames"]
+
+
+def test_padding_must_match(tmp_path):
+    _touch(tmp_path, ["a_001.jpg", "a_0001.jpg"])
+    seq = utils_media.findImagesSequence(str(tmp_path.joinpath("a_###.jpg")))
+    assert {1: "a_001.jpg"} == seq["frames"]
+    assert utils_media.findImagesSequence(str(tmp_path.joinpath("b_###.jpg"))) is None
@@ -0,0 +1,93 @@
+# GPLv3 License
+#
+# Copyright (C) 2021 Ubisoft
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Tests of the conformation of a VSE channel, to be run with the Python of Blender, the add-on being installed:
+    blender -b --python-expr "import pytest; pytest.main(['tests'])"
+"""
+
+import wave
+
+import pytest
+
+bpy = pytest.importorskip("bpy")
+
+from videotracks.otio import montage_diff as md
+from videotracks.utils import utils_vse
+
+_channelIndex = 2
+
+
+def _writeSilentWavFile(filePath, duration):
+    """ Write a mono 8 kHz WAV file of the specified duration in seconds
+    """
+    with wave.open(str(filePath), "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(8000)
+        w.writeframes(bytes(2 * 8000 * duration))
+    return str(filePath)
+
+
+@pytest.fixture
+def scene():
+    scene = bpy.data.scenes.new("montage_conform_test")
+    scene.render.fps = 25
+    scene.render.fps_base = 1.0
+    scene.sequence_editor_create()
+    yield scene
+    bpy.data.scenes.remove(scene)
+
+
+def _createStrip(scene, mediaPath, name, start, end, offsetStart):
+    return bpy.context.window_manager.UAS_vse_render.createNewClip(
+        scene,
+        mediaPath,
+        _channelIndex,
+        start - offsetStart,
+        offsetStart=offsetStart,
+        final_duration=end - start,
+        clipName=name,
+        importVideo=False,
+        importAudio=True,
+    )
+
+
+def test_conforming_twice_gives_an_empty_diff(scene, tmp_path):
+    media = {name: _writeSilentWavFile(tmp_path.joinpath(f"{name}.wav"), 10) for name in ("a", "b", "c", "d")}
+    refEntries = [
+        md.newMontageEntry("sh030", media["c"], 0, 20, offsetStart=3, trackType="AUDIO"),
+        md.newMontageEntry("sh010", media["a"], 20, 40, offsetStart=5, trackType="AUDIO"),
+        md.newMontageEntry("sh020", media["b"], 40, 60, offsetStart=0, trackType="AUDIO"),
+    ]
+
+    # sh010 and sh020 both move later, sh010 ends on the current range of sh020
+    _createStrip(scene, media["a"], "sh010", 0, 20, 5)
+    _createStrip(scene, media["b"], "sh020", 20, 40, 0)
+    _createStrip(scene, media["d"], "sh040", 60, 70, 0)
+    utils_vse.invalidateChannelsIndex(scene)
+
+    firstDiff = md.computeMontageDiff(refEntries, md.getVSEChannelEntries(scene, _channelIndex))
+    assert 1 == len(firstDiff["inserted"]) and 1 == len(firstDiff["deleted"]) and 2 == len(firstDiff["retimed"])
+
+    md.applyMontageDiffToVSEChannel(scene, _channelIndex, firstDiff)
+
+    channelStrips = md.getVSEChannelEntries(scene, _channelIndex)
+    assert 3 == len(channelStrips) == len(scene.sequence_editor.sequences)
+    secondDiff = md.computeMontageDiff(refEntries, channelStrips)
+    assert not (len(secondDiff["inserted"]) or len(secondDiff["deleted"]) or len(secondDiff["retimed"]))
+    assert 3 == secondDiff["unchanged"]
@@ -0,0 +1,80 @@
+# GPLv3 License
+#
+# Copyright (C) 2021 Ubisoft
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Tests of the montage diff engine, run without Blender:
+    python -m pytest tests
+The module is loaded from its file since the videotracks package requires Blender
+"""
+
+import importlib.util
+from pathlib import Path
+
+_modulePath = Path(__file__).parents[1].joinpath("videotracks", "otio", "montage_diff_core.py")
+_spec = importlib.util.spec_from_file_location("montage_diff_core", _modulePath)
+md = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(md)
+
+
+def _otioTrackEntries():
+    return [
+        md.newMontageEntry("sh010", "/media/sh010.mp4", 0, 20, offsetStart=5, trackType="VIDEO"),
+        md.newMontageEntry("sh020", "/media/sh020.mp4", 20, 50, offsetStart=0, trackType="VIDEO"),
+        md.newMontageEntry("sh030", "/media/sh030.mp4", 50, 60, offsetStart=12, trackType="VIDEO"),
+    ]
+
+
+def _isEmptyDiff(diff):
+    return not (len(diff["inserted"]) or len(diff["deleted"]) or len(diff["retimed"]) or len(diff["reordered"]))
+
+
+def test_strip_names_match_clip_names():
+    channelEntries = [
+        md.newMontageEntry("sh010 (video)", "/media/sh010.mp4", 0, 20, offsetStart=5, trackType="VIDEO"),
+        md.newMontageEntry("sh020 (video).001", "/media/sh020.mp4", 20, 50, offsetStart=0, trackType="VIDEO"),
+        md.newMontageEntry("sh030 (video)", "/media/sh030.mp4", 50, 60, offsetStart=12, trackType="VIDEO"),
+    ]
+    diff = md.computeMontageDiff(_otioTrackEntries(), channelEntries)
+    assert _isEmptyDiff(diff)
+    assert 3 == diff["unchanged"]
+
+
+def test_inserted_deleted_and_retimed_entries():
+    channelEntries = [
+        md.newMontageEntry("sh010 (video)", "/media/sh010.mp4", 0, 25, offsetStart=5, trackType="VIDEO"),
+        md.newMontageEntry("sh040 (video)", "/media/sh040.mp4", 25, 40, offsetStart=0, trackType="VIDEO"),
+        md.newMontageEntry("sh030 (video)", "/media/sh030.mp4", 50, 60, offsetStart=0, trackType="VIDEO"),
+    ]
+    diff = md.computeMontageDiff(_otioTrackEntries(), channelEntries)
+    assert ["sh020"] == [e["name"] for e in diff["inserted"]]
+    assert ["sh040 (video)"] == [e["name"] for e in diff["deleted"]]
+    assert ["sh010", "sh030"] == [pair["ref"]["name"] for pair in diff["retimed"]]
+    assert not len(diff["reordered"])
+
+
+def test_source_in_point_change_is_a_retime():
+    channelEntries = _otioTrackEntries()
+    channelEntries[1]["offset_start"] = 8
+    diff = md.computeMontageDiff(_otioTrackEntries(), channelEntries)
+    assert 1 == len(diff["retimed"]) and "sh020" == diff["retimed"][0]["ref"]["name"]
+
+
+def test_swapped_entries_are_reordered():
+    channelEntries = _otioTrackEntries()
+    channelEntries[0]["start"], channelEntries[0]["end"] = 50, 70
+    diff = md.computeMontageDiff(_otioTrackEntries(), channelEntries)
+    assert ["sh010"] == [pair["ref"]["name"] for pair in diff["reordered"]]
@@ -230,6 +230,7 @@ def register():
 
     from .utils import utils
     from .utils import utils_operators
+    from .utils import utils_vse
 
     from .opengl import sequencer_draw
 
@@ -312,7 +313,7 @@ def register():
     time_controls_bar.register()
 
     utils_operators.register()
-    #   utils_vse.register()
+    utils_vse.register()
 
     # operators
     prefs.register()
@@ -364,6 +365,7 @@ def unregister():
     from .tools import time_controls_bar
 
     from .utils import utils_operators
+    from .utils import utils_vse
 
     from .opengl import sequencer_draw
 
@@ -403,7 +405,7 @@ def unregister():
     addon_prefs.unregister()
 
     otio.unregister()
-    #  utils_vse.unregister()
+    utils_vse.unregister()
 
     # for cls in reversed(classes):
     #     bpy.utils.unregister_class(cls)
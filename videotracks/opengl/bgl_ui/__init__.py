@@ -1,18 +1,27 @@
 # -*- coding: utf-8 -*-
 from typing import Union
+import time
 import bpy
 from .utils import get_region_at_xy
 from .widgets import BGLWidget, BGLRegion
-from .types import BGLTransform
+from .geometry import BGLDrawBatch
+from .types import BGLTransform, BGLPropFrame
 
 
 class BGLCanvas:
-    def __init__(self, transform=None, crop_left=0, crop_bottom=0, crop_right=0, crop_top=0):
+    """
+    In batched mode the rects, lines and circles of all the widgets are drawn with one draw call per shader and line
+    width, and the texts and textures after them. See BGLDrawBatch.
+    """
+
+    def __init__(self, transform=None, crop_left=0, crop_bottom=0, crop_right=0, crop_top=0, batched=False):
         BGLWidget.__init__(self)
         self._widgets: list[BGLWidget] = list()
         self._region = BGLRegion(crop_left, crop_bottom, crop_right, crop_top)
         self._region.transform = BGLTransform() if transform is None else transform
         self._last_widget_handled = None
+        self.batched = batched
+        self._batch = BGLDrawBatch()
 
     def addWidget(self, widget: BGLWidget):
         self._widgets.append(widget)
@@ -21,13 +30,37 @@ class BGLCanvas:
         self._widgets.clear()
 
     def draw(self, region: bpy.types.Region):
-        self._region.bl_region = region
-        for wdgt in self._widgets:
-            if wdgt.visible:
-                wdgt._draw(self._region)
+        BGLPropFrame.begin()
+        self._region.begin_draw(region)
+        if self.batched:
+            self._batch.begin()
+            self._region.batch = self._batch
+
+        try:
+            for wdgt in self._widgets:
+                # culled before anything else so that the widgets out of the region cost almost nothing
+                if self._region.is_culled(wdgt.get_cull_bound()):
+                    continue
+                if wdgt.visible:
+                    wdgt._draw(self._region)
+        finally:
+            # deferred draws are done without batch so that they really draw
+            self._region.batch = None
+            self._region.end_draw()
+            BGLPropFrame.end()
+
+        if self.batched:
+            self._batch.draw()
 
     def handle_event(self, region: bpy.types.Region, event: bpy.types.Event) -> bool:
         self._region.bl_region = region
+        BGLPropFrame.begin()
+        try:
+            return self._handle_widgets_event(event)
+        finally:
+            BGLPropFrame.end()
+
+    def _handle_widgets_event(self, event: bpy.types.Event) -> bool:
         # First do the last widget which handled something so it has priority.
         if self._last_widget_handled is not None:
             if self._last_widget_handled.handle_event(self._region, event):
@@ -57,6 +90,12 @@ class BGL_UIOperatorBase(bpy.types.Operator):
         self._canvas = list()  # type: list[BGLCanvas]
         self._last_handled_canvas = None
 
+        # redraw scheduling, see redraw_signature()
+        self._last_redraw_signature = None
+        self._modal_calls = 0
+        self._redraw_count = 0
+        self._start_time = time.monotonic()
+
     def add_canva(self, canva):
         self._canvas.append(canva)
 
@@ -78,31 +117,75 @@ class BGL_UIOperatorBase(bpy.types.Operator):
     def should_cancel(self) -> bool:
         raise NotImplementedError()
 
+    def redraw_area_type(self) -> Union[str, None]:
+        """
+        Type of the areas tagged for redraw when the overlay changes, None to redraw all the areas of the screen.
+        """
+        return None
+
+    def redraw_signature(self, context):
+        """
+        Cheap value describing what the overlay displays. The areas are tagged for redraw only when it changes.
+        None means that the state is unknown and that the areas are redrawn at each event.
+        """
+        return None
+
+    def get_redraw_stats(self):
+        """
+        Return the number of modal calls, of redraws and the redraw rate per second since the invocation, for
+        diagnostics.
+        """
+        duration = max(time.monotonic() - self._start_time, 1e-6)
+        return {
+            "modal_calls": self._modal_calls,
+            "redraws": self._redraw_count,
+            "redraws_per_second": self._redraw_count / duration,
+        }
+
+    def _tag_redraw_if_changed(self, context):
+        signature = self.redraw_signature(context)
+        if signature is not None and signature == self._last_redraw_signature:
+            return
+        self._last_redraw_signature = signature
+
+        area_type = self.redraw_area_type()
+        for area in context.screen.areas:
+            if area_type is None or area.type == area_type:
+                area.tag_redraw()
+        self._redraw_count += 1
+
     def modal(self, context, event):
+        self._modal_calls += 1
         if self.should_rebuild_ui():
             self._canvas.clear()
             self.build_ui()
+            self._last_redraw_signature = None
 
         if not self.should_handle_event():
             return {"PASS_THROUGH"}
 
-        for area in context.screen.areas:
-            area.tag_redraw()
-
+        # events are handled before the redraw check so that the state they change, hovering for example, is
+        # taken into account
+        handled = False
         region, _ = get_region_at_xy(context, event.mouse_x, event.mouse_y)
         if region is not None:
             if self._last_handled_canvas is not None:
-                if self._last_handled_canvas.handle_event(region, event):
-                    return {"RUNNING_MODAL"}
-
-            for canva in reversed(
-                self._canvas
-            ):  # traversal is reversed because last layers are actually drawn on top so we give them mouse priority.
-                if canva is self._last_handled_canvas:  # Handled first.
-                    continue
-                if canva.handle_event(region, event):
-                    self._last_handled_canvas = canva
-                    return {"RUNNING_MODAL"}
+                handled = self._last_handled_canvas.handle_event(region, event)
+
+            if not handled:
+                for canva in reversed(
+                    self._canvas
+                ):  # traversal is reversed because last layers are actually drawn on top so we give them mouse priority.
+                    if canva is self._last_handled_canvas:  # Handled first.
+                        continue
+                    if canva.handle_event(region, event):
+                        self._last_handled_canvas = canva
+                        handled = True
+                        break
+
+        self._tag_redraw_if_changed(context)
+        if handled:
+            return {"RUNNING_MODAL"}
 
         if self.should_cancel():
             context.window_manager.event_timer_remove(self._timer)
@@ -126,6 +209,7 @@ class BGL_UIOperatorBase(bpy.types.Operator):
 
         self._draw_handle = self.space_type().draw_handler_add(self.draw, (context,), "WINDOW", "POST_PIXEL")
         self._timer = context.window_manager.event_timer_add(0.1, window=context.window)
+        self._start_time = time.monotonic()
         context.window_manager.modal_handler_add(self)
         self.build_ui()
 
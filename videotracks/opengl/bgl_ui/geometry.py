@@ -6,12 +6,9 @@ Reflexion:
 Maybe geometry should not have a defined position. The widgets are responsible for drawings and also have a position. This is redondant.
 
 Move Shader draw calls in here part in there
-
-Todo:
-    - allow caching of batch so we don't recreate them at each draw call. Maybe via setting a callback to a BGLProp.
 """
 
-from typing import Callable, Union
+from typing import Any, Callable, Union
 
 import math
 from gpu_extras.batch import batch_for_shader
@@ -19,17 +16,165 @@ import bpy, blf, bgl
 from mathutils import Vector
 
 from .types import BGLColor, BGLBound, BGLRegion, BGLCoord, BGLPropValue, BGLProp, BGLImageManager
-from .shaders import BGLImageShader, BGLUniformShader
+from .shaders import BGLImageShader, BGLUniformShader, BGLFlatColorShader
 
 from videotracks.utils import utils
 
 
+class BGLBatchCache:
+    """
+    Retained GPU batch, rebuilt only when the key it has been built from changes.
+    The key is made of the evaluated data of the batch (bound, colors...) or of the version of its vertices, so a
+    batch is reused as long as the view and the properties of its geometry do not change.
+    hits and misses count the uses of all the caches, for profiling.
+    """
+
+    hits = 0
+    misses = 0
+
+    def __init__(self):
+        self._key = None
+        self._batch = None
+
+    def get(self, key, build_batch: Callable[[], Any]):
+        if self._batch is not None and key == self._key:
+            BGLBatchCache.hits += 1
+        else:
+            BGLBatchCache.misses += 1
+            self._batch = build_batch()
+            self._key = key
+        return self._batch
+
+    @classmethod
+    def get_stats(cls):
+        total = cls.hits + cls.misses
+        return {"hits": cls.hits, "misses": cls.misses, "hit_ratio": cls.hits / total if total else 0.0}
+
+    @classmethod
+    def reset_stats(cls):
+        cls.hits = 0
+        cls.misses = 0
+
+
+def _bound_key(bound: BGLBound):
+    return (bound.min.x, bound.min.y, bound.max.x, bound.max.y)
+
+
+class BGLVertexStream:
+    """
+    Positions and colors of the vertices of a batch, kept from a draw to the next one.
+    The vertices are emitted again at each draw from the start of the stream. version is incremented only when the
+    emitted vertices differ from the ones of the previous draw, so it can be used as the key of the cached batch.
+    """
+
+    def __init__(self):
+        self.positions = list()
+        self.colors = list()
+        self.version = 0
+        self._size = 0
+
+    def begin(self):
+        self._size = 0
+
+    def add(self, positions, colors):
+        start, end = self._size, self._size + len(positions)
+        if self.positions[start:end] != positions or self.colors[start:end] != colors:
+            self.positions[start:end] = positions
+            self.colors[start:end] = colors
+            self.version += 1
+        self._size = end
+
+    def end(self):
+        if self._size != len(self.positions):
+            del self.positions[self._size :]
+            del self.colors[self._size :]
+            self.version += 1
+
+
+class BGLDrawBatch:
+    """
+    Vertex streams of a canvas drawn in batched mode.
+    Geometries emit their triangles and lines with their colors instead of drawing them, then draw() renders
+    all the triangles with a single call and the lines with one call per line width. The GPU batches are rebuilt
+    only when the emitted vertices change, see BGLVertexStream.
+    Textures and texts are drawn after the geometry, in their emission order, so in batched mode widgets are expected
+    not to cover the texts of the others.
+    """
+
+    def __init__(self):
+        self.tris = BGLVertexStream()
+        self.lines = dict()  # line width: BGLVertexStream
+        self.deferred_draws = list()
+        self._tris_cache = BGLBatchCache()
+        self._lines_caches = dict()  # line width: BGLBatchCache
+
+    def begin(self):
+        """ Start the emission of the vertices of a new draw """
+        self.tris.begin()
+        for stream in self.lines.values():
+            stream.begin()
+        self.deferred_draws.clear()
+
+    def add_triangles(self, points, color: BGLColor):
+        """ points: list of vertices, 3 per triangle """
+        self.tris.add(points, [BGLFlatColorShader.convert_color(color)] * len(points))
+
+    def add_rect(self, bound: BGLBound, color: BGLColor):
+        lo, hi = (bound.min.x, bound.min.y), (bound.max.x, bound.max.y)
+        self.add_triangles([lo, (hi[0], lo[1]), (lo[0], hi[1]), (hi[0], lo[1]), hi, (lo[0], hi[1])], color)
+
+    def add_rect_lines(self, bound: BGLBound, color: BGLColor, line_width):
+        corners = [(bound.min.x, bound.min.y), (bound.max.x, bound.min.y), (bound.max.x, bound.max.y)]
+        corners.append((bound.min.x, bound.max.y))
+        positions = list()
+        for i in range(4):
+            positions.append(corners[i])
+            positions.append(corners[(i + 1) % 4])
+        stream = self.lines.get(line_width)
+        if stream is None:
+            stream = self.lines[line_width] = BGLVertexStream()
+        stream.add(positions, [BGLFlatColorShader.convert_color(color)] * 8)
+
+    def defer(self, draw_callback: Callable[[], None]):
+        """ Draw callback called after the geometry of the batch has been drawn """
+        self.deferred_draws.append(draw_callback)
+
+    def draw(self):
+        self.tris.end()
+        if self.tris.positions:
+            batch = self._tris_cache.get(
+                self.tris.version,
+                lambda: BGLFlatColorShader.create_batch(
+                    "TRIS", {"pos": self.tris.positions, "color": self.tris.colors}
+                ),
+            )
+            with BGLFlatColorShader() as shader:
+                shader.draw_batch(batch)
+
+        for line_width, stream in self.lines.items():
+            stream.end()
+            if not stream.positions:
+                continue
+            batch = self._lines_caches.setdefault(line_width, BGLBatchCache()).get(
+                stream.version,
+                lambda: BGLFlatColorShader.create_batch("LINES", {"pos": stream.positions, "color": stream.colors}),
+            )
+            with BGLFlatColorShader() as shader:
+                bgl.glLineWidth(line_width)
+                shader.draw_batch(batch)
+                bgl.glLineWidth(1)
+
+        for draw_callback in self.deferred_draws:
+            draw_callback()
+
+
 class BGLGeometry:
     position = BGLProp(BGLCoord())
 
     def __init__(self, **prop_values):
         for k, v in prop_values.items():
             setattr(self, k, v)
+        self._batch_cache = BGLBatchCache()
 
     def get_bound(self, region: BGLRegion = None) -> BGLBound:
         return BGLBound()
@@ -67,17 +212,24 @@ class BGLRect(BGLGeometry):
 
     def draw(self, region: BGLRegion):
         bound = self.get_bound(region)
-        batch = BGLUniformShader.create_batch(
-            "TRIS",
-            {
-                "pos": [
-                    Vector(list(bound.min)),
-                    Vector([bound.max.x, bound.min.y]),
-                    Vector(list(bound.max)),
-                    Vector([bound.min.x, bound.max.y]),
-                ]
-            },
-            indices=[(0, 1, 3), (1, 2, 3)],
+        if region.batch is not None:
+            region.batch.add_rect(bound, self.color.to_sRGB())
+            return
+
+        batch = self._batch_cache.get(
+            _bound_key(bound),
+            lambda: BGLUniformShader.create_batch(
+                "TRIS",
+                {
+                    "pos": [
+                        Vector(list(bound.min)),
+                        Vector([bound.max.x, bound.min.y]),
+                        Vector(list(bound.max)),
+                        Vector([bound.min.x, bound.max.y]),
+                    ]
+                },
+                indices=[(0, 1, 3), (1, 2, 3)],
+            ),
         )
 
         with BGLUniformShader() as shader:
@@ -91,17 +243,24 @@ class BGLRectLine(BGLRect):
 
     def draw(self, region: BGLRegion):
         bound = self.get_bound(region)
-        batch = BGLUniformShader.create_batch(
-            "LINES",
-            {
-                "pos": [
-                    Vector(list(bound.min)),
-                    Vector([bound.max.x, bound.min.y]),
-                    Vector(list(bound.max)),
-                    Vector([bound.min.x, bound.max.y]),
-                ]
-            },
-            indices=[(0, 1), (1, 2), (2, 3), (3, 0)],
+        if region.batch is not None:
+            region.batch.add_rect_lines(bound, self.color.to_sRGB(), self.line_width)
+            return
+
+        batch = self._batch_cache.get(
+            _bound_key(bound),
+            lambda: BGLUniformShader.create_batch(
+                "LINES",
+                {
+                    "pos": [
+                        Vector(list(bound.min)),
+                        Vector([bound.max.x, bound.min.y]),
+                        Vector(list(bound.max)),
+                        Vector([bound.min.x, bound.max.y]),
+                    ]
+                },
+                indices=[(0, 1), (1, 2), (2, 3), (3, 0)],
+            ),
         )
 
         with BGLUniformShader() as shader:
@@ -151,7 +310,14 @@ class BGLCircle(BGLGeometry):
             indices.append((0, i + 1, i + 2))
         indices.append((0, num_pts, 1))  # Last Face
 
-        batch = BGLUniformShader.create_batch("TRIS", {"pos": points}, indices=indices)
+        if region.batch is not None:
+            region.batch.add_triangles([tuple(points[ind]) for face in indices for ind in face], self.color)
+            return
+
+        batch = self._batch_cache.get(
+            (tuple(self.position), self.radius, num_pts),
+            lambda: BGLUniformShader.create_batch("TRIS", {"pos": points}, indices=indices),
+        )
         with BGLUniformShader() as shader:
             shader.set_color(self.color)
             shader.draw_batch(batch)
@@ -193,6 +359,9 @@ class BGLText(BGLGeometry):
         return False
 
     def drawAdv(self, region, rotation=0):
+        if region.batch is not None:
+            region.batch.defer(lambda: self.drawAdv(region, rotation))
+            return
         fontid = 0
         # https://blenderartists.org/t/blf-clipping-aspect-rotation-shadow-blur/544985/4
         if 0 != rotation:
@@ -203,6 +372,9 @@ class BGLText(BGLGeometry):
             blf.disable(fontid, blf.ROTATION)
 
     def draw(self, region):
+        if region.batch is not None:
+            region.batch.defer(lambda: self.draw(region))
+            return
         fontid = 0
         blf.size(fontid, self.size, 72)
         bound = self.get_bound(region)
@@ -227,19 +399,25 @@ class BGLTexture(BGLRect):
     def draw(self, region: BGLRegion):
         if self.image is None:
             return
+        if region.batch is not None:
+            region.batch.defer(lambda: self.draw(region))
+            return
         bound = self.get_bound(region)
-        batch = BGLImageShader.create_batch(
-            "TRIS",
-            {
-                "pos": [
-                    Vector(list(bound.min)),
-                    Vector([bound.max.x, bound.min.y]),
-                    Vector(list(bound.max)),
-                    Vector([bound.min.x, bound.max.y]),
-                ],
-                "texCoord": ((0, 0), (1, 0), (1, 1), (0, 1)),
-            },
-            indices=[(0, 1, 3), (1, 2, 3)],
+        batch = self._batch_cache.get(
+            _bound_key(bound),
+            lambda: BGLImageShader.create_batch(
+                "TRIS",
+                {
+                    "pos": [
+                        Vector(list(bound.min)),
+                        Vector([bound.max.x, bound.min.y]),
+                        Vector(list(bound.max)),
+                        Vector([bound.min.x, bound.max.y]),
+                    ],
+                    "texCoord": ((0, 0), (1, 0), (1, 1), (0, 1)),
+                },
+                indices=[(0, 1, 3), (1, 2, 3)],
+            ),
         )
 
         with BGLImageShader() as shader:
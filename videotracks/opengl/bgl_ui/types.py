@@ -328,6 +328,12 @@ class BGLTransform:
     def apply_transform(self, region: "BGLRegion", position: BGLCoord, clip_to_region=True):
         return BGLCoord(position.x, position.y)
 
+    def region_bound_to_local(self, region: "BGLRegion", bound: "BGLBound"):
+        """
+        Inverse transform of a bound of the region, used to cull the widgets in their own coordinates.
+        """
+        return BGLBound(BGLCoord(*bound.min), BGLCoord(*bound.max))
+
 
 class BGLViewToRegion(BGLTransform):
     def __init__(self, apply_to_x=True, apply_to_y=True):
@@ -345,20 +351,61 @@ class BGLViewToRegion(BGLTransform):
 
         return new_pos
 
+    def region_bound_to_local(self, region: "BGLRegion", bound: "BGLBound"):
+        view2d = region.bl_region.view2d
+        local_min = BGLCoord(*view2d.region_to_view(bound.min.x, bound.min.y))
+        local_max = BGLCoord(*view2d.region_to_view(bound.max.x, bound.max.y))
+        if self.apply_to_x is False:
+            local_min.x, local_max.x = bound.min.x, bound.max.x
+
+        if self.apply_to_y is False:
+            local_min.y, local_max.y = bound.min.y, bound.max.y
+
+        return BGLBound(local_min, local_max)
+
 
 class BGLRegion:
     def __init__(self, crop_left=0, crop_bottom=0, crop_right=0, crop_top=0):
         self._crops = (crop_left, crop_bottom, crop_right, crop_top)
         self.bl_region: bpy.types.Region = None
         self.transform = BGLTransform()
+        # BGLDrawBatch collecting the geometry when the canvas is drawn in batched mode, None otherwise
+        self.batch = None
+        # bound of the region in the coordinates of the widgets during a draw pass, see begin_draw()
+        self.cull_bound = None
+        self._draw_bound = None
 
     @property
     def bound(self) -> BGLBound:
+        if self._draw_bound is not None:
+            return self._draw_bound
         return BGLBound(
             BGLCoord(self._crops[0], self._crops[1]),
             BGLCoord(self.bl_region.width - self._crops[2], self.bl_region.height - self._crops[3]),
         )
 
+    def begin_draw(self, bl_region: bpy.types.Region):
+        """
+        The region does not change during a draw pass so its bound, and its inverse transform used for culling, are
+        computed once here instead of for each widget.
+        """
+        self.bl_region = bl_region
+        self._draw_bound = None
+        self._draw_bound = self.bound
+        self.cull_bound = self.transform.region_bound_to_local(self, self._draw_bound)
+
+    def end_draw(self):
+        self._draw_bound = None
+        self.cull_bound = None
+
+    def is_culled(self, local_bound: BGLBound) -> bool:
+        """
+        Return True if the bound, in the coordinates of the widgets, is out of the region drawn by the current pass.
+        """
+        if self.cull_bound is None or local_bound is None:
+            return False
+        return not self.cull_bound.do_overlap(local_bound)
+
     def view_to_region(self, position: BGLCoord, region_clip=True) -> BGLCoord:
         if region_clip:
             position = clamp_to_region(position.x, position.y, self.bl_region, self.bound)
@@ -373,6 +420,27 @@ class BGLRegion:
 ###
 
 
+class BGLPropFrame:
+    """
+    Evaluation frame of the callable prop values.
+    Between begin() and end(), a draw or event handling pass of a canvas, each callable BGLPropValue is evaluated at
+    most once and its result is reused. Assigning a prop value only invalidates the evaluated value of this prop, the
+    callables depending on it are evaluated again in the next pass.
+    """
+
+    generation = 0
+    active = False
+
+    @classmethod
+    def begin(cls):
+        cls.generation += 1
+        cls.active = True
+
+    @classmethod
+    def end(cls):
+        cls.active = False
+
+
 class BGLPropValue:
     """
     Data object which either encapsulate values as function or static value.
@@ -384,11 +452,19 @@ class BGLPropValue:
             self._value = value._value
         else:
             self._value = value
+        self._cached_value = None
+        self._cached_generation = -1
 
     @property
     def value(self):
         if callable(self._value):
-            return self._value()
+            if not BGLPropFrame.active:
+                return self._value()
+            if self._cached_generation != BGLPropFrame.generation:
+                generation = BGLPropFrame.generation
+                self._cached_value = self._value()
+                self._cached_generation = generation
+            return self._cached_value
         else:
             return self._value
 
@@ -398,6 +474,8 @@ class BGLPropValue:
             self._value = lambda o=value: o()
         else:
             self._value = value
+        self._cached_value = None
+        self._cached_generation = -1
 
     def __call__(self):
         return self.value
@@ -434,7 +512,7 @@ class BGLProp:
 
     def __get__(self, obj, type=None) -> Any:
         if not self._name in obj.__dict__:
-            self.__set__(obj, deepcopy(self._default_value))
+            obj.__dict__[self._name] = BGLPropValue(deepcopy(self._default_value))
 
         return obj.__dict__.get(self._name).value
 
@@ -19,6 +19,10 @@ def _nop(*args, **kwargs):
     pass
 
 
+def _size_bound(position: BGLCoord, width, height):
+    return BGLBound(BGLCoord(position.x, position.y), BGLCoord(position.x + width, position.y + height))
+
+
 class BGLWidget:
     position = BGLProp(BGLCoord())
     visible = BGLProp(True)
@@ -32,6 +36,13 @@ class BGLWidget:
     def get_bound(self, region: BGLRegion):
         return BGLBound()
 
+    def get_cull_bound(self):
+        """
+        Cheap bound of the widget in its own coordinates, before the transform of the canvas, used to skip the
+        widgets out of the region without evaluating their geometry. None if the widget cannot tell.
+        """
+        return None
+
     def _draw(self, region: BGLRegion):
         if region.bound.do_overlap(self.get_bound(region)):
             self.draw(region)
@@ -94,6 +105,9 @@ class BGLLabel(BGLWidget):
     def get_bound(self, region):
         return self._geometry.get_bound(region)
 
+    def get_cull_bound(self):
+        return _size_bound(self.position, self.width, self.height)
+
     def draw(self, region):
         self._geometry.draw(region)
         self._text_geometry.drawAdv(region, rotation=self.rotation)
@@ -168,6 +182,9 @@ class BGLButton(BGLWidget):
     def get_bound(self, region):
         return self._geometry.get_bound(region)
 
+    def get_cull_bound(self):
+        return _size_bound(self.position, self.width, self.height)
+
     def handle_event(self, region, event: bpy.types.Event) -> bool:
         mouse_pos = region.mouse_to_region(BGLCoord(event.mouse_x, event.mouse_y))
         if event.type == "LEFTMOUSE":
@@ -209,6 +226,11 @@ class BGLGeometryStamp(BGLWidget):
     def get_bound(self, region):
         return self.geometry.get_bound(region)
 
+    def get_cull_bound(self):
+        if isinstance(self.geometry, BGLRect):
+            return _size_bound(self.position, self.geometry.width, self.geometry.height)
+        return None
+
     def draw(self, region: BGLRegion):
         self.geometry.draw(region)
 
@@ -347,6 +369,9 @@ class BGLSlider(BGLWidget):
     def get_bound(self, region):
         return self._back_geo.get_bound(region)
 
+    def get_cull_bound(self):
+        return _size_bound(self.position, self.width, self.height)
+
     def draw(self, region: BGLRegion):
         self._front_geo.width = utils.remap(self.value, self.min, self.max, 0, 1) * self._back_geo.width
 
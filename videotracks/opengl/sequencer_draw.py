@@ -173,6 +173,7 @@ class UAS_VideoTracks_TracksOverlay(BGL_UIOperatorBase):
     def build_ui(self):
         props = bpy.context.scene.UAS_video_tracks_props
         self.track_count = len(props.tracks)  # used for rebuilding ui
+        self._buttons = list()  # every button of the canvases, used for the redraw signature
 
         # colors
         out_of_range_color = (BGLColor(0.1, 0.0, 0, 0.25)).to_sRGB()
@@ -184,7 +185,7 @@ class UAS_VideoTracks_TracksOverlay(BGL_UIOperatorBase):
         textColor = BGLColor(0.9, 0.9, 0.9)
         selectedColor = BGLColor(0.99, 0.99, 0.99, 0.2)
 
-        canva = BGLCanvas(BGLViewToRegion(), 0, 11, 11, 22)
+        canva = BGLCanvas(BGLViewToRegion(), 0, 11, 11, 22, batched=True)
         self.add_canva(canva)
         size = 100000
 
@@ -202,7 +203,7 @@ class UAS_VideoTracks_TracksOverlay(BGL_UIOperatorBase):
         canva.addWidget(frame_range_left)
         canva.addWidget(frame_range_right)
 
-        canva = BGLCanvas(BGLViewToRegion(apply_to_x=False), 0, 11, 11, 22)
+        canva = BGLCanvas(BGLViewToRegion(apply_to_x=False), 0, 11, 11, 22, batched=True)
         self.add_canva(canva)
 
         # rect.color = lambda prop=props: BGLColor(
@@ -247,6 +248,7 @@ class UAS_VideoTracks_TracksOverlay(BGL_UIOperatorBase):
             )
             # button.text_size = lambda text_size=text_size: 18
             button.clicked_callback = lambda prop=props, index=i: prop.setSelectedTrackByIndex(index + 1)
+            self._buttons.append(button)
 
             # Track highlighted or selected
             hovered_track = BGLGeometryStamp(position = pos,
@@ -324,6 +326,7 @@ class UAS_VideoTracks_TracksOverlay(BGL_UIOperatorBase):
                 t.enabled = not t.enabled
 
             enabled_btn.clicked_callback = update_enabled
+            self._buttons.append(enabled_btn)
             canva.addWidget(enabled_btn)
 
             # track color button
@@ -346,6 +349,7 @@ class UAS_VideoTracks_TracksOverlay(BGL_UIOperatorBase):
 
             # button.text_size = lambda text_size=text_size: 18
             button.clicked_callback = lambda prop=props, index=i: prop.setSelectedTrackByIndex(index + 1)
+            self._buttons.append(button)
             canva.addWidget(button)
 
         ###############
@@ -379,6 +383,34 @@ class UAS_VideoTracks_TracksOverlay(BGL_UIOperatorBase):
     def should_cancel(self):
         return self.context.window_manager.UAS_video_tracks_overlay is False
 
+    def redraw_area_type(self):
+        return "SEQUENCE_EDITOR"
+
+    def redraw_signature(self, context):
+        scene = context.scene
+        props = scene.UAS_video_tracks_props
+        # the highlight color of any button changes when it is hovered
+        highlighted = tuple(b.is_highlighted for b in self._buttons)
+        views = list()
+        for area in context.screen.areas:
+            if "SEQUENCE_EDITOR" == area.type:
+                for region in area.regions:
+                    if "WINDOW" == region.type:
+                        views.append(
+                            (region.width, region.height)
+                            + tuple(region.view2d.region_to_view(0, 0))
+                            + tuple(region.view2d.region_to_view(region.width, region.height))
+                        )
+
+        return (
+            props.selected_track_index,
+            tuple((t.name, tuple(t.color), t.enabled, t.opacity) for t in props.tracks),
+            highlighted,
+            tuple(views),
+            scene.frame_start,
+            scene.frame_end,
+        )
+
     def should_rebuild_ui(self) -> bool:
         props = bpy.context.scene.UAS_video_tracks_props
         if len(props.tracks) != self.track_count:
@@ -24,6 +24,7 @@ from bpy.types import Operator
 from bpy.props import StringProperty, BoolProperty, FloatVectorProperty, EnumProperty, IntProperty
 
 from random import uniform
+import time
 
 
 def _list_scenes(self, context):
@@ -511,15 +512,137 @@ class UAS_VideoTracks_UpdateVSETrack(Operator):
     bl_options = {"INTERNAL", "UNDO"}
 
     trackName: StringProperty()
+    fullRebuild: BoolProperty(
+        name="Full Rebuild",
+        description="Clear the track and recreate all its clips instead of updating only the ones that have changed."
+        "\nShift + Click to force a full rebuild",
+        default=False,
+    )
 
     def invoke(self, context, event):
 
         print("trackName: ", self.trackName)
-        context.scene.UAS_video_tracks_props.tracks[self.trackName].regenerateTrackContent()
+        context.scene.UAS_video_tracks_props.tracks[self.trackName].regenerateTrackContent(
+            fullRebuild=self.fullRebuild or event.shift
+        )
 
         return {"FINISHED"}
 
 
+class UAS_VideoTracks_RegenerateAllTracks(Operator):
+    bl_idname = "uas_video_tracks.regenerate_all_tracks"
+    bl_label = "Regenerate All Tracks"
+    bl_description = (
+        "Update the content of all the tracks based on Shot Manager scenes"
+        " (Shot Manager Cameras and Camera Backgrounds)."
+        "\nThe update is done in the background and can be cancelled with Esc, the tracks already updated are then"
+        " kept and can be undone"
+    )
+    bl_options = {"INTERNAL", "UNDO"}
+
+    fullRebuild: BoolProperty(
+        name="Full Rebuild",
+        description="Clear the tracks and recreate all their clips instead of updating only the ones that have changed",
+        default=False,
+    )
+
+    # maximum time spent in a timer event, in seconds
+    timeSlice = 0.05
+
+    # events passed to Blender during the regeneration, the other ones are blocked so that the scene cannot be
+    # edited or undone while the track content is being rebuilt
+    passThroughEvents = {
+        "MOUSEMOVE",
+        "INBETWEEN_MOUSEMOVE",
+        "MIDDLEMOUSE",
+        "WHEELUPMOUSE",
+        "WHEELDOWNMOUSE",
+        "TRACKPADPAN",
+        "TRACKPADZOOM",
+    }
+
+    def invoke(self, context, event):
+        vt_props = context.scene.UAS_video_tracks_props
+        self._trackNames = [
+            t.name
+            for t in vt_props.getTracks()
+            if t.trackType in ("SHOT_CAMERAS", "CAM_BG") and t.shotManagerScene is not None
+        ]
+        if not len(self._trackNames):
+            self.report({"INFO"}, "No track to regenerate")
+            return {"CANCELLED"}
+
+        self._trackInd = 0
+        self._trackProgress = 0.0
+        self._trackIter = None
+        self._startTime = time.monotonic()
+
+        wm = context.window_manager
+        wm.progress_begin(0, 100)
+        self._timer = wm.event_timer_add(0.01, window=context.window)
+        wm.modal_handler_add(self)
+
+        return {"RUNNING_MODAL"}
+
+    def modal(self, context, event):
+        if "ESC" == event.type:
+            self._finish(context)
+            self.report({"WARNING"}, f"Tracks regeneration cancelled after {self._trackInd} track(s)")
+            # the tracks have already been modified, finishing pushes an undo step for the partial regeneration
+            return {"FINISHED"}
+
+        if "TIMER" != event.type:
+            return {"PASS_THROUGH"} if event.type in self.passThroughEvents else {"RUNNING_MODAL"}
+
+        sliceEnd = time.monotonic() + self.timeSlice
+        while time.monotonic() < sliceEnd:
+            if self._trackIter is None:
+                if len(self._trackNames) <= self._trackInd:
+                    self._finish(context)
+                    self.report(
+                        {"INFO"},
+                        f"{len(self._trackNames)} track(s) regenerated in {time.monotonic() - self._startTime:.1f}s",
+                    )
+                    return {"FINISHED"}
+                track = context.scene.UAS_video_tracks_props.tracks.get(self._trackNames[self._trackInd])
+                if track is None:
+                    self._trackInd += 1
+                    continue
+                self._trackIter = track.iterRegenerateTrackContent(fullRebuild=self.fullRebuild)
+                self._trackProgress = 0.0
+
+            try:
+                numProcessed, numTotal = next(self._trackIter)
+                self._trackProgress = numProcessed / numTotal if 0 < numTotal else 1.0
+            except StopIteration:
+                self._trackIter = None
+                self._trackInd += 1
+
+        self._updateProgress(context)
+        return {"RUNNING_MODAL"}
+
+    def _updateProgress(self, context):
+        numTracks = len(self._trackNames)
+        progress = min(1.0, (self._trackInd + self._trackProgress) / numTracks)
+        elapsedTime = time.monotonic() - self._startTime
+        etaStr = f", ETA: {elapsedTime * (1.0 - progress) / progress:.0f}s" if 0.0 < progress else ""
+
+        context.window_manager.progress_update(int(progress * 100))
+        context.workspace.status_text_set(
+            f"Regenerating tracks: {min(self._trackInd + 1, numTracks)}/{numTracks}"
+            f" - {progress * 100:.0f}%{etaStr} - Esc to cancel"
+        )
+
+    def _finish(self, context):
+        wm = context.window_manager
+        wm.event_timer_remove(self._timer)
+        wm.progress_end()
+        context.workspace.status_text_set(None)
+        if self._trackIter is not None:
+            self._trackIter.close()
+            self._trackIter = None
+
+
 class UAS_VideoTracks_ClearVSETrack(Operator):
     bl_idname = "uas_video_tracks.clear_vse_track"
     bl_label = "Clear VSE Track"
@@ -570,6 +693,7 @@ _classes = (
     UAS_VideoTracks_MoveTrackUpDown,
     UAS_VideoTracks_TrackRemoveMultiple,
     UAS_VideoTracks_UpdateVSETrack,
+    UAS_VideoTracks_RegenerateAllTracks,
     UAS_VideoTracks_ClearVSETrack,
     UAS_VideoTracks_GoToSpecifedScene,
     # UAS_VideoTracks_SetCurrentTrack,
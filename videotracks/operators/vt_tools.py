@@ -20,8 +20,14 @@ To do: module description here.
 """
 
 import os
+from datetime import datetime
+import json
 from pathlib import Path
+import shutil
 from stat import S_IMODE, S_IWRITE
+import tempfile
+import time
+import wave
 
 import bpy
 from bpy.types import Operator, Menu
@@ -35,6 +41,9 @@ from videotracks.otio.imports import importToVSE
 
 from videotracks.utils import utils
 from videotracks.utils import utils_markers
+from videotracks.utils import utils_media
+from videotracks.utils import utils_render
+from videotracks.utils import utils_vse
 
 from videotracks.config import config
 
@@ -272,7 +281,7 @@ class UAS_VideoTracks_OT_Parse_Edit_From_OTIO(Operator):
         from pathlib import Path
 
         if "" != self.otioFile and Path(self.otioFile).exists():
-            timeline = opentimelineio.adapters.read_from_file(self.otioFile)
+            timeline = ow.get_timeline_from_file(self.otioFile)
             time = timeline.duration()
             rate = int(time.rate)
 
@@ -336,6 +345,31 @@ class UAS_VideoTracks_OT_ExportContentbetweenMarkers(Operator):
     exportAsAudioFiles: BoolProperty(name="Export as Audio Files", default=True)
     exportEditSoundtracks: BoolProperty(name="Export Edit Sound Tracks", default=True)
 
+    soundtracksSingleMixdown: BoolProperty(
+        name="Single Mixdown per Track",
+        description="Mix each sound track down once for the whole export range, then slice the result at the markers."
+        "\nMuch faster than a mixdown per segment",
+        default=True,
+    )
+
+    useRenderCache: BoolProperty(
+        name="Skip Up To Date Files",
+        description="Do not export again the files whose content has not changed since their previous export",
+        default=True,
+    )
+
+    useBackgroundWorkers: BoolProperty(
+        name="Use Background Processes",
+        description="Export the video and audio segments in parallel with background Blender processes",
+        default=False,
+    )
+    numWorkers: IntProperty(
+        name="Processes", description="Number of background processes. 0 to use the number of CPUs", min=0, default=0,
+    )
+    maxRetries: IntProperty(
+        name="Retries", description="Number of times the export of a failed segment is run again", min=0, default=1,
+    )
+
     def invoke(self, context, event):
 
         self.start = context.scene.frame_start
@@ -358,6 +392,93 @@ class UAS_VideoTracks_OT_ExportContentbetweenMarkers(Operator):
         row.prop(self, "exportAsAudioFiles")
         row = layout.row()
         row.prop(self, "exportEditSoundtracks")
+        subRow = row.row()
+        subRow.enabled = self.exportEditSoundtracks
+        subRow.prop(self, "soundtracksSingleMixdown")
+        row = layout.row()
+        row.prop(self, "useRenderCache")
+        row = layout.row()
+        row.prop(self, "useBackgroundWorkers")
+        subRow = row.row(align=True)
+        subRow.enabled = self.useBackgroundWorkers
+        subRow.prop(self, "numWorkers")
+        subRow.prop(self, "maxRetries")
+
+    def getSegments(self, markers, endTolerance=0):
+        """ Return the list of the segments defined by the markers in the export range, as tupples
+            (marker name, segment start, segment end)
+        """
+        segments = list()
+        for i, mrk in enumerate(markers[:-1]):
+            if self.start <= mrk.frame <= self.end and self.start <= markers[i + 1].frame <= self.end + endTolerance:
+                segments.append((mrk.name, mrk.frame, markers[i + 1].frame - 1))
+        return segments
+
+    def exportSegmentsWithWorkers(self, scene, segmentExports):
+        """ Export the video and audio files of the segments with a pool of background Blender processes
+            segmentExports: list of dictionaries made of "name", "type" ("VIDEO" or "AUDIO"), "frame_start",
+            "frame_end" and "output"
+            Return the results of utils_render.runBlenderJobs()
+            The temporary folder of the jobs is kept when a job fails so that its log can be read
+        """
+        jobs = list()
+        for segmentExport in segmentExports:
+            output = segmentExport["output"]
+            script = f"import bpy\nscene = bpy.context.scene\nscene.frame_start = {segmentExport['frame_start']}\n"
+            script += f"scene.frame_end = {segmentExport['frame_end']}\n"
+            if "VIDEO" == segmentExport["type"]:
+                script += f"scene.render.use_sequencer = True\nscene.render.filepath = {output!r}\n"
+                script += "bpy.ops.render.render(animation=True)\n"
+            else:
+                script += f"bpy.ops.sound.mixdown(filepath={output!r}, relative_path=False"
+                script += ', container="MP3", codec="MP3")\n'
+            jobs.append({"name": segmentExport["name"], "script": script, "output": output})
+
+        tempDir = tempfile.mkdtemp(prefix="videotracks_export_")
+        results = None
+        try:
+            blendFile = os.path.join(tempDir, "export.blend")
+            utils_render.writeBlendFileForJobs(scene, blendFile)
+            results = utils_render.runBlenderJobs(
+                blendFile, jobs, sceneName=scene.name, numWorkers=self.numWorkers, maxRetries=self.maxRetries
+            )
+        finally:
+            if results is not None and any("FAILED" == res["status"] for res in results):
+                print(f"*** Some exports failed, logs kept in {tempDir} ***")
+            else:
+                shutil.rmtree(tempDir, ignore_errors=True)
+
+        return results
+
+    def prepareOutputFile(self, filePath):
+        """ Create the folder of the file if needed and make the file writable if it already exists
+        """
+        folderPath = Path(filePath).parent
+        if folderPath.exists():
+            if Path(filePath).exists():
+                stat = Path(filePath).stat()
+                fileIsReadOnly = S_IMODE(stat.st_mode) & S_IWRITE == 0
+                if fileIsReadOnly:
+                    os.chmod(filePath, 0o666)
+        else:
+            try:
+                os.makedirs(folderPath)
+            except OSError:
+                print("Creation of the directory %s failed" % folderPath)
+
+    def writeManifest(self, scene, results):
+        """ Write the list of the exported files, with their status and export time, in the output directory
+        """
+        manifest = {
+            "scene": scene.name,
+            "blend_file": bpy.data.filepath,
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "exports": results,
+        }
+        manifestFile = self.outputDir + "/export_manifest.json"
+        with open(manifestFile, "w") as f:
+            json.dump(manifest, f, indent=4)
+        print(f"   Export manifest written: {manifestFile}")
 
     def execute(self, context):
         scene = context.scene
@@ -379,39 +500,100 @@ class UAS_VideoTracks_OT_ExportContentbetweenMarkers(Operator):
         scene.render.use_file_extension = False
 
         markers = utils_markers.sortMarkers(scene.timeline_markers)
+        segments = self.getSegments(markers)
+        exportResults = list()
 
-        # print(f"markers: {markers}")
+        segmentExports = list()
         if self.exportAsVideoFiles:
-            print("\n * Exporting video files:")
-            for i, mrk in enumerate(markers):
-                if self.start <= markers[i].frame <= self.end:
-                    if i < len(markers) - 1:
-                        if self.start <= markers[i + 1].frame <= self.end:
-                            #    print(f"{i} Marker name: {mrk.name}")
-                            scene.frame_start = markers[i].frame
-                            scene.frame_end = markers[i + 1].frame - 1
-                            scene.render.filepath = self.outputDir + "/" + mrk.name + ".mp4"
-                            bpy.ops.render.opengl(animation=True, sequencer=True)
+            for name, segmentStart, segmentEnd in segments:
+                segmentExports.append(
+                    {
+                        "name": f"{name} video",
+                        "type": "VIDEO",
+                        "frame_start": segmentStart,
+                        "frame_end": segmentEnd,
+                        "output": self.outputDir + "/" + name + ".mp4",
+                    }
+                )
+        if self.exportAsAudioFiles:
+            for name, segmentStart, segmentEnd in segments:
+                segmentExports.append(
+                    {
+                        "name": f"{name} audio",
+                        "type": "AUDIO",
+                        "frame_start": segmentStart,
+                        "frame_end": segmentEnd,
+                        "output": self.outputDir + "/" + name + ".mp3",
+                    }
+                )
 
-        ######
-        # Export audios
+        # segments whose content has not changed since their last export are skipped
+        renderHashes = dict()
+        segmentsToExport = list()
+        stripsHashInfo = utils_render.getSequencerStripsHashInfo(scene) if len(segmentExports) else None
+        for segmentExport in segmentExports:
+            renderHash = utils_render.getSequencerRangeHash(
+                scene,
+                segmentExport["frame_start"],
+                segmentExport["frame_end"],
+                extraInfo=segmentExport["type"],
+                stripsHashInfo=stripsHashInfo,
+            )
+            renderHashes[segmentExport["output"]] = renderHash
+            if self.useRenderCache and utils_render.isRenderUpToDate(segmentExport["output"], renderHash):
+                exportResults.append(
+                    {
+                        "name": segmentExport["name"],
+                        "output": segmentExport["output"],
+                        "status": "SKIPPED",
+                        "attempts": 0,
+                        "duration": 0.0,
+                    }
+                )
+            else:
+                segmentsToExport.append(segmentExport)
 
-        if self.exportAsAudioFiles:
-            for i, mrk in enumerate(markers):
-                if self.start <= markers[i].frame <= self.end:
-                    #   print(f"{i} if 01 - Marker name: {mrk.name}")
-                    if i < len(markers) - 1:
-                        #       print(f"{i} if 02 - Marker name: {mrk.name}, {self.start}, {markers[i + 1].frame}, {self.end}")
-                        if self.start <= markers[i + 1].frame <= self.end:
-                            #    print(f"{i} Marker name: {mrk.name}")
-                            scene.frame_start = markers[i].frame
-                            scene.frame_end = markers[i + 1].frame - 1
-                            # https://blenderartists.org/t/scripterror-mixdown-operstor/548056/4
-                            # bpy.ops.sound.mixdown(filepath=str(audioFilePath), relative_path=False, container="WAV", codec="PCM", bitrate=192)
-                            audioFilePath = self.outputDir + "/" + mrk.name + ".mp3"
-                            bpy.ops.sound.mixdown(
-                                filepath=audioFilePath, relative_path=False, container="MP3", codec="MP3"
-                            )
+        if len(segmentExports):
+            print(
+                f"\n * Exporting {len(segmentsToExport)} segment file(s),"
+                f" {len(segmentExports) - len(segmentsToExport)} up to date file(s) skipped"
+            )
+
+        # print(f"markers: {markers}")
+        if self.useBackgroundWorkers and len(segmentsToExport):
+            print(" * Using background processes:")
+            exportResults += self.exportSegmentsWithWorkers(scene, segmentsToExport)
+
+        else:
+            for segmentExport in segmentsToExport:
+                scene.frame_start = segmentExport["frame_start"]
+                scene.frame_end = segmentExport["frame_end"]
+                output = segmentExport["output"]
+                # removed first so that a failed render cannot leave a previous file taken for the new one
+                self.prepareOutputFile(output)
+                if os.path.exists(output):
+                    os.remove(output)
+                startTime = time.monotonic()
+                if "VIDEO" == segmentExport["type"]:
+                    scene.render.filepath = output
+                    bpy.ops.render.opengl(animation=True, sequencer=True)
+                else:
+                    # https://blenderartists.org/t/scripterror-mixdown-operstor/548056/4
+                    # bpy.ops.sound.mixdown(filepath=str(audioFilePath), relative_path=False, container="WAV", codec="PCM", bitrate=192)
+                    bpy.ops.sound.mixdown(filepath=output, relative_path=False, container="MP3", codec="MP3")
+                exportResults.append(
+                    {
+                        "name": segmentExport["name"],
+                        "output": output,
+                        "status": "DONE" if os.path.exists(output) else "FAILED",
+                        "attempts": 1,
+                        "duration": time.monotonic() - startTime,
+                    }
+                )
+
+        for res in exportResults:
+            if "DONE" == res["status"]:
+                utils_render.writeRenderHash(res["output"], renderHashes[res["output"]])
 
         ######
         # Export Sound Tracks
@@ -422,6 +604,9 @@ class UAS_VideoTracks_OT_ExportContentbetweenMarkers(Operator):
             for t in tracks:
                 t.enabled = False
 
+            soundtrackSegments = self.getSegments(markers, endTolerance=1)
+            fps = scene.render.fps / scene.render.fps_base
+
             for t in tracks:
                 if (
                     t.get_name() == "SFX"
@@ -431,55 +616,122 @@ class UAS_VideoTracks_OT_ExportContentbetweenMarkers(Operator):
                 ):
                     t.enabled = True
 
-                    # print(f" Len markers: {len(markers)}")
-                    for i, mrk in enumerate(markers):
-                        if self.start <= markers[i].frame <= self.end:
-                            #       print(f"{i} if 01 - Marker name: {mrk.name}")
-                            if i < len(markers) - 1:
-                                # print(
-                                #     f"{i} if 02 - Marker name: {mrk.name}, {self.start}, {markers[i + 1].frame}, {self.end}"
-                                # )
-                                if self.start <= markers[i + 1].frame <= self.end + 1:
-                                    #   print(f"{i} Marker 3 name: {mrk.name}")
-                                    scene.frame_start = markers[i].frame
-                                    scene.frame_end = markers[i + 1].frame - 1
-                                    # https://blenderartists.org/t/scripterror-mixdown-operstor/548056/4
-                                    # bpy.ops.sound.mixdown(filepath=str(audioFilePath), relative_path=False, container="WAV", codec="PCM", bitrate=192)
-                                    seqName = mrk.name[0:13]
-                                    audioFile = f"C:/_UAS_ROOT/RRSpecial/05_Acts/Act01/{seqName}/_Exports/Sound/{mrk.name}_{t.get_name()}.wav"
-
-                                    audioFilePath = Path(audioFile).parent
-                                    if Path(audioFilePath).exists():
-                                        # print(f"Path Ok: {audioFilePath}")
-                                        pass
-                                        if Path(audioFile).exists():
-                                            stat = Path(audioFile).stat()
-                                            #   print(f"Blender file Stats: {stat.st_mode}")
-                                            fileIsReadOnly = S_IMODE(stat.st_mode) & S_IWRITE == 0
-                                            if fileIsReadOnly:
-                                                os.chmod(audioFile, 0o666)
-
-                                    else:
-                                        # print(f"Path not found: {audioFilePath}")
-                                        try:
-                                            os.makedirs(audioFilePath)
-                                        except OSError:
-                                            print("Creation of the directory %s failed" % audioFilePath)
-                                        else:
-                                            # print("Successfully created the directory %s" % audioFilePath)
-                                            pass
-
-                                    print(f"Exporting audioFile: {audioFile}")
-
-                                    bpy.ops.sound.mixdown(
-                                        filepath=audioFile, relative_path=False, container="WAV",
+                    audioFiles = list()
+                    audioHashes = list()
+                    # described once the track is enabled since the state of the tracks changes the strips
+                    stripsHashInfo = utils_render.getSequencerStripsHashInfo(scene)
+                    for name, segmentStart, segmentEnd in soundtrackSegments:
+                        seqName = name[0:13]
+                        audioFile = f"C:/_UAS_ROOT/RRSpecial/05_Acts/Act01/{seqName}/_Exports/Sound/{name}_{t.get_name()}.wav"
+                        self.prepareOutputFile(audioFile)
+                        audioFiles.append(audioFile)
+                        audioHashes.append(
+                            utils_render.getSequencerRangeHash(
+                                scene, segmentStart, segmentEnd, extraInfo="SOUNDTRACK", stripsHashInfo=stripsHashInfo
+                            )
+                        )
+
+                    upToDateFiles = [
+                        audioFile
+                        for audioFile, audioHash in zip(audioFiles, audioHashes)
+                        if self.useRenderCache and utils_render.isRenderUpToDate(audioFile, audioHash)
+                    ]
+                    # the files to export are removed first so that a failed mixdown cannot leave a previous file
+                    # that would be taken for the new one
+                    filesToExport = [audioFile for audioFile in audioFiles if audioFile not in upToDateFiles]
+                    for audioFile in filesToExport:
+                        if os.path.exists(audioFile):
+                            os.remove(audioFile)
+                    startTime = time.monotonic()
+
+                    if not len(filesToExport):
+                        print(f"Sound track {t.get_name()} is up to date, skipped")
+
+                    elif self.soundtracksSingleMixdown and len(soundtrackSegments):
+                        # the whole range of the segments is mixed once, then sliced at each segment boundary
+                        rangeStart = soundtrackSegments[0][1]
+                        scene.frame_start = rangeStart
+                        scene.frame_end = soundtrackSegments[-1][2]
+                        tempDir = tempfile.mkdtemp(prefix="videotracks_soundtrack_")
+                        try:
+                            mixdownFile = os.path.join(tempDir, "mixdown.wav")
+                            print(f"Mixing down track {t.get_name()}")
+                            # 16 bits PCM so that the file can be read by the wave module
+                            bpy.ops.sound.mixdown(
+                                filepath=mixdownFile, relative_path=False, container="WAV", codec="PCM", format="S16",
+                            )
+
+                            slices = list()
+                            for audioFile, (name, segmentStart, segmentEnd) in zip(audioFiles, soundtrackSegments):
+                                if audioFile in filesToExport:
+                                    slices.append(
+                                        (
+                                            audioFile,
+                                            (segmentStart - rangeStart) / fps,
+                                            (segmentEnd + 1 - rangeStart) / fps,
+                                        )
                                     )
+                            utils_media.sliceWavFile(mixdownFile, slices)
+                        except (RuntimeError, OSError, wave.Error) as e:
+                            print(f"*** Mix down of sound track {t.get_name()} failed: {e} ***")
+                        finally:
+                            shutil.rmtree(tempDir, ignore_errors=True)
+
+                    else:
+                        for audioFile, (name, segmentStart, segmentEnd) in zip(audioFiles, soundtrackSegments):
+                            if audioFile not in filesToExport:
+                                continue
+                            scene.frame_start = segmentStart
+                            scene.frame_end = segmentEnd
+                            # https://blenderartists.org/t/scripterror-mixdown-operstor/548056/4
+                            # bpy.ops.sound.mixdown(filepath=str(audioFilePath), relative_path=False, container="WAV", codec="PCM", bitrate=192)
+                            print(f"Exporting audioFile: {audioFile}")
+
+                            try:
+                                bpy.ops.sound.mixdown(
+                                    filepath=audioFile, relative_path=False, container="WAV",
+                                )
+                            except RuntimeError as e:
+                                print(f"*** Mix down of {audioFile} failed: {e} ***")
+
+                    # the hash of a file is written only once the file has been exported
+                    duration = time.monotonic() - startTime
+                    for audioFile, audioHash in zip(audioFiles, audioHashes):
+                        if audioFile in upToDateFiles:
+                            status = "SKIPPED"
+                        else:
+                            status = "DONE" if os.path.exists(audioFile) else "FAILED"
+                            utils_render.writeRenderHash(audioFile, audioHash if "DONE" == status else None)
+                            if "DONE" == status:
+                                print(f"Exported audioFile: {audioFile}")
+                        exportResults.append(
+                            {
+                                "name": f"{Path(audioFile).stem} sound track",
+                                "output": audioFile,
+                                "status": status,
+                                "attempts": 0 if "SKIPPED" == status else 1,
+                                "duration": 0.0 if "SKIPPED" == status else duration,
+                            }
+                        )
 
                     print("")
                     t.enabled = False
 
         context.scene.frame_start = self.start
         context.scene.frame_end = self.end
+
+        if len(exportResults):
+            self.writeManifest(scene, exportResults)
+            numSkipped = len([res for res in exportResults if "SKIPPED" == res["status"]])
+            print(f"   {len(exportResults) - numSkipped} file(s) exported, {numSkipped} up to date file(s) skipped")
+            for res in exportResults:
+                print(f"     - {res['status']}: {res['output']}")
+            numFailed = len([res for res in exportResults if "FAILED" == res["status"]])
+            if numFailed:
+                self.report(
+                    {"WARNING"}, f"{numFailed} segment export(s) failed, see {self.outputDir}/export_manifest.json"
+                )
+
         print(f"\n * Export content between markers done to {self.outputDir}\n")
 
         return {"FINISHED"}
@@ -586,6 +838,7 @@ class UAS_VideoTracks_OT_ClearClips(Operator):
         vsm_scene = bpy.context.scene
         vsm_scene.sequence_editor_clear()
         vsm_scene.sequence_editor_create()
+        utils_vse.invalidateChannelsIndex(vsm_scene)
 
         for area in bpy.context.screen.areas:
             if area.type == "SEQUENCE_EDITOR":
@@ -0,0 +1,229 @@
+# GPLv3 License
+#
+# Copyright (C) 2021 Ubisoft
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Headless import of several sequences of an EDL file, each sequence being imported into its own .blend file by a
+background Blender process
+
+Usage, the Video Tracks add-on being enabled in the user preferences:
+    blender -b [template.blend] --python-expr "from videotracks.otio import batch_import; batch_import.main()" --
+        --edl myEdit.xml --sequences all --output-dir myFolder [--workers 4] [--import-at-frame 25]
+        [--media-folder myMediaFolder]
+
+--sequences is either "all" or a comma separated list of sequence names, as found in the media names of the EDL
+A summary of the imports (status, timings and media not found) is written into batch_import_summary.json in the
+output folder, with the output of the Blender processes of the failed imports in <sequence name>.log
+"""
+
+import os
+import argparse
+import json
+from pathlib import Path
+import shutil
+import sys
+import tempfile
+import time
+
+import bpy
+
+from videotracks.utils import utils_render
+from videotracks.utils.utils_media import MediaRelocationIndex
+
+from . import imports
+from . import otio_wrapper as ow
+
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+# Python code run by each background worker
+_workerImportScript = """
+from videotracks.otio import batch_import
+batch_import.importSequenceToBlendFile(
+    {edlFile!r}, {sequenceName!r}, {outputFile!r}, importAtFrame={importAtFrame}, mediaFolder={mediaFolder!r}
+)
+"""
+
+
+def getSequenceFrameRange(timeline, sequenceName):
+    """ Return the frame range [start, end] (end inclusive) of the video clips of the timeline using the media of the
+        specified sequence, None if the sequence is not found
+        The sequence name is the second part of the media file names, as in imports.getSequenceListFromOtioTimeline()
+    """
+    manifest = ow.get_timeline_media_manifest(timeline)
+    frameStart = None
+    frameEnd = None
+    for media_path in manifest.get_media_list(track_type="VIDEO"):
+        if media_path is None:
+            continue
+        itemSplited = os.path.splitext(os.path.split(media_path)[1])[0].split("_")
+        if len(itemSplited) < 2 or itemSplited[1] != sequenceName:
+            continue
+        for track, clip_index, clip, start, end in manifest.get_occurences(media_path):
+            if "Video" != track.kind:
+                continue
+            frameStart = start if frameStart is None else min(frameStart, start)
+            frameEnd = end if frameEnd is None else max(frameEnd, end)
+
+    return None if frameStart is None else [frameStart, frameEnd]
+
+
+def importSequenceToBlendFile(edlFile, sequenceName, outputFile, importAtFrame=25, mediaFolder=""):
+    """ Import the edit of the specified sequence in the VSE of the current scene and save the file as outputFile
+        A report with the timings and the media not found is written next to outputFile, with the .json extension
+        Used by the background workers of batchImportSequences()
+    """
+    startTime = time.monotonic()
+    report = {"sequence": sequenceName, "output": outputFile, "missing_media": list()}
+
+    timeline = ow.get_timeline_from_file(edlFile)
+    report["load_duration"] = time.monotonic() - startTime
+
+    timeRange = getSequenceFrameRange(timeline, sequenceName)
+    if timeRange is None:
+        raise ValueError(f"Sequence {sequenceName} not found in {edlFile}")
+
+    scene = bpy.context.scene
+    if scene.sequence_editor is None:
+        scene.sequence_editor_create()
+
+    importStartTime = time.monotonic()
+    relocationIndex = MediaRelocationIndex([mediaFolder if "" != mediaFolder else str(Path(edlFile).parent)])
+    imports.importToVSE(
+        timeline,
+        scene.sequence_editor,
+        timeRange=timeRange,
+        offsetFrameNumber=importAtFrame - timeRange[0],
+        relocationIndex=relocationIndex,
+    )
+    report["import_duration"] = time.monotonic() - importStartTime
+    report["missing_media"] = list(relocationIndex.unresolvedMedia)
+
+    scene.frame_start = importAtFrame
+    scene.frame_end = importAtFrame + timeRange[1] - timeRange[0]
+    scene.name = sequenceName
+
+    Path(outputFile).parent.mkdir(parents=True, exist_ok=True)
+    bpy.ops.wm.save_as_mainfile(filepath=outputFile)
+    report["duration"] = time.monotonic() - startTime
+
+    with open(os.path.splitext(outputFile)[0] + ".json", "w") as f:
+        json.dump(report, f, indent=4)
+
+
+def batchImportSequences(edlFile, sequences, outputDir, numWorkers=0, importAtFrame=25, mediaFolder="", maxRetries=0):
+    """ Import each of the specified sequences of the EDL file into its own .blend file, in outputDir, with a pool of
+        background Blender processes
+        sequences: list of sequence names, or "all" for all the sequences of the EDL file
+        The workers open the current file, written into a temporary file, so it can be used as a template
+        Return the summary of the imports, also written into batch_import_summary.json in outputDir
+    """
+    startTime = time.monotonic()
+    edlFile = os.path.abspath(edlFile)
+    outputDir = os.path.abspath(outputDir)
+    Path(outputDir).mkdir(parents=True, exist_ok=True)
+
+    if "all" == sequences:
+        sequences = imports.getSequenceListFromOtio(edlFile)
+    # the EDL is parsed once here so that the workers find it in the disk cache of the timelines
+    ow.get_timeline_from_file(edlFile)
+
+    print(f"\nBatch import of {len(sequences)} sequence(s) from {edlFile}")
+
+    jobs = list()
+    for sequenceName in sequences:
+        outputFile = os.path.join(outputDir, f"{sequenceName}.blend")
+        jobs.append(
+            {
+                "name": sequenceName,
+                "output": outputFile,
+                "script": _workerImportScript.format(
+                    edlFile=edlFile,
+                    sequenceName=sequenceName,
+                    outputFile=outputFile,
+                    importAtFrame=importAtFrame,
+                    mediaFolder=mediaFolder,
+                ),
+            }
+        )
+
+    # the logs are written in the temporary folder, only the ones of the failed jobs are kept in outputDir
+    with tempfile.TemporaryDirectory() as tempDir:
+        templateFile = os.path.join(tempDir, "batch_import_template.blend")
+        utils_render.writeBlendFileForJobs(bpy.context.scene, templateFile)
+        results = utils_render.runBlenderJobs(
+            templateFile, jobs, sceneName=bpy.context.scene.name, numWorkers=numWorkers, maxRetries=maxRetries,
+        )
+        for result in results:
+            if "FAILED" == result["status"] and os.path.exists(result["log"]):
+                logFile = os.path.join(outputDir, f"{result['name']}.log")
+                shutil.copyfile(result["log"], logFile)
+                result["log"] = logFile
+            else:
+                result["log"] = None
+
+    summary = {"edl": edlFile, "duration": 0.0, "sequences": list()}
+    for result in results:
+        reportFile = os.path.splitext(result["output"])[0] + ".json"
+        if "DONE" == result["status"] and os.path.exists(reportFile):
+            with open(reportFile, "r") as f:
+                result.update(json.load(f))
+        summary["sequences"].append(result)
+    summary["duration"] = time.monotonic() - startTime
+
+    with open(os.path.join(outputDir, "batch_import_summary.json"), "w") as f:
+        json.dump(summary, f, indent=4)
+
+    print(f"\nBatch import done in {summary['duration']:.1f}s:")
+    for result in summary["sequences"]:
+        print(f"   - {result['name']}: {result['status']}, {result['duration']:.1f}s")
+        if result["log"] is not None:
+            print(f"       Log: {result['log']}")
+        for mediaPath in result.get("missing_media", list()):
+            print(f"       *** Media not found: {mediaPath}")
+
+    return summary
+
+
+def main():
+    """ Entry point of the command line usage described in the module documentation
+    """
+    argv = sys.argv[sys.argv.index("--") + 1 :] if "--" in sys.argv else list()
+    parser = argparse.ArgumentParser(description="Import sequences of an EDL file into .blend files")
+    parser.add_argument("--edl", required=True, help="EDL file (Final Cut XML, OTIO...)")
+    parser.add_argument("--sequences", default="all", help='"all" or a comma separated list of sequence names')
+    parser.add_argument("--output-dir", required=True, help="Folder of the created .blend files")
+    parser.add_argument("--workers", type=int, default=0, help="Number of Blender processes, 0 for the CPU count")
+    parser.add_argument("--import-at-frame", type=int, default=25, help="Frame at which the sequences start")
+    parser.add_argument("--media-folder", default="", help="Folder where the missing media are searched")
+    parser.add_argument("--retries", type=int, default=0, help="Number of times a failed import is run again")
+    args = parser.parse_args(argv)
+
+    sequences = "all" if "all" == args.sequences else [s.strip() for s in args.sequences.split(",") if s.strip()]
+    summary = batchImportSequences(
+        args.edl,
+        sequences,
+        args.output_dir,
+        numWorkers=args.workers,
+        importAtFrame=args.import_at_frame,
+        mediaFolder=args.media_folder,
+        maxRetries=args.retries,
+    )
+
+    if any("DONE" != result["status"] for result in summary["sequences"]):
+        sys.exit(1)
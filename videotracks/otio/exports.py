@@ -24,9 +24,8 @@ from pathlib import Path
 import bpy
 import opentimelineio
 
-from xml.dom.minidom import parse
+from xml.sax.saxutils import escape
 
-from videotracks.utils import utils_xml
 from videotracks import display_version
 
 import logging
@@ -34,6 +33,73 @@ import logging
 _logger = logging.getLogger(__name__)
 
 
+def getEditCharacteristicsXML(montageCharacteristics):
+    """ Return the <format> XML node describing the sequence and video characteristics of the montage, as a string
+    """
+    return (
+        "<format><samplecharacteristics>"
+        f"<rate><timebase>{escape(str(montageCharacteristics['framerate']))}</timebase><ntsc>FALSE</ntsc></rate>"
+        f"<width>{escape(str(montageCharacteristics['resolution_x']))}</width>"
+        f"<height>{escape(str(montageCharacteristics['resolution_y']))}</height>"
+        "<anamorphic>FALSE</anamorphic>"
+        "<pixelaspectratio>square</pixelaspectratio>"
+        "<fielddominance>none</fielddominance>"
+        "<colordepth>24</colordepth>"
+        "</samplecharacteristics></format>"
+    )
+
+
+def writeFcpXmlWithEditCharacteristics(timeline, xml_filename, montageCharacteristics):
+    """ Write the timeline to a Final Cut XML file, with the edit characteristics added to the video media of the
+        sequence
+        The XML text produced by the adapter is written in a single pass, the characteristics being inserted while
+        writing instead of re-parsing the written file
+    """
+    xmlStr = opentimelineio.adapters.write_to_string(timeline, adapter_name="fcp_xml")
+
+    insertInd = -1
+    if montageCharacteristics is None:
+        print("  *** Exporting edit XML: No characteristics found for the montage")
+    else:
+        # the media of the sequence is before its tracks, so its video node is the first one found after it
+        seqInd = xmlStr.find("<sequence")
+        mediaInd = -1 if -1 == seqInd else xmlStr.find("<media>", seqInd)
+        videoInd = -1 if -1 == mediaInd else xmlStr.find("<video>", mediaInd)
+        if -1 != videoInd:
+            insertInd = videoInd + len("<video>")
+
+    with open(xml_filename, "w") as f:
+        if -1 == insertInd:
+            f.write(xmlStr)
+        else:
+            f.write(xmlStr[:insertInd])
+            f.write(getEditCharacteristicsXML(montageCharacteristics))
+            f.write(xmlStr[insertInd:])
+
+
+def exportShotManagerTakesToOtio(scene, takeIndices=None, filePath="", fps=-1, fileListOnly=False):
+    """ Create an OpenTimelineIO XML file for each of the specified takes, all the takes if takeIndices is None
+        The takes are exported one after the other so that only one timeline is kept in memory at a time
+        Return the list of the file paths of the created files
+    """
+    props = scene.UAS_shot_manager_props
+    montageCharacteristics = props.get_montage_characteristics()
+    if takeIndices is None:
+        takeIndices = range(len(props.takes))
+
+    return [
+        exportShotManagerEditToOtio(
+            scene,
+            takeIndex=takeIndex,
+            filePath=filePath,
+            fps=fps,
+            fileListOnly=fileListOnly,
+            montageCharacteristics=montageCharacteristics,
+        )
+        for takeIndex in takeIndices
+    ]
+
+
 def exportShotManagerEditToOtio(
     scene,
     takeIndex=-1,
@@ -50,97 +116,13 @@ def exportShotManagerEditToOtio(
         seqCharacteristics and videoCharacteristics are dictionaries from the Montage_Otio
     """
 
-    def _addEditCharacteristicsToXML(xml_filename, montageCharacteristics):
-
-        if montageCharacteristics is None:
-            print("  *** Exporting edit XML: _addEditCharacteristicsToXML: No characteristics found for the montage")
-            return ()
-
-        filename = xml_filename
-
-        dom1 = parse(filename)
-
-        seq = dom1.getElementsByTagName("sequence")[0]
-
-        seqMedia = None
-        seqMediaVideo = None
-
-        seqMedia = utils_xml.getFirstChildWithName(seq, "media")
-        if seqMedia is not None:
-            seqMediaVideo = utils_xml.getFirstChildWithName(seqMedia, "video")
-            print(f"seqMediaVideo: {seqMediaVideo}")
-
-            # sequence characteristics
-            newNodeFormat = dom1.createElement("format")
-            newNodeCharact = dom1.createElement("samplecharacteristics")
-            newNodeFormat.appendChild(newNodeCharact)
-
-            newNodeRate = dom1.createElement("rate")
-
-            newNodeTimebase = dom1.createElement("timebase")
-            nodeText = dom1.createTextNode(str(montageCharacteristics["framerate"]))
-            newNodeTimebase.appendChild(nodeText)
-            newNodeRate.appendChild(newNodeTimebase)
-            newNodeNtsc = dom1.createElement("ntsc")
-            nodeText = dom1.createTextNode("FALSE")
-            newNodeNtsc.appendChild(nodeText)
-            newNodeRate.appendChild(newNodeNtsc)
-
-            newNodeCharact.appendChild(newNodeRate)
-
-            # video characteristics
-            newNode = dom1.createElement("width")
-            nodeText = dom1.createTextNode(str(montageCharacteristics["resolution_x"]))
-            newNode.appendChild(nodeText)
-            newNodeCharact.appendChild(newNode)
-
-            newNode = dom1.createElement("height")
-            nodeText = dom1.createTextNode(str(montageCharacteristics["resolution_y"]))
-            newNode.appendChild(nodeText)
-            newNodeCharact.appendChild(newNode)
-
-            newNode = dom1.createElement("anamorphic")
-            nodeText = dom1.createTextNode("FALSE")
-            newNode.appendChild(nodeText)
-            newNodeCharact.appendChild(newNode)
-
-            newNode = dom1.createElement("pixelaspectratio")
-            nodeText = dom1.createTextNode("square")
-            newNode.appendChild(nodeText)
-            newNodeCharact.appendChild(newNode)
-
-            newNode = dom1.createElement("fielddominance")
-            nodeText = dom1.createTextNode("none")
-            newNode.appendChild(nodeText)
-            newNodeCharact.appendChild(newNode)
-
-            newNode = dom1.createElement("colordepth")
-            nodeText = dom1.createTextNode("24")
-            newNode.appendChild(nodeText)
-            newNodeCharact.appendChild(newNode)
-
-            seqMediaVideo.insertBefore(newNodeFormat, seqMediaVideo.firstChild)
-
-        # print(f"dom1.toxml(): {dom1.toprettyxml()}")
-        print(f"dom1.toxml(): {dom1.toxml()}")
-
-        file_handle = open(filename, "w")
-
-        dom1.writexml(file_handle)
-        # # print(f"dom1.toxml(): {dom1.toxml()}")
-        # # file_handle.write(dom1.toxml())
-
-        file_handle.close()
-        dom1.unlink()
-
-        return ()
-
     print("  ** -- ** exportShotManagerEditToOtio from exports.py, fileListOnly: ", fileListOnly)
     props = scene.UAS_shot_manager_props
     sceneFps = fps if fps != -1 else scene.render.fps
     #   import opentimelineio as opentimelineio
 
-    montageCharacteristics = props.get_montage_characteristics()
+    if montageCharacteristics is None:
+        montageCharacteristics = props.get_montage_characteristics()
 
     take = props.getCurrentTake() if -1 == takeIndex else props.getTakeByIndex(takeIndex)
     shotList = take.getShotList(ignoreDisabled=True)
@@ -273,16 +255,8 @@ def exportShotManagerEditToOtio(
     audioTrack.extend(audioClips)
 
     Path(otioRenderPath).parent.mkdir(parents=True, exist_ok=True)
-    print("Ici")
     if otioRenderPath.endswith(".xml"):
-        print("Ici 02 ")
-        opentimelineio.adapters.write_to_file(timeline, otioRenderPath, adapter_name="fcp_xml")
-
-        print("Ici 03 ")
-        montageCharacteristics = props.get_montage_characteristics()
-        _addEditCharacteristicsToXML(otioRenderPath, montageCharacteristics)
-
-        print("Ici 04 ")
+        writeFcpXmlWithEditCharacteristics(timeline, otioRenderPath, montageCharacteristics)
     else:
         opentimelineio.adapters.write_to_file(timeline, otioRenderPath)
 
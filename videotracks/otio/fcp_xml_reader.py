@@ -0,0 +1,210 @@
+# GPLv3 License
+#
+# Copyright (C) 2021 Ubisoft
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Streaming reader for Final Cut Pro 7 XML edit files
+
+Contrary to the OpenTimelineIO adapter, the file is read with iterparse and each clip is returned as a lightweight
+record as soon as it has been read, its XML element being released right after, so that the memory used does not
+depend on the size of the edit.
+Only the clips of the tracks of the main sequence are read, nested sequences are ignored.
+"""
+
+import os
+from xml.etree import ElementTree
+
+from ..utils import utils
+
+
+class FcpClipRecord:
+    """ Clip of a Final Cut XML track
+        Times are in frames at the rate of the clip:
+            - start, end: range of the clip in the track, end exclusive
+            - source_in, source_out: range of the media used by the clip, source_out exclusive
+            - media_duration: duration of the media, -1 if unknown
+        track_index starts at 1, as the indices used by imports.importToVSE()
+        keyframes is a list of (frame, volume value) tupples, frame being relative to the clip start
+    """
+
+    __slots__ = (
+        "track_type",
+        "track_index",
+        "name",
+        "media_url",
+        "media_duration",
+        "fps",
+        "start",
+        "end",
+        "source_in",
+        "source_out",
+        "enabled",
+        "volume",
+        "keyframes",
+    )
+
+    def __init__(self, track_type, track_index):
+        self.track_type = track_type
+        self.track_index = track_index
+        self.name = ""
+        self.media_url = None
+        self.media_duration = -1
+        self.fps = 25
+        self.start = 0
+        self.end = 0
+        self.source_in = 0
+        self.source_out = 0
+        self.enabled = True
+        self.volume = None
+        self.keyframes = list()
+
+    def get_media_path(self):
+        return None if self.media_url is None else utils.file_path_from_url(self.media_url)
+
+    def __repr__(self):
+        return (
+            f"FcpClipRecord({self.track_type} {self.track_index}, {self.name}, [{self.start}, {self.end}[,"
+            f" media: {self.media_url})"
+        )
+
+
+def _get_int(elem, tag, default=0):
+    text = elem.findtext(tag)
+    try:
+        return int(float(text)) if text is not None else default
+    except ValueError:
+        return default
+
+
+def iter_fcp_xml_clips(xmlFile, track_type="ALL"):
+    """ Generator yielding a FcpClipRecord for each clip of the tracks of the main sequence of the Final Cut XML file,
+        track after track and in the track order
+        track_type can be "ALL", "VIDEO" or "AUDIO"
+    """
+    # media of the file elements by id, since a file is fully described only the first time it is used
+    filesInfo = dict()
+    sequenceFps = 25
+    # stack of the opened elements
+    elemStack = list()
+    trackIndices = {"VIDEO": 0, "AUDIO": 0}
+    currentTrackType = None
+    previousClipEnd = 0
+
+    for event, elem in ElementTree.iterparse(xmlFile, events=("start", "end")):
+        if "start" == event:
+            elemStack.append(elem)
+            if "track" == elem.tag and 2 <= len(elemStack) and 1 == _count_sequences(elemStack):
+                currentTrackType = "VIDEO" if "video" == elemStack[-2].tag else "AUDIO"
+                trackIndices[currentTrackType] += 1
+                previousClipEnd = 0
+            continue
+
+        elemStack.pop()
+        parent = elemStack[-1] if len(elemStack) else None
+        numSequences = _count_sequences(elemStack)
+
+        if "rate" == elem.tag and parent is not None and "sequence" == parent.tag and 1 == numSequences:
+            sequenceFps = _get_int(elem, "timebase", sequenceFps)
+
+        elif "file" == elem.tag and elem.get("id") is not None and elem.find("pathurl") is not None:
+            filesInfo[elem.get("id")] = (elem.findtext("pathurl"), _get_int(elem, "duration", -1))
+
+        elif "clipitem" == elem.tag and parent is not None and "track" == parent.tag and 1 == numSequences:
+            if "ALL" == track_type or currentTrackType == track_type:
+                record = _read_clip_record(elem, currentTrackType, trackIndices[currentTrackType], filesInfo)
+                if -1 == record.fps:
+                    record.fps = sequenceFps
+                # -1 is used by Final Cut when the clip boundary is a transition
+                if -1 == record.start:
+                    record.start = previousClipEnd
+                if -1 == record.end:
+                    record.end = record.start + record.source_out - record.source_in
+                previousClipEnd = record.end
+                yield record
+
+        # released elements are removed from their parent so that the tree does not grow
+        if elem.tag in ("clipitem", "track", "transitionitem", "generatoritem"):
+            elem.clear()
+            if parent is not None:
+                parent.remove(elem)
+
+
+def _count_sequences(elemStack):
+    return len([e for e in elemStack if "sequence" == e.tag])
+
+
+def _read_clip_record(elem, track_type, track_index, filesInfo):
+    record = FcpClipRecord(track_type, track_index)
+    record.name = elem.findtext("name", "")
+    record.enabled = "FALSE" != elem.findtext("enabled", "TRUE").upper()
+    record.fps = _get_int(elem, "rate/timebase", -1)
+    record.start = _get_int(elem, "start")
+    record.end = _get_int(elem, "end")
+    record.source_in = _get_int(elem, "in")
+    record.source_out = _get_int(elem, "out")
+
+    fileElem = elem.find("file")
+    if fileElem is not None:
+        if fileElem.find("pathurl") is not None:
+            record.media_url = fileElem.findtext("pathurl")
+            record.media_duration = _get_int(fileElem, "duration", -1)
+        elif fileElem.get("id") in filesInfo:
+            record.media_url, record.media_duration = filesInfo[fileElem.get("id")]
+
+    for effect in elem.iterfind("filter/effect"):
+        if "audiolevels" != effect.findtext("effectcategory"):
+            continue
+        parameter = effect.find("parameter")
+        if parameter is None:
+            continue
+        if parameter.find("value") is not None:
+            record.volume = float(parameter.findtext("value"))
+        for keyframe in parameter.iterfind("keyframe"):
+            when = int(float(keyframe.findtext("when", "0")))
+            record.keyframes.append((when, float(keyframe.findtext("value", "1"))))
+
+    return record
+
+
+def get_media_list_from_fcp_xml(xmlFile, track_type="ALL"):
+    """ Return the list of the media paths used by the clips of the Final Cut XML file, in their order of first use
+        track_type can be "ALL", "VIDEO" or "AUDIO"
+    """
+    # dictionary used as an ordered set
+    media_list = dict()
+    for record in iter_fcp_xml_clips(xmlFile, track_type=track_type):
+        media_list[record.get_media_path()] = True
+    return list(media_list)
+
+
+def get_sequence_list_from_fcp_xml(xmlFile):
+    """ Return the list of the sequence names found in the names of the video media of the Final Cut XML file
+        See imports.getSequenceListFromOtioTimeline()
+    """
+    seq_list = dict()
+    for media_path in get_media_list_from_fcp_xml(xmlFile, track_type="VIDEO"):
+        if media_path is None:
+            continue
+        file_name = os.path.splitext(os.path.split(media_path)[1])[0]
+        if "_seq" in file_name.lower():
+            itemSplited = file_name.split("_")
+            if 2 <= len(itemSplited):
+                seq_list[itemSplited[1]] = True
+    return list(seq_list)
+
+
+def is_fcp_xml_file(filePath):
+    return ".xml" == os.path.splitext(filePath)[1].lower()
@@ -28,15 +28,65 @@ import bpy
 import opentimelineio
 
 from videotracks.utils import utils
+from videotracks.utils import utils_vse
+from videotracks.utils.utils_media import MediaRelocationIndex
 
 from . import otio_wrapper as ow
+from . import fcp_xml_reader
 
 import logging
 
 _logger = logging.getLogger(__name__)
 
 
-def importTrack(track, trackInd, track_type, timeRange=None, offsetFrameNumber=0, alternative_media_folder=""):
+def _getClipAudioLevels(clip):
+    """ Return the volume value and the list of (frame, value) volume keyframes of the audiolevels effect of the clip
+        Volume is None if the clip has no such effect
+    """
+    volumeVal = None
+    audio_volume_keyframes = []
+    if clip.metadata is None:
+        return volumeVal, audio_volume_keyframes
+
+    effect = clip.metadata.get("fcp_xml", {}).get("filter", {}).get("effect")
+    if effect is not None and "value" in effect.get("parameter", {}):
+        volumeVal = float(effect["parameter"]["value"])
+
+    if effect is not None and effect["effectcategory"] == "audiolevels":
+        keyframe_data = effect.get("parameter", {}).get("keyframe")
+        if keyframe_data is not None:
+            if isinstance(keyframe_data, opentimelineio._otio.AnyVector):
+                for keyframe in keyframe_data:
+                    frame = opentimelineio.opentime.to_frames(
+                        opentimelineio.opentime.RationalTime(float(keyframe["when"]))
+                    )
+                    audio_volume_keyframes.append((frame, float(keyframe["value"])))
+            else:
+                frame = opentimelineio.opentime.to_frames(
+                    opentimelineio.opentime.RationalTime(float(keyframe_data["when"]))
+                )
+                audio_volume_keyframes.append((frame, float(keyframe_data["value"])))
+
+    return volumeVal, audio_volume_keyframes
+
+
+def importTrack(
+    track,
+    trackInd,
+    track_type,
+    timeRange=None,
+    offsetFrameNumber=0,
+    alternative_media_folder="",
+    relocationIndex=None,
+    stripsBuilder=None,
+    volumeKeyframesTolerance=0.0,
+):
+    """ relocationIndex: MediaRelocationIndex used to find the missing media, created on alternative_media_folder if None
+        stripsBuilder: if a utils_vse.StripsBatchBuilder is specified then the clips are added to it instead of being
+        created, the strips are then created by its build() function
+        volumeKeyframesTolerance: tolerance used to remove the redundant volume keyframes of the audio clips when
+        they are not created by stripsBuilder, see utils_vse.setStripVolumeKeyframes()
+    """
     verbose = False
     #   verbose = "VIDEO" == track_type
 
@@ -54,24 +104,23 @@ def importTrack(track, trackInd, track_type, timeRange=None, offsetFrameNumber=0
     if verbose:
         print(f"{trackInfo}")
 
-    for i, clip in enumerate(track.each_clip()):
+    reportUnresolvedMedia = relocationIndex is None
+    if relocationIndex is None:
+        relocationIndex = MediaRelocationIndex([alternative_media_folder])
+
+    # media out of range are excluded by the clips index
+    if timeRange is not None:
+        trackClips = ow.get_track_clips_index(track).get_clips_in_range(range_start, range_end, mode="OVERLAPPING")
+    else:
+        trackClips = track.each_clip()
+
+    for i, clip in enumerate(trackClips):
         # if 5 < i:
         #    break
-        clip_start = ow.get_clip_frame_final_start(clip, fps)
-        clip_end = ow.get_timeline_clip_end_inclusive(clip)
-
         clipInfo = "\n\n- *** ----------------------------"
         clipInfo += f"\n  - Clip name: {clip.name}, Clip ind: {i}"
 
-        isInRange = utils.segment_is_in_range(clip_start, clip_end, range_start, range_end, partly_inside=True)
-
-        # excluse media out of range
-        if not isInRange:
-            # excludInfo = " not in range"
-            # print(f"{excludInfo}")
-            continue
-
-        media_path = Path(ow.get_clip_media_path(clip))
+        media_path = ow.get_clip_media_path(clip)
 
         # possibly excluse some media types
         # mediaExt = Path(media_path).suffix
@@ -84,6 +133,8 @@ def importTrack(track, trackInd, track_type, timeRange=None, offsetFrameNumber=0
         clipInfo += f"\n  -   metadata:{clip.metadata}\n"
         if verbose:
             print(f"{clipInfo}")
+            clip_start = ow.get_clip_frame_final_start(clip, fps)
+            clip_end = ow.get_timeline_clip_end_inclusive(clip)
             print(f"clip_start: {clip_start}, clip_end: {clip_end}, range_start: {range_start}, range_end: {range_end}")
             # _logger.debug(f"{clipInfo}")
 
@@ -98,18 +149,10 @@ def importTrack(track, trackInd, track_type, timeRange=None, offsetFrameNumber=0
             # offsetFrameNumber = 2
             #    _logger.debug(f"media_path: {media_path}")
             print(f"       Import at frame: offsetFrameNumber: {offsetFrameNumber}")
-        if not media_path.exists():
-            print(f"    *** Media not found: {media_path}")
-            # Lets find it inside next to the xml
-            # media_path = Path(otioFile).parent.joinpath(media_path.name)
-            media_path = Path(alternative_media_folder).joinpath(media_path.name)
-            _logger.debug(f'** media not found, so using alternative_media_folder: "{alternative_media_folder}"')
-            _logger.debug(f"   and new media_path: {media_path}")
-
-        if not media_path.exists():
-            print(f"    *** Media still not found: {media_path}")
-        else:
-            media_path = str(media_path)
+
+        # missing media are searched in the relocation index, the unresolved ones are reported at the end
+        media_path = relocationIndex.resolve(media_path)
+        if media_path is not None:
 
             # start = ow.get_clip_frame_final_start(clip) + offsetFrameNumber
             start = opentimelineio.opentime.to_frames(clip.range_in_parent().start_time)
@@ -155,6 +198,40 @@ def importTrack(track, trackInd, track_type, timeRange=None, offsetFrameNumber=0
                 f"Duration clip values: clip frameDuration: {frameDuration}, frameFinalDuration:{frameFinalDuration}"
             )
 
+            clipEnabled = True
+            if verbose:
+                print(f" -*- clip metadata: {clip.metadata}")
+
+            if "fcp_xml" in clip.metadata:
+                # print(" -*- fcp_xml is ok")
+                # print(f"metadata; clip.metadata['fcp_xml']['enabled']: {clip.metadata['fcp_xml']['enabled']}")
+                if "enabled" in clip.metadata["fcp_xml"]:
+                    clipEnabled = not ("FALSE" == clip.metadata["fcp_xml"]["enabled"])
+
+            volumeVal = None
+            audio_volume_keyframes = []
+            if track_type == "AUDIO":
+                volumeVal, audio_volume_keyframes = _getClipAudioLevels(clip)
+                if verbose:
+                    print(f" volume value: {volumeVal}")
+
+            if stripsBuilder is not None:
+                stripsBuilder.addClip(
+                    media_path,
+                    trackInd,
+                    frameStart,
+                    offsetStart=frameOffsetStart,
+                    offsetEnd=frameOffsetEnd,
+                    maxFinalDuration=ow.get_clip_frame_final_duration(clip, fps),
+                    clipName=clip.name,
+                    importVideo=track_type == "VIDEO",
+                    importAudio=track_type == "AUDIO",
+                    mute=not clipEnabled,
+                    volume=volumeVal,
+                    volumeKeyframes=audio_volume_keyframes,
+                )
+                continue
+
             vse_render = bpy.context.window_manager.UAS_vse_render
             newClipInVSE = vse_render.createNewClip(
                 bpy.context.scene,
@@ -169,53 +246,15 @@ def importTrack(track, trackInd, track_type, timeRange=None, offsetFrameNumber=0
             )
 
             if newClipInVSE is not None:
-
-                clipEnabled = True
-                if verbose:
-                    print(f" -*- clip metadata: {clip.metadata}")
-
-                if "fcp_xml" in clip.metadata:
-                    # print(" -*- fcp_xml is ok")
-                    # print(f"metadata; clip.metadata['fcp_xml']['enabled']: {clip.metadata['fcp_xml']['enabled']}")
-                    if "enabled" in clip.metadata["fcp_xml"]:
-                        clipEnabled = not ("FALSE" == clip.metadata["fcp_xml"]["enabled"])
                 newClipInVSE.mute = not clipEnabled
 
                 if track_type == "AUDIO":
-                    if "fcp_xml" in clip.metadata:
-                        if "filter" in clip.metadata["fcp_xml"]:
-                            if "effect" in clip.metadata["fcp_xml"]["filter"]:
-                                if "parameter" in clip.metadata["fcp_xml"]["filter"]["effect"]:
-                                    if "parameter" in clip.metadata["fcp_xml"]["filter"]["effect"]:
-                                        if "value" in clip.metadata["fcp_xml"]["filter"]["effect"]["parameter"]:
-                                            volumeVal = float(
-                                                clip.metadata["fcp_xml"]["filter"]["effect"]["parameter"]["value"]
-                                            )
-                                            if verbose:
-                                                print(f" volume value: {volumeVal}")
-                                            newClipInVSE.volume = volumeVal
-
-                    audio_volume_keyframes = []
-                    if clip.metadata is not None:
-                        effect = clip.metadata.get("fcp_xml", {}).get("filter", {}).get("effect")
-                        if effect is not None and effect["effectcategory"] == "audiolevels":
-                            keyframe_data = effect.get("parameter", {}).get("keyframe")
-                            if keyframe_data is not None:
-                                if isinstance(keyframe_data, opentimelineio._otio.AnyVector):
-                                    for keyframe in keyframe_data:
-                                        frame = opentimelineio.opentime.to_frames(
-                                            opentimelineio.opentime.RationalTime(float(keyframe["when"]))
-                                        )
-                                        audio_volume_keyframes.append((frame, float(keyframe["value"])))
-                                else:
-                                    frame = opentimelineio.opentime.to_frames(
-                                        opentimelineio.opentime.RationalTime(float(keyframe_data["when"]))
-                                    )
-                                    audio_volume_keyframes.append((frame, float(keyframe_data["value"])))
-
-                    for f, v in audio_volume_keyframes:
-                        newClipInVSE.volume = v
-                        newClipInVSE.keyframe_insert("volume", frame=f)
+                    if volumeVal is not None:
+                        newClipInVSE.volume = volumeVal
+
+                    utils_vse.setStripVolumeKeyframes(
+                        bpy.context.scene, newClipInVSE, audio_volume_keyframes, tolerance=volumeKeyframesTolerance
+                    )
 
             if verbose:
                 vse_render.printClipInfo(newClipInVSE, printTimeInfo=True)
@@ -269,7 +308,8 @@ def importTrack(track, trackInd, track_type, timeRange=None, offsetFrameNumber=0
             #     importAudio=track_type == "AUDIO",
             # )
 
-    pass
+    if reportUnresolvedMedia:
+        relocationIndex.printUnresolvedReport()
 
 
 def importToVSE(
@@ -281,11 +321,28 @@ def importToVSE(
     videoTracksList=None,
     audioTracksList=None,
     alternative_media_folder="",
+    useStripsBatch=True,
+    relocationIndex=None,
+    volumeKeyframesTolerance=0.001,
 ):
     """
         track_type can be "ALL", "VIDEO" or "AUDIO"
+        The media of all the tracks are resolved with a single MediaRelocationIndex, created on
+        alternative_media_folder if relocationIndex is None, and the media not found are reported at the end of the
+        import
+        If useStripsBatch is True the strips of all the tracks are created at the end in a single pass, see
+        utils_vse.StripsBatchBuilder
+        volumeKeyframesTolerance: the volume keyframes of the audio clips that can be interpolated from the other
+        keyframes within this tolerance are not imported, 0 to import all of them. The default value is about -60 dB
     """
     # print(f"\nimportToVSE: track_type: {track_type}")
+    if relocationIndex is None:
+        relocationIndex = MediaRelocationIndex([alternative_media_folder])
+    stripsBuilder = None
+    if useStripsBatch:
+        stripsBuilder = utils_vse.StripsBatchBuilder(
+            bpy.context.scene, volumeKeyframesTolerance=volumeKeyframesTolerance
+        )
 
     # alternative_media_folder = Path(otioFile).parent
 
@@ -302,7 +359,9 @@ def importToVSE(
                     "VIDEO",
                     timeRange=timeRange,
                     offsetFrameNumber=offsetFrameNumber,
-                    alternative_media_folder=alternative_media_folder,
+                    relocationIndex=relocationIndex,
+                    stripsBuilder=stripsBuilder,
+                    volumeKeyframesTolerance=volumeKeyframesTolerance,
                 )
 
     # audio
@@ -315,13 +374,23 @@ def importToVSE(
                     "AUDIO",
                     timeRange=timeRange,
                     offsetFrameNumber=offsetFrameNumber,
-                    alternative_media_folder=alternative_media_folder,
+                    relocationIndex=relocationIndex,
+                    stripsBuilder=stripsBuilder,
+                    volumeKeyframesTolerance=volumeKeyframesTolerance,
                 )
 
+    if stripsBuilder is not None:
+        stripsBuilder.build()
+    relocationIndex.printUnresolvedReport()
+
 
 def getSequenceListFromOtio(otioFile):
 
-    timeline = opentimelineio.adapters.read_from_file(otioFile)
+    # Final Cut XML files are streamed, there is no need to build the whole timeline to list the media
+    if fcp_xml_reader.is_fcp_xml_file(otioFile):
+        return fcp_xml_reader.get_sequence_list_from_fcp_xml(otioFile)
+
+    timeline = ow.get_timeline_from_file(otioFile)
     return getSequenceListFromOtioTimeline(timeline)
 
 
@@ -532,7 +601,7 @@ def importOtioToVSE(otioFile, vse, importAtFrame=0, importVideoTracks=True, impo
     #     pass
 
     #        try:
-    timeline = opentimelineio.adapters.read_from_file(otioFile)
+    timeline = ow.get_timeline_from_file(otioFile)
     # if len(timeline.video_tracks()):
     #     track = timeline.video_tracks()[0]  # Assume the first one contains the shots.
 
@@ -556,7 +625,8 @@ def import_otio(scene, filepath, old_dir, new_dir):
         scene.sequence_editor_create()
     seq_editor = scene.sequence_editor
 
-    timeline = opentimelineio.adapters.read_from_file(filepath)
+    timeline = ow.get_timeline_from_file(filepath)
+    relocationIndex = MediaRelocationIndex([new_dir])
     bad_file_uri_check = re.compile(
         r"^/\S:.*"
     )  # file uri parsing on windows can result in a leading / in front of the drive letter.
@@ -568,7 +638,8 @@ def import_otio(scene, filepath, old_dir, new_dir):
             media_path = unquote_plus(urlparse(clip.media_reference.target_url).path).replace("\\", "//")
 
             head, tail = os.path.split(media_path)
-            media_path = new_dir + tail
+            # media moved to a subfolder of new_dir are also found
+            media_path = relocationIndex.resolve(new_dir + tail)
             print("media_path: ", media_path)
 
             # if bad_file_uri_check.match(media_path):  # Remove leading /
@@ -577,9 +648,8 @@ def import_otio(scene, filepath, old_dir, new_dir):
 
             # print("media_path: ", media_path)
             # media_path = Path(media_path)
-            if not Path(media_path).exists():
-                print(f"Could not be find {media_path}.")
-            #     continue
+            if media_path is None:
+                continue
 
             # if track_kind == "Video":
             #     c = seq_editor.sequences.new_movie(
@@ -587,9 +657,11 @@ def import_otio(scene, filepath, old_dir, new_dir):
             #     )
             #     c.frame_final_duration = opentimelineio.opentime.to_frames(clip.duration())
 
-            elif track_kind == "Audio":
+            if track_kind == "Audio":
                 c = seq_editor.sequences.new_sound(
                     clip.name, str(media_path), i, opentimelineio.opentime.to_frames(clip.range_in_parent().start_time)
                 )
                 c.frame_final_duration = opentimelineio.opentime.to_frames(clip.duration())
 
+    relocationIndex.printUnresolvedReport()
+
@@ -0,0 +1,182 @@
+# GPLv3 License
+#
+# Copyright (C) 2021 Ubisoft
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Comparison of two montages (EDL sequence, scene shots, VSE channel...) and conformation of a VSE channel to a reference
+
+The montage entries and their comparison are defined in montage_diff_core.py
+"""
+
+import bpy
+
+from videotracks.utils import utils_vse
+
+from . import otio_wrapper as ow
+from .montage_diff_core import (
+    newMontageEntry,
+    getEntryBaseName,
+    computeMontageDiff,
+    printMontageDiff,
+    getMontageDiffReport,
+    writeMontageDiffReport,
+)
+
+
+###################
+# montage entries
+###################
+
+
+def getMontageSequenceEntries(montage, sequenceName):
+    """ Return the entries of the edit shots of the specified sequence of the montage
+    """
+    seq = montage.get_sequence_by_name(sequenceName)
+    if seq is None:
+        return list()
+    return [
+        newMontageEntry(sh.get_name(), None, sh.get_frame_final_start(), sh.get_frame_final_end(), item=sh)
+        for sh in seq.getEditShots()
+    ]
+
+
+def getSceneShotsEntries(scene, takeIndex=-1):
+    """ Return the entries of the enabled shots of the specified take of the scene, the current one if takeIndex is -1
+    """
+    props = scene.UAS_shot_manager_props
+    take = props.getCurrentTake() if -1 == takeIndex else props.getTakeByIndex(takeIndex)
+    entries = list()
+    for shot in take.getShotList(ignoreDisabled=True):
+        editStart = shot.getEditStart()
+        entries.append(newMontageEntry(shot.name, None, editStart, editStart + shot.end - shot.start + 1, item=shot))
+    return entries
+
+
+def getOtioTrackEntries(track):
+    """ Return the entries of the clips of the OpenTimelineIO track
+    """
+    trackIndex = ow.get_track_clips_index(track)
+    trackType = "VIDEO" if "Video" == track.kind else "AUDIO"
+    fps = 25
+    return [
+        newMontageEntry(
+            clip.name,
+            ow.get_clip_media_path(clip),
+            start,
+            end + 1,
+            item=clip,
+            offsetStart=ow.get_clip_frame_offset_start(clip, fps),
+            trackType=trackType,
+        )
+        for clip, start, end in zip(trackIndex.clips, trackIndex.starts, trackIndex.ends)
+    ]
+
+
+def getVSEChannelEntries(scene, channelIndex):
+    """ Return the entries of the strips of the channel of the VSE of the scene
+    """
+    vse_render = bpy.context.window_manager.UAS_vse_render
+    return [
+        newMontageEntry(
+            clip.name,
+            vse_render.getClipMediaPath(scene, clip),
+            clip.frame_final_start,
+            clip.frame_final_end,
+            item=clip,
+            offsetStart=clip.frame_offset_start,
+            trackType="AUDIO" if "SOUND" == clip.type else "VIDEO",
+        )
+        for clip in utils_vse.getChannelsIndex(scene).get(channelIndex, list())
+    ]
+
+
+###################
+# conformation
+###################
+
+
+def applyMontageDiffToVSEChannel(scene, channelIndex, diff):
+    """ Conform the VSE channel to the reference montage by applying only the differences computed by
+        computeMontageDiff(), the current entries being the ones of getVSEChannelEntries()
+        Deleted strips are removed, retimed strips are moved and trimmed in free channels then moved back to the
+        channel, inserted entries with a media are created
+        The strips keep the source in-point of the reference entries, or their own when the reference has none
+        Return the number of modified strips
+    """
+    numModified = 0
+    for entry in diff["deleted"]:
+        scene.sequence_editor.sequences.remove(entry["item"])
+        numModified += 1
+
+    # a strip retimed in the channel could overlap a neighbour not retimed yet and would then be shuffled by Blender
+    # to another channel. The retimed strips are first parked together in a free channel, where they do not overlap
+    # since they did not in the channel, then each one is retimed alone in a second free channel and moved back to
+    # the channel, where its new range is free
+    retimedClips = [(pair["ref"], pair["current"]["item"]) for pair in diff["retimed"]]
+    usedChannels = {clip.channel for clip in scene.sequence_editor.sequences}
+    freeChannels = [channel for channel in range(32, 0, -1) if channel not in usedChannels]
+    parkingChannel, stagingChannel = freeChannels[:2] if 2 <= len(freeChannels) else (None, None)
+    if parkingChannel is None and len(retimedClips):
+        print("*** Conform: no free channel to retime the strips, they may be moved to other channels ***")
+    else:
+        for _, clip in retimedClips:
+            clip.channel = parkingChannel
+
+    for ref, clip in retimedClips:
+        if stagingChannel is not None:
+            clip.channel = stagingChannel
+        offsetStart = ref["offset_start"] if ref["offset_start"] is not None else clip.frame_offset_start
+        # the media start is placed so that the final start shows the frame of the source in-point
+        clip.frame_offset_start = offsetStart
+        clip.frame_start = ref["start"] - offsetStart
+        clip.frame_final_duration = ref["end"] - ref["start"]
+        clip.channel = channelIndex
+        numModified += 1
+
+    vse_render = bpy.context.window_manager.UAS_vse_render
+    for entry in diff["inserted"]:
+        if entry["media"] is None:
+            continue
+        offsetStart = entry["offset_start"] if entry["offset_start"] is not None else 0
+        newClip = vse_render.createNewClip(
+            scene,
+            entry["media"],
+            channelIndex,
+            entry["start"] - offsetStart,
+            offsetStart=offsetStart,
+            final_duration=entry["end"] - entry["start"],
+            clipName=getEntryBaseName(entry["name"]),
+            importVideo="AUDIO" != entry["track_type"],
+            importAudio="AUDIO" == entry["track_type"],
+        )
+        if newClip is not None:
+            numModified += 1
+
+    utils_vse.invalidateChannelsIndex(scene)
+    return numModified
+
+
+def conformVSEChannelToOtioTrack(scene, channelIndex, track, reportFile=None):
+    """ Compare the VSE channel to the OpenTimelineIO track, apply the differences to the channel and possibly write
+        the JSON report of the differences
+        Return the differences
+    """
+    diff = computeMontageDiff(getOtioTrackEntries(track), getVSEChannelEntries(scene, channelIndex))
+    printMontageDiff(diff)
+    if reportFile is not None and "" != reportFile:
+        writeMontageDiffReport(diff, reportFile)
+    applyMontageDiffToVSEChannel(scene, channelIndex, diff)
+    return diff
@@ -0,0 +1,225 @@
+# GPLv3 License
+#
+# Copyright (C) 2021 Ubisoft
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Comparison of two montages described by lists of entries, independent from Blender so that it can be tested outside
+of it, see montage_diff.py for the entries of the scenes, EDL files and VSE channels and for the conformation
+
+A montage is described by a list of entries, each entry being a dictionary with:
+    - "name", "media": identity of the shot or clip, media can be None
+    - "start", "end": frame range in the edit, end exclusive
+    - "offset_start": number of frames of the media before the start of the clip, its source in-point, None if the
+      entry has no media
+    - "track_type": "VIDEO" or "AUDIO", None if the entry has no media
+    - "item": the shot, clip or strip described by the entry, not written in the reports
+"""
+
+import os
+import re
+from bisect import bisect_left
+from datetime import datetime
+import json
+from pathlib import Path
+
+
+###################
+# montage entries
+###################
+
+
+def newMontageEntry(name, media, start, end, item=None, offsetStart=None, trackType=None):
+    return {
+        "name": name,
+        "media": media,
+        "start": start,
+        "end": end,
+        "offset_start": offsetStart,
+        "track_type": trackType,
+        "item": item,
+    }
+
+
+###################
+# diff
+###################
+
+
+# suffixes added to the strip names by createNewClip() and by Blender to make them unique
+_stripNameSuffixRe = re.compile(r"( \((video|sound)\))?(\.\d{3})?$")
+
+
+def getEntryBaseName(name):
+    """ Return the name of the clip without the " (video)" or " (sound)" suffix of the movie strips and without the
+        .001 suffix added by Blender
+    """
+    return _stripNameSuffixRe.sub("", name, count=1)
+
+
+def _getEntriesKeys(entries, useMediaInKey):
+    """ Return the list of the stable identities of the entries, in the order of the entries start
+        An identity is (name, media, occurence), occurence distinguishing the entries with the same name and media
+        The name is the base name of the entry, see getEntryBaseName()
+    """
+    occurences = dict()
+    keys = list()
+    for entry in sorted(entries, key=lambda e: e["start"]):
+        media = entry["media"]
+        if useMediaInKey and media is not None:
+            # paths coming from urls and from Blender differ by their separators and case on Windows
+            media = os.path.normcase(os.path.normpath(media))
+        baseKey = (getEntryBaseName(entry["name"]), media if useMediaInKey else None)
+        occurence = occurences.get(baseKey, 0)
+        occurences[baseKey] = occurence + 1
+        keys.append(((baseKey[0], baseKey[1], occurence), entry))
+    return keys
+
+
+def _longestIncreasingSubsequence(values):
+    """ Return the set of the indices of a longest strictly increasing subsequence of values, in O(n log n)
+    """
+    tailValues = list()
+    tailIndices = list()
+    predecessors = [-1] * len(values)
+    for i, value in enumerate(values):
+        pos = bisect_left(tailValues, value)
+        if 0 < pos:
+            predecessors[i] = tailIndices[pos - 1]
+        if pos == len(tailValues):
+            tailValues.append(value)
+            tailIndices.append(i)
+        else:
+            tailValues[pos] = value
+            tailIndices[pos] = i
+
+    result = set()
+    i = tailIndices[-1] if len(tailIndices) else -1
+    while -1 != i:
+        result.add(i)
+        i = predecessors[i]
+    return result
+
+
+def computeMontageDiff(refEntries, currentEntries, useMediaInKey=True):
+    """ Compare the current montage to the reference one and return the differences as a dictionary with:
+        - "inserted": entries of the reference that are not in the current montage
+        - "deleted": entries of the current montage that are not in the reference
+        - "retimed": list of {"ref": entry, "current": entry} for the entries found in both montages but with a
+          different frame range or source in-point
+        - "reordered": list of {"ref": entry, "current": entry} for the entries found in both montages but not in the
+          same order relatively to the others
+        - "unchanged": number of entries found in both montages with the same range
+        Entries are matched by name, media (if useMediaInKey is True) and occurence of this name and media,
+        in O(n log n)
+    """
+    refKeys = _getEntriesKeys(refEntries, useMediaInKey)
+    currentKeys = _getEntriesKeys(currentEntries, useMediaInKey)
+    currentPositions = {key: (pos, entry) for pos, (key, entry) in enumerate(currentKeys)}
+    refKeysSet = {key for key, _ in refKeys}
+
+    diff = {"inserted": list(), "deleted": list(), "retimed": list(), "reordered": list(), "unchanged": 0}
+
+    matches = list()
+    for key, refEntry in refKeys:
+        if key in currentPositions:
+            matches.append((refEntry, currentPositions[key][1], currentPositions[key][0]))
+        else:
+            diff["inserted"].append(refEntry)
+
+    diff["deleted"] = [entry for key, entry in currentKeys if key not in refKeysSet]
+
+    # the matched entries keeping their relative order are the longest increasing subsequence of their positions
+    keptInOrder = _longestIncreasingSubsequence([m[2] for m in matches])
+    for i, (refEntry, currentEntry, _) in enumerate(matches):
+        pair = {"ref": refEntry, "current": currentEntry}
+        if i not in keptInOrder:
+            diff["reordered"].append(pair)
+        if (
+            refEntry["start"] != currentEntry["start"]
+            or refEntry["end"] != currentEntry["end"]
+            or _isSlipped(refEntry, currentEntry)
+        ):
+            diff["retimed"].append(pair)
+        else:
+            diff["unchanged"] += 1
+
+    return diff
+
+
+def _isSlipped(refEntry, currentEntry):
+    """ Return True if both entries have a source in-point and they differ
+    """
+    return (
+        refEntry["offset_start"] is not None
+        and currentEntry["offset_start"] is not None
+        and refEntry["offset_start"] != currentEntry["offset_start"]
+    )
+
+
+def printMontageDiff(diff):
+    print(
+        f"\n Montage differences: {len(diff['inserted'])} inserted, {len(diff['deleted'])} deleted,"
+        f" {len(diff['retimed'])} retimed, {len(diff['reordered'])} reordered, {diff['unchanged']} unchanged"
+    )
+    for entry in diff["inserted"]:
+        print(f"   + {entry['name']}: [{entry['start']}, {entry['end']}[")
+    for entry in diff["deleted"]:
+        print(f"   - {entry['name']}: [{entry['start']}, {entry['end']}[")
+    for pair in diff["retimed"]:
+        ref, current = pair["ref"], pair["current"]
+        print(f"   ~ {ref['name']}: [{current['start']}, {current['end']}[ -> [{ref['start']}, {ref['end']}[")
+    for pair in diff["reordered"]:
+        print(f"   > {pair['ref']['name']}: reordered")
+
+
+def getMontageDiffReport(diff):
+    """ Return the differences as a dictionary that can be written in JSON
+    """
+
+    def _entryDict(entry):
+        return {
+            "name": entry["name"],
+            "media": entry["media"],
+            "start": entry["start"],
+            "end": entry["end"],
+            "offset_start": entry["offset_start"],
+        }
+
+    def _pairDict(pair):
+        return {"ref": _entryDict(pair["ref"]), "current": _entryDict(pair["current"])}
+
+    now = datetime.now()
+    return {
+        "date": f"{now.strftime('%b-%d-%Y')}  -  {now.strftime('%H:%M:%S')}",
+        "summary": {
+            "inserted": len(diff["inserted"]),
+            "deleted": len(diff["deleted"]),
+            "retimed": len(diff["retimed"]),
+            "reordered": len(diff["reordered"]),
+            "unchanged": diff["unchanged"],
+        },
+        "inserted": [_entryDict(e) for e in diff["inserted"]],
+        "deleted": [_entryDict(e) for e in diff["deleted"]],
+        "retimed": [_pairDict(p) for p in diff["retimed"]],
+        "reordered": [_pairDict(p) for p in diff["reordered"]],
+    }
+
+
+def writeMontageDiffReport(diff, reportFile):
+    Path(reportFile).parent.mkdir(parents=True, exist_ok=True)
+    with open(reportFile, "w") as f:
+        json.dump(getMontageDiffReport(diff), f, indent=4)
+    return reportFile
@@ -34,7 +34,9 @@ from videotracks.config import config
 from videotracks.utils import utils
 
 import opentimelineio
-from .exports import exportShotManagerEditToOtio
+from .exports import exportShotManagerEditToOtio, exportShotManagerTakesToOtio
+from . import otio_wrapper as ow
+from . import montage_diff
 
 import logging
 
@@ -48,6 +50,9 @@ class UAS_VideoTracks_Export_OTIO(Operator):
     bl_options = {"INTERNAL"}
 
     file: StringProperty()
+    allTakes: BoolProperty(
+        name="All Takes", description="Export an edit file for each take of the scene", default=False,
+    )
 
     # def invoke ( self, context, event ):
     #     props = context.scene.UAS_video_tracks_props
@@ -86,12 +91,17 @@ class UAS_VideoTracks_Export_OTIO(Operator):
         props = context.scene.UAS_video_tracks_props
 
         if props.isRenderRootPathValid():
-            exportShotManagerEditToOtio(
-                context.scene,
-                filePath=props.renderRootPath,
-                fps=context.scene.render.fps,
-                # montageCharacteristics=props.get_montage_characteristics(),
-            )
+            if self.allTakes:
+                exportShotManagerTakesToOtio(
+                    context.scene, filePath=props.renderRootPath, fps=context.scene.render.fps,
+                )
+            else:
+                exportShotManagerEditToOtio(
+                    context.scene,
+                    filePath=props.renderRootPath,
+                    fps=context.scene.render.fps,
+                    # montageCharacteristics=props.get_montage_characteristics(),
+                )
         else:
             utils.ShowMessageBox("Render root path is invalid", "OpenTimelineIO Export Aborted", "ERROR")
             print("OpenTimelineIO Export aborted before start: Invalid Root Path")
@@ -791,9 +801,64 @@ class UAS_VideoTracks_OT_CompareOtioAndCurrentMontage(Operator):
     bl_options = {"INTERNAL"}
 
     sequenceName: StringProperty(default="")
+    # if not set the JSON report is written next to the EDL file
+    reportFile: StringProperty(default="")
 
     def execute(self, context):
+        if config.gMontageOtio is None:
+            self.report({"ERROR"}, "No EDL file loaded")
+            return {"CANCELLED"}
+
         context.scene.UAS_shot_manager_props.compareWithMontage(config.gMontageOtio, self.sequenceName)
+
+        # shots of the scene and of the EDL do not share a media, they are matched by name
+        diff = montage_diff.computeMontageDiff(
+            montage_diff.getMontageSequenceEntries(config.gMontageOtio, self.sequenceName),
+            montage_diff.getSceneShotsEntries(context.scene),
+            useMediaInKey=False,
+        )
+        montage_diff.printMontageDiff(diff)
+        reportFile = self.reportFile
+        if "" == reportFile:
+            reportFile = str(Path(config.gMontageOtio.otioFile).parent.joinpath(f"{self.sequenceName}_diff.json"))
+        montage_diff.writeMontageDiffReport(diff, reportFile)
+        print(f"   Montage differences report: {reportFile}")
+        return {"FINISHED"}
+
+
+class UAS_VideoTracks_OT_ConformChannelToOtioTrack(Operator):
+    bl_idname = "uasvideotracks.conform_channel_to_otio_track"
+    bl_label = "Conform Channel to EDL Track"
+    bl_description = (
+        "Update the strips of the specified channel so that they match the clips of the specified track of the\n"
+        "imported EDL file. Only the differences are applied and they are reported in a JSON file"
+    )
+    bl_options = {"INTERNAL", "UNDO"}
+
+    trackType: EnumProperty(
+        name="Track Type", items=(("VIDEO", "Video", ""), ("AUDIO", "Audio", "")), default="VIDEO",
+    )
+    # starts at 1, as the channels
+    trackIndex: IntProperty(name="EDL Track", min=1, default=1)
+    channelIndex: IntProperty(name="Channel", min=1, max=32, default=1)
+    reportFile: StringProperty(default="")
+
+    def execute(self, context):
+        timeline = None if config.gMontageOtio is None else config.gMontageOtio.timeline
+        if timeline is None:
+            self.report({"ERROR"}, "No EDL file loaded")
+            return {"CANCELLED"}
+
+        tracks = timeline.video_tracks() if "VIDEO" == self.trackType else timeline.audio_tracks()
+        if len(tracks) < self.trackIndex:
+            self.report({"ERROR"}, f"Track {self.trackIndex} not found in the EDL file")
+            return {"CANCELLED"}
+
+        if context.scene.sequence_editor is None:
+            context.scene.sequence_editor_create()
+        montage_diff.conformVSEChannelToOtioTrack(
+            context.scene, self.channelIndex, tracks[self.trackIndex - 1], reportFile=self.reportFile
+        )
         return {"FINISHED"}
 
 
@@ -862,7 +927,7 @@ class UAS_VideoTracks_OT_Create_Shots_From_OTIO(Operator):
         from pathlib import Path
 
         if "" != self.otioFile and Path(self.otioFile).exists():
-            timeline = opentimelineio.adapters.read_from_file(self.otioFile)
+            timeline = ow.get_timeline_from_file(self.otioFile)
             time = timeline.duration()
             rate = int(time.rate)
 
@@ -999,6 +1064,7 @@ _classes = (
     UAS_VideoTracks_OT_Create_Shots_From_OTIO,
     UAS_VideoTracks_OT_Create_Shots_From_OTIO_RRS,
     UAS_VideoTracks_OT_CompareOtioAndCurrentMontage,
+    UAS_VideoTracks_OT_ConformChannelToOtioTrack,
     UAS_OTIO_OpenFileBrowser,
 )
 
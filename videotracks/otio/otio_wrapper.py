@@ -21,12 +21,18 @@ To do: module description here.
 
 import opentimelineio
 
+import os
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+import hashlib
 from pathlib import Path
 from urllib.parse import unquote_plus, urlparse
 import re
 
 import math
 
+import bpy
+
 from ..utils import utils
 
 import logging
@@ -36,7 +42,7 @@ _logger = logging.getLogger(__name__)
 
 def parseOtioFile(otioFile):
 
-    timeline = opentimelineio.adapters.read_from_file(otioFile)
+    timeline = get_timeline_from_file(otioFile)
 
     #### test get_media_list
     ############
@@ -115,8 +121,114 @@ def parseOtioFile(otioFile):
         parseTrack(timeline, "VIDEO", i)
 
 
-def get_timeline_from_file(otioFile):
-    return opentimelineio.adapters.read_from_file(otioFile)
+# ----------------------------------
+# timelines cache
+# ----------------------------------
+
+# Parsed timelines, most recently used last. Key is the one returned by _get_timeline_cache_key()
+_timelinesCache = OrderedDict()
+_timelinesCacheMaxSize = 4
+
+# Maximum number of timelines kept in the disk cache, the least recently used ones are removed
+_timelinesDiskCacheMaxSize = 20
+
+
+def _get_timeline_cache_key(otioFile):
+    """ The key changes when the file is modified, so that outdated timelines are never used
+    """
+    filePath = os.path.normcase(os.path.abspath(otioFile))
+    stat = os.stat(filePath)
+    return f"{filePath}|{stat.st_size}|{stat.st_mtime_ns}"
+
+
+def get_timeline_disk_cache_dir():
+    return os.path.join(bpy.utils.user_resource("CONFIG", path="videotracks"), "otio_cache")
+
+
+def _get_timeline_disk_cache_file(otioFile, cacheKey):
+    """ The name of the file starts with the hash of the edit file path so that the outdated versions of the same
+        edit file can be found, see _prune_timeline_disk_cache()
+    """
+    pathHash = hashlib.sha1(os.path.normcase(os.path.abspath(otioFile)).encode("utf-8")).hexdigest()[:16]
+    keyHash = hashlib.sha1(cacheKey.encode("utf-8")).hexdigest()
+    return os.path.join(get_timeline_disk_cache_dir(), f"{pathHash}_{keyHash}.otio")
+
+
+def _prune_timeline_disk_cache(diskCacheFile):
+    """ Remove the other versions of the edit file of diskCacheFile and the least recently used files above
+        _timelinesDiskCacheMaxSize
+    """
+    cacheDir = Path(diskCacheFile).parent
+    pathHash = Path(diskCacheFile).name.partition("_")[0]
+    filesToRemove = [f for f in cacheDir.glob(f"{pathHash}_*.otio") if f.name != Path(diskCacheFile).name]
+
+    # files are touched when they are read, their modification time is the time they were last used
+    otherFiles = [f for f in cacheDir.glob("*.otio") if f not in filesToRemove and f.name != Path(diskCacheFile).name]
+    otherFiles.sort(key=lambda f: f.stat().st_mtime, reverse=True)
+    filesToRemove += otherFiles[_timelinesDiskCacheMaxSize - 1 :]
+
+    for cacheFile in filesToRemove:
+        try:
+            os.remove(cacheFile)
+        except OSError:
+            _logger.debug(f"Timeline cache file cannot be removed: {cacheFile}")
+
+
+def get_timeline_from_file(otioFile, useCache=True):
+    """ Return the timeline of the specified edit file (Final Cut XML, OTIO...)
+        Timelines are cached, in memory for the last ones used and on disk in the native OTIO format for the
+        last version of the _timelinesDiskCacheMaxSize edit files last used, so that each edit file is parsed by its
+        adapter only once as long as it is not modified
+        The returned timeline is shared by all the callers and must not be modified. Set useCache to False
+        to get a new instance
+    """
+    if not useCache:
+        return opentimelineio.adapters.read_from_file(otioFile)
+
+    cacheKey = _get_timeline_cache_key(otioFile)
+    timeline = _timelinesCache.get(cacheKey)
+    if timeline is not None:
+        _timelinesCache.move_to_end(cacheKey)
+        return timeline
+
+    # native OTIO files are already in the fastest format to read
+    useDiskCache = ".otio" != Path(otioFile).suffix.lower()
+    diskCacheFile = _get_timeline_disk_cache_file(otioFile, cacheKey)
+
+    if useDiskCache and os.path.exists(diskCacheFile):
+        try:
+            timeline = opentimelineio.adapters.read_from_file(diskCacheFile, adapter_name="otio_json")
+            os.utime(diskCacheFile)
+        except Exception as e:
+            _logger.debug(f"Timeline cache file cannot be read, edit file will be parsed again: {e}")
+
+    if timeline is None:
+        timeline = opentimelineio.adapters.read_from_file(otioFile)
+        if useDiskCache:
+            try:
+                Path(diskCacheFile).parent.mkdir(parents=True, exist_ok=True)
+                opentimelineio.adapters.write_to_file(timeline, diskCacheFile, adapter_name="otio_json")
+                _prune_timeline_disk_cache(diskCacheFile)
+            except Exception as e:
+                _logger.debug(f"Timeline cache file cannot be written: {e}")
+
+    _timelinesCache[cacheKey] = timeline
+    while _timelinesCacheMaxSize < len(_timelinesCache):
+        _timelinesCache.popitem(last=False)
+
+    return timeline
+
+
+def clear_timelines_cache(clearDiskCache=False):
+    _timelinesCache.clear()
+    if clearDiskCache:
+        cacheDir = get_timeline_disk_cache_dir()
+        if os.path.isdir(cacheDir):
+            for cacheFile in Path(cacheDir).glob("*.otio"):
+                try:
+                    os.remove(cacheFile)
+                except OSError:
+                    print(f"*** Timeline cache file cannot be removed: {cacheFile} ***")
 
 
 def parseTrack(timeline, track_type, track_index):
@@ -174,70 +286,18 @@ def get_media_occurence(timeline, media_name, track_type="ALL", last_occurence=F
     """ Return the first (or last if last_occurence is True) occurence of the clip with a name containing
         media_name found in the timeline
         track_type can be "ALL", "VIDEO" or "AUDIO"
+        The occurences are read from the media manifest of the timeline, see get_timeline_media_manifest()
     """
-    found_clip = None
-    tab = "   "
-
-    def _get_media_first_occurence(tracks):
-        first_c = None
-        ind = -1
-        for track in tracks:
-            for i, clip in enumerate(track.each_clip()):
-                ind += 1
-
-                clip_name_l = clip.name.lower()
-                if media_name_l in clip_name_l:
-                    if first_c is None or get_clip_frame_final_start(clip) < get_clip_frame_final_start(first_c):
-                        first_c = clip
-                        print(f"\n{tab}Clip: {ind}, {clip.name}")
-                        break
-
-        return first_c
-
-    def _get_media_last_occurence(tracks):
-        last_c = None
-        ind = -1
-        for track in tracks:
-            for i, clip in enumerate(track.each_clip()):
-                ind += 1
-
-                clip_name_l = clip.name.lower()
-                if media_name_l in clip_name_l:
-                    if last_c is None or get_timeline_clip_end_inclusive(clip) > get_timeline_clip_end_inclusive(
-                        last_c
-                    ):
-                        last_c = clip
-                        print(f"\n{tab}Clip: {ind}, {clip.name}")
-                        break
-
-        return last_c
-
-    media_name_l = media_name.lower()
-
-    if "ALL" == track_type or "VIDEO" == track_type:
-        tracks = timeline.video_tracks()
-        if last_occurence:
-            found_clip = _get_media_last_occurence(tracks)
-        else:
-            found_clip = _get_media_first_occurence(tracks)
+    manifest = get_timeline_media_manifest(timeline)
+    occurences = manifest.get_occurences_by_name(media_name, track_type=track_type)
 
-    if "ALL" == track_type or "AUDIO" == track_type:
-        tracks = timeline.audio_tracks()
-        found_audio_clip = None
+    found_clip = None
+    if len(occurences):
         if last_occurence:
-            found_audio_clip = _get_media_last_occurence(tracks)
-        else:
-            found_audio_clip = _get_media_first_occurence(tracks)
-
-        if found_clip is None:
-            found_clip = found_audio_clip
-        elif found_audio_clip is None:
-            pass
+            # occurence tupples: (track, clip_index, clip, start, end_inclusive)
+            found_clip = max(occurences, key=lambda occ: occ[4])[2]
         else:
-            first_clip_start = get_clip_frame_final_start(found_clip)
-            first_audio_clip_start = get_clip_frame_final_start(found_audio_clip)
-            if first_audio_clip_start < first_clip_start:
-                found_clip = found_audio_clip
+            found_clip = min(occurences, key=lambda occ: occ[3])[2]
 
     # print result
     print("\n Track Type: ", track_type)
@@ -245,7 +305,7 @@ def get_media_occurence(timeline, media_name, track_type="ALL", last_occurence=F
     if found_clip is None:
         print("   No clip found")
     else:
-        start = get_clip_frame_final_start(found_clip)
+        start = opentimelineio.opentime.to_frames(found_clip.range_in_parent().start_time)
         end = get_timeline_clip_end_exclusive(found_clip)
         print(f"   Found clip: {found_clip.name}, start: {start}, end: {end}")
 
@@ -259,7 +319,7 @@ def get_clip_media_path(clip):
     # media_path = Path(utils.file_path_from_url(clip.media_reference.target_url))
     media_path = None
     if isinstance(clip, opentimelineio.schema.Clip):
-        print(f"clip.media_reference: {clip.media_reference}")
+        # print(f"clip.media_reference: {clip.media_reference}")
         media_path = utils.file_path_from_url(clip.media_reference.target_url)
     return media_path
 
@@ -362,53 +422,179 @@ def get_timeline_clip_end_exclusive(clip):
 
 
 def get_media_list(timeline, track_type="ALL"):
-    """ Return the list of the media found in the timeline
+    """ Return the list of the media found in the timeline, in their order of first use
         track_type can be "ALL", "VIDEO" or "AUDIO"
     """
+    return get_timeline_media_manifest(timeline).get_media_list(track_type=track_type)
 
-    media_list = list()
 
-    # if "ALL" == track_type or "VIDEO" == track_type:
+# ----------------------------------
+# clips index
+# ----------------------------------
 
-    def _get_media_list(tracks):
-        m_list = list()
 
-        for track in tracks:
-            for clip in track:
-                if isinstance(clip, opentimelineio.schema.Clip):
-                    # print(clip.media_reference)
-                    media_path = get_clip_media_path(clip)
-                    # print(f"{media_path}")
-                    if media_path not in m_list:
-                        m_list.append(media_path)
-        return m_list
+class TrackClipsIndex:
+    """ Index of the clips of a track by their frame range in the track (range_in_parent), to get the clips of
+        a frame range in O(log n + k)
+        Clips of a track are contiguous and do not overlap, so both their start and end frames are sorted in the
+        clip order and can be searched with bisect
+    """
 
-    tracks = timeline.tracks
-    if "VIDEO" == track_type:
-        tracks = timeline.video_tracks()
-    elif "AUDIO" == track_type:
-        tracks = timeline.audio_tracks()
+    def __init__(self, track):
+        self.track = track
+        self.clips = list()
+        self.starts = list()
+        self.ends = list()
+
+        # ranges of the direct children are computed in one pass, calling range_in_parent() on each clip
+        # would cost O(n) per clip
+        childrenRanges = track.range_of_all_children()
+        for item in track:
+            if isinstance(item, opentimelineio.schema.Clip):
+                itemClips = [(item, childrenRanges[item])]
+            elif isinstance(item, opentimelineio.core.Composition):
+                itemClips = [(clip, clip.range_in_parent()) for clip in item.each_clip()]
+            else:
+                continue
+
+            for clip, clipRange in itemClips:
+                self.clips.append(clip)
+                self.starts.append(opentimelineio.opentime.to_frames(clipRange.start_time))
+                self.ends.append(opentimelineio.opentime.to_frames(clipRange.end_time_inclusive()))
+
+    def get_clips_in_range(self, range_start, range_end, mode="STRICTLY"):
+        """ Return the clips of the track in the specified range, boundaries included, in their track order
+            mode: "STRICTLY": start and end of clip are inside the range or equal to its boundaries
+            mode: "OVERLAPPING": start, end or frames inbetweens are in the range
+        """
+        if "STRICTLY" == mode:
+            firstInd = bisect_left(self.starts, range_start)
+            lastInd = bisect_right(self.ends, range_end)
+        else:
+            firstInd = bisect_left(self.ends, range_start)
+            lastInd = bisect_right(self.starts, range_end)
+        return self.clips[firstInd:lastInd]
 
-    media_list = _get_media_list(tracks)
 
-    # for item in media_list:
-    #     print(item)
+# Indices of the tracks, by track id. The track is kept in the value so that its id cannot be reused
+_tracksClipsIndexCache = OrderedDict()
+_tracksClipsIndexCacheMaxSize = 256
 
-    return media_list
 
+def get_track_clips_index(track):
+    """ Return the clips index of the track, built on the first call
+        The index is not updated if the track is modified
+    """
+    cachedIndex = _tracksClipsIndexCache.get(id(track))
+    if cachedIndex is not None and cachedIndex.track is track:
+        _tracksClipsIndexCache.move_to_end(id(track))
+        return cachedIndex
+
+    trackIndex = TrackClipsIndex(track)
+    _tracksClipsIndexCache[id(track)] = trackIndex
+    while _tracksClipsIndexCacheMaxSize < len(_tracksClipsIndexCache):
+        _tracksClipsIndexCache.popitem(last=False)
+    return trackIndex
 
-def get_clips_in_range(timeline, track_type="ALL", mode="STRICTLY"):
-    """ Return the clips in the specified range
+
+def get_clips_in_range(timeline, range_start, range_end, track_type="ALL", mode="STRICTLY"):
+    """ Return the clips in the specified range, boundaries included, as a list of tupples (track, clip)
         track_type can be "ALL", "VIDEO" or "AUDIO"
         mode: "STRICTLY": start and end of clip are inside the range or equal to its boundaries
         mode: "OVERLAPPING": start, end or frames inbetweens are in the range
-        *** Warning: track owner is not kept at the moment ***
     """
+    tracks = timeline.tracks
+    if "VIDEO" == track_type:
+        tracks = timeline.video_tracks()
+    elif "AUDIO" == track_type:
+        tracks = timeline.audio_tracks()
 
-    if "ALL" == track_type or "VIDEO" == track_type:
-        pass
-    elif "ALL" == track_type or "AUDIO" == track_type:
-        pass
+    clips = list()
+    for track in tracks:
+        for clip in get_track_clips_index(track).get_clips_in_range(range_start, range_end, mode=mode):
+            clips.append((track, clip))
+
+    return clips
 
-    return
 
+# ----------------------------------
+# media manifest
+# ----------------------------------
+
+
+class TimelineMediaManifest:
+    """ Media used by the clips of a timeline, built in a single traversal of its tracks
+        media: dictionary {media path: list of occurences}, media in their order of first use
+        An occurence is a tupple (track, clip_index, clip, start, end_inclusive), clip_index being the index of the
+        clip in the track and start and end its frame range in the track
+        The clips are also indexed by name, in lower case, for the substring searches of get_occurences_by_name()
+    """
+
+    def __init__(self, timeline):
+        self.timeline = timeline
+        self.media = dict()
+        # lower case clip name: list of occurences
+        self._occurencesByName = dict()
+        # lower case substring: occurences found, filled on demand
+        self._substringsCache = dict()
+        # order of first use of each media per track type, the order of the tracks being kept
+        self._mediaFirstUse = {"VIDEO": dict(), "AUDIO": dict()}
+
+        for track in timeline.tracks:
+            track_type = "AUDIO" if opentimelineio.schema.TrackKind.Audio == track.kind else "VIDEO"
+            trackIndex = get_track_clips_index(track)
+            for clip_index, clip in enumerate(trackIndex.clips):
+                occurence = (track, clip_index, clip, trackIndex.starts[clip_index], trackIndex.ends[clip_index])
+                media_path = get_clip_media_path(clip)
+                self.media.setdefault(media_path, list()).append(occurence)
+                self._mediaFirstUse[track_type].setdefault(media_path, True)
+                self._occurencesByName.setdefault(clip.name.lower(), list()).append(occurence)
+
+    def get_media_list(self, track_type="ALL"):
+        """ track_type can be "ALL", "VIDEO" or "AUDIO"
+        """
+        if "ALL" == track_type:
+            return list(self.media)
+        return list(self._mediaFirstUse[track_type])
+
+    def get_occurences(self, media_path):
+        return self.media.get(media_path, list())
+
+    def get_occurences_by_name(self, name_substring, track_type="ALL"):
+        """ Return the occurences of the clips with a name containing name_substring, case insensitive
+            track_type can be "ALL", "VIDEO" or "AUDIO"
+        """
+        name_substring_l = name_substring.lower()
+        occurences = self._substringsCache.get(name_substring_l)
+        if occurences is None:
+            occurences = list()
+            for clip_name_l, nameOccurences in self._occurencesByName.items():
+                if name_substring_l in clip_name_l:
+                    occurences.extend(nameOccurences)
+            self._substringsCache[name_substring_l] = occurences
+
+        if "ALL" == track_type:
+            return occurences
+        kind = opentimelineio.schema.TrackKind.Audio if "AUDIO" == track_type else opentimelineio.schema.TrackKind.Video
+        return [occ for occ in occurences if kind == occ[0].kind]
+
+
+# Manifests of the timelines, by timeline id. The timeline is kept in the value so that its id cannot be reused
+_mediaManifestsCache = OrderedDict()
+_mediaManifestsCacheMaxSize = 8
+
+
+def get_timeline_media_manifest(timeline):
+    """ Return the media manifest of the timeline, built on the first call
+        The manifest is not updated if the timeline is modified
+    """
+    cachedManifest = _mediaManifestsCache.get(id(timeline))
+    if cachedManifest is not None and cachedManifest.timeline is timeline:
+        _mediaManifestsCache.move_to_end(id(timeline))
+        return cachedManifest
+
+    manifest = TimelineMediaManifest(timeline)
+    _mediaManifestsCache[id(timeline)] = manifest
+    while _mediaManifestsCacheMaxSize < len(_mediaManifestsCache):
+        _mediaManifestsCache.popitem(last=False)
+    return manifest
@@ -223,7 +223,22 @@ class UAS_VideoTracks_Track(PropertyGroup):
         items=_list_takes, name="Takes", description="Select a take"  # update=_current_take_changed
     )
 
-    def regenerateTrackContent(self):
+    def regenerateTrackContent(self, fullRebuild=False):
+        """ Update the content of the VSE channel of the track from the shots of the Shot Manager take
+            See iterRegenerateTrackContent()
+        """
+        for _ in self.iterRegenerateTrackContent(fullRebuild=fullRebuild):
+            pass
+
+    def iterRegenerateTrackContent(self, fullRebuild=False):
+        """ Generator updating the content of the VSE channel of the track from the shots of the Shot Manager take
+            By default only the clips that have changed are updated: each clip stores the fingerprint of the shot it
+            has been created from, clips whose shot has only moved in the edit are retimed, clips without a matching
+            shot are removed and only the missing ones are created
+            Set fullRebuild to True to clear the channel and recreate all the clips
+            The generator yields a tupple (number of processed clips, number of expected clips) after each clip
+            creation so that the update can be split over several calls, as done by the regenerate all tracks operator
+        """
         print(f"\nregenerateTrackContent: {self.name}, type: {self.trackType}")
 
         if "CAM_FROM_SCENE" == self.trackType:
@@ -241,12 +256,12 @@ class UAS_VideoTracks_Track(PropertyGroup):
         trackScene_resolution_x = self.shotManagerScene.render.resolution_x
         trackScene_resolution_y = self.shotManagerScene.render.resolution_y
 
-        self.clearContent()
+        # list of (fingerprint, atFrame, function creating the clip)
+        expectedClips = list()
 
         if "SHOT_CAMERAS" == self.trackType:
-            for shot in shotsList:
-                print("\nShot:", shot.name)
-                print(f"Start: {shot.start}, Edit Start: {shot.getEditStart()}")
+
+            def _createShotCameraClip(shot):
                 newClip = vse_render.createNewClip(
                     self.parentScene,
                     "",
@@ -266,37 +281,98 @@ class UAS_VideoTracks_Track(PropertyGroup):
                 vse_render.cropClipToCanvas(
                     res_x, res_y, newClip, clip_x, clip_y, mode="FIT_WIDTH",
                 )
-                # newClip.use_crop = True
-                # newClip.crop.min_x = -1 * int((1280 - trackScene_resolution_x) / 2)
-                # newClip.crop.max_x = newClip.crop.min_x
-                # newClip.crop.min_y = -1 * int((960 - trackScene_resolution_y) / 2)
-                # newClip.crop.max_y = newClip.crop.min_y
+                return newClip
 
-        elif "CAM_BG" == self.trackType:
             for shot in shotsList:
-                print("\nShot:", shot.name)
+                fingerprint = (
+                    f"{shot.name}|{shot.camera.name if shot.camera is not None else ''}|{shot.start}|{shot.end}"
+                    f"|{trackScene_resolution_x}x{trackScene_resolution_y}"
+                )
+                atFrame = -1 * shot.start + shot.getEditStart()
+                expectedClips.append((fingerprint, atFrame, lambda shot=shot: _createShotCameraClip(shot)))
 
-                if len(shot.camera.data.background_images):
-                    print("Cam BG found")
+        elif "CAM_BG" == self.trackType:
+
+            def _createCamBGClip(shot, clip, mediaPath):
+                offsetEnd = clip.frame_duration + shot.bgImages_offset - shot.getDuration()
+                return vse_render.createNewClip(
+                    self.parentScene,
+                    mediaPath,
+                    self.vseTrackIndex,
+                    clip.frame_start,
+                    offsetStart=-1 * shot.bgImages_offset,
+                    offsetEnd=offsetEnd,
+                )
+
+            for shot in shotsList:
+                if shot.camera is not None and len(shot.camera.data.background_images):
                     clip = shot.camera.data.background_images[0].clip
-                    offsetEnd = clip.frame_duration + shot.bgImages_offset - shot.getDuration()
-                    print("OffsetEnd:", offsetEnd)
-                    print(
-                        f"dur: {clip.frame_duration}, off: {shot.bgImages_offset}, end - start:{shot.end - shot.start}"
-                    )
+                    if clip is None:
+                        continue
                     mediaPath = bpy.path.abspath(clip.filepath)
-                    print(f"mediaPath: {mediaPath}, duration: {clip.frame_duration}")
-                    bpy.context.window_manager.UAS_vse_render.createNewClip(
-                        self.parentScene,
-                        mediaPath,
-                        self.vseTrackIndex,
-                        clip.frame_start,
-                        offsetStart=-1 * shot.bgImages_offset,
-                        offsetEnd=offsetEnd,
+                    fingerprint = (
+                        f"{shot.name}|{shot.camera.name}|{mediaPath}|{clip.frame_duration}"
+                        f"|{shot.bgImages_offset}|{shot.getDuration()}"
+                    )
+                    expectedClips.append(
+                        (
+                            fingerprint,
+                            clip.frame_start,
+                            lambda shot=shot, clip=clip, mediaPath=mediaPath: _createCamBGClip(shot, clip, mediaPath),
+                        )
                     )
 
         elif "RENDERED_SHOTS" == self.trackType:
-            pass
+            # the rendered shots clips are not generated yet, the channel is only cleared
+            self.clearContent()
+            return
+
+        if fullRebuild:
+            self.clearContent()
+            existingClips = dict()
+        else:
+            existingClips = dict()
+            for clip in self.getClips():
+                existingClips.setdefault(clip.get("vt_fingerprint", ""), []).append(clip)
+
+        # match the expected clips with the existing ones
+        clipsToRetime = list()
+        clipsToCreate = list()
+        for fingerprint, atFrame, createClip in expectedClips:
+            matchingClips = existingClips.get(fingerprint)
+            if matchingClips:
+                clip = matchingClips.pop(0)
+                if clip.frame_start != atFrame:
+                    clipsToRetime.append((clip, atFrame))
+            else:
+                clipsToCreate.append((fingerprint, createClip))
+
+        clipsToRemove = [clip for clips in existingClips.values() for clip in clips]
+        for clip in clipsToRemove:
+            self.parentScene.sequence_editor.sequences.remove(clip)
+
+        # clips are retimed from the edge of the move direction to prevent them to overlap temporarily
+        clipsToRetime.sort(key=lambda c: c[0].frame_start, reverse=True)
+        for clip, atFrame in [c for c in clipsToRetime if c[0].frame_start < c[1]]:
+            clip.frame_start = atFrame
+        for clip, atFrame in reversed([c for c in clipsToRetime if c[0].frame_start > c[1]]):
+            clip.frame_start = atFrame
+
+        numProcessedClips = len(expectedClips) - len(clipsToCreate)
+        yield (numProcessedClips, len(expectedClips))
+
+        for fingerprint, createClip in clipsToCreate:
+            newClip = createClip()
+            if newClip is not None:
+                newClip["vt_fingerprint"] = fingerprint
+            numProcessedClips += 1
+            yield (numProcessedClips, len(expectedClips))
+
+        utils_vse.invalidateChannelsIndex(self.parentScene)
+        print(
+            f"   {len(clipsToCreate)} clip(s) created, {len(clipsToRetime)} retimed, {len(clipsToRemove)} removed,"
+            f" {len(expectedClips) - len(clipsToCreate) - len(clipsToRetime)} unchanged"
+        )
 
     def clearContent(self):
         bpy.context.window_manager.UAS_vse_render.clearChannel(self.parentScene, self.vseTrackIndex)
@@ -304,10 +380,10 @@ class UAS_VideoTracks_Track(PropertyGroup):
     # wkip rajouter un range?
     def getClips(self):
         # return bpy.context.window_manager.UAS_vse_render.getChannelClips(self.parentScene, self.vseTrackIndex)
-        return self.parentScene.UAS_video_tracks_props.getChannelClips(self.parentScene, self.vseTrackIndex)
+        return self.parentScene.UAS_video_tracks_props.getChannelClips(self.vseTrackIndex)
 
     def getClipsNumber(self):
-        return bpy.context.window_manager.UAS_vse_render.getChannelClipsNumber(self.parentScene, self.vseTrackIndex)
+        return self.parentScene.UAS_video_tracks_props.getChannelClipsNumber(self.vseTrackIndex)
 
     def changeClipsTrack(self, targetTrackIndex):
         return bpy.context.window_manager.UAS_vse_render.changeClipsChannel(
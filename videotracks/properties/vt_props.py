@@ -401,7 +401,7 @@ class VideoTracks_Props(PropertyGroup):
             newTrack = self.getTrackByIndex(fromIndex)
 
         if "CHANNEL_AND_HEADER" == mode or "CHANNEL" == mode:
-            utils_vse.swapChannels(self.parentScene, fromIndex, toIndex)
+            utils_vse.moveChannel(self.parentScene, fromIndex, toIndex)
 
         return newTrack
 
@@ -478,16 +478,10 @@ class VideoTracks_Props(PropertyGroup):
     ####################
 
     def getChannelClips(self, channelIndex):
-        clipsList = list()
-        for seq in self.parentScene.sequence_editor.sequences:
-            if channelIndex == seq.channel:
-                clipsList.append(seq)
-
-        return clipsList
+        return utils_vse.getChannelClips(self.parentScene, channelIndex)
 
     def getChannelClipsNumber(self, channelIndex):
-        clipsList = self.getChannelClips(channelIndex)
-        return len(clipsList)
+        return len(utils_vse.getChannelsIndex(self.parentScene).get(channelIndex, []))
 
 
 _classes = (
@@ -30,10 +30,15 @@ from bpy.props import (
     IntVectorProperty,
     StringProperty,
     PointerProperty,
+    BoolProperty,
+    IntProperty,
 )
 
 from videotracks.config import config
 from videotracks.utils import utils
+from videotracks.utils import utils_media
+from videotracks.utils import utils_render
+from videotracks.utils import utils_vse
 
 
 # This operator requires   from bpy_extras.io_utils import ImportHelper
@@ -122,6 +127,53 @@ class UAS_Vse_Render(PropertyGroup):
 
     inputAudioMediaPath: StringProperty(name="Input Audio Media Path", default="")
 
+    useParallelRender: BoolProperty(
+        name="Parallel Render",
+        description="Render the sequences with several background Blender processes, each one rendering a part of"
+        " the frame range.\nThe scene strips are then rendered with the render engine of their scene instead of the"
+        " OpenGL render used otherwise, so they may look different.\nRequires ffmpeg to be available on the"
+        " system path",
+        default=False,
+    )
+
+    numRenderWorkers: IntProperty(
+        name="Render Processes",
+        description="Number of Blender processes used by the parallel render. 0 to use the number of CPUs",
+        min=0,
+        default=0,
+    )
+
+    useRenderCache: BoolProperty(
+        name="Skip Up To Date Renders",
+        description="Do not render again a sequence video whose content has not changed since its previous render",
+        default=True,
+    )
+
+    def renderSequencerAnimation(self, scene):
+        """ Render the sequencer content of the specified scene, which must be the current scene of the window,
+            to its output file
+            The render is skipped if the output file has already been rendered from the same content, see
+            utils_render.getSequencerRangeHash()
+            The parallel render is used when enabled and when the output is an ffmpeg video, the standard OpenGL
+            render is used otherwise or if the parallel render fails
+        """
+        outputFile = bpy.path.abspath(scene.render.filepath)
+        renderHash = utils_render.getSequencerRangeHash(scene, scene.frame_start, scene.frame_end, extraInfo="SEQUENCE")
+        if self.useRenderCache and utils_render.isRenderUpToDate(outputFile, renderHash):
+            print(f"   Render skipped, output is up to date: {outputFile}")
+            return
+
+        self._renderSequencerAnimation(scene, outputFile)
+        utils_render.writeRenderHash(outputFile, renderHash)
+
+    def _renderSequencerAnimation(self, scene, outputFile):
+        if self.useParallelRender and "FFMPEG" == scene.render.image_settings.file_format:
+            if utils_render.renderSequencerParallel(scene, outputFile, numWorkers=self.numRenderWorkers):
+                return
+            print(" *** Parallel render failed, rendering in the current session ***")
+
+        bpy.ops.render.opengl(animation=True, sequencer=True, write_still=False)
+
     def clearMedia(self):
         self.inputOverMediaPath = ""
         self.inputOverResolution = (-1, -1)
@@ -137,25 +189,26 @@ class UAS_Vse_Render(PropertyGroup):
             Movies are not listed in audio media !
         """
         mediaList = {"media_video": None, "media_audio": None}
-        audioFiles = []
-        videoFiles = []
+        # dictionaries are used as ordered sets, the type of each media path is read only once
+        mediaTypes = dict()
+        audioFiles = dict()
+        videoFiles = dict()
         for seq in scene.sequence_editor.sequences:
             mediaPath = self.getClipMediaPath(scene, seq)
-            # print("  mediaPath: ", mediaPath)
-            mediaType = self.getMediaType(mediaPath)
-            # print("  mediaType: ", mediaType)
-            if listAudio:
-                if "SOUND" == mediaType:
-                    if mediaPath not in audioFiles:
-                        audioFiles.append(mediaPath)
-            if listVideo:
-                if "MOVIE" == mediaType:
-                    if mediaPath not in videoFiles:
-                        videoFiles.append(mediaPath)
+            if mediaPath is None or mediaPath in mediaTypes:
+                continue
+
+            mediaType = utils_media.getMediaType(mediaPath, saveCache=False)
+            mediaTypes[mediaPath] = mediaType
+            if (listAudio and "SOUND" == mediaType) or (listVideo and "MOVIE" == mediaType):
+                (audioFiles if "SOUND" == mediaType else videoFiles)[mediaPath] = True
+
+        utils_media.saveProbeCache()
+
         if listAudio:
-            mediaList["media_audio"] = audioFiles
+            mediaList["media_audio"] = list(audioFiles)
         if listVideo:
-            mediaList["media_video"] = videoFiles
+            mediaList["media_video"] = list(videoFiles)
 
         return mediaList
 
@@ -167,30 +220,20 @@ class UAS_Vse_Render(PropertyGroup):
             #     mediaPath = bpy.data.sounds[clip.name].filepath
             # elif clip.name in bpy.context.scene.sequence_editor.sequences_all:
             #     mediaPath = bpy.context.scene.sequence_editor.sequences_all[clip.name].filepath
-            mediaPath = bpy.context.scene.sequence_editor.sequences[clip.name].sound.filepath
+            if clip.sound is not None:
+                mediaPath = clip.sound.filepath
 
         elif "MOVIE" == clip.type:
-            mediaPath = bpy.context.scene.sequence_editor.sequences_all[clip.name].filepath
+            mediaPath = clip.filepath
 
-        return bpy.path.abspath(mediaPath)
+        return None if mediaPath is None else bpy.path.abspath(mediaPath)
 
     def getMediaType(self, filePath):
-        """ Return the type of media according to the extension of the provided file path
-            Rturned types: 'MOVIE', 'IMAGES_SEQUENCE', 'IMAGE', 'SOUND', 'UNKNOWN'
+        """ Return the type of media, from the extension of the provided file path, or from its content when the
+            extension is not known
+            Returned types: 'MOVIE', 'IMAGES_SEQUENCE', 'IMAGE', 'SOUND', 'UNKNOWN'
         """
-        mediaType = "UNKNOWN"
-
-        mediaExt = Path(filePath.lower()).suffix
-        if mediaExt in (".mp4", ".avi", ".mov", ".mkv"):
-            mediaType = "MOVIE"
-        elif mediaExt in (".jpg", ".jpeg", ".png", ".tga", ".tif", ".tiff"):
-            if -1 != filePath.find("###"):
-                mediaType = "IMAGES_SEQUENCE"
-            else:
-                mediaType = "IMAGE"
-        elif mediaExt in (".mp3", ".wav", ".aif", ".aiff"):
-            mediaType = "SOUND"
-        return mediaType
+        return utils_media.getMediaType(filePath)
 
     # a clip is called a sequence in VSE
     def createNewClipFromRange(
@@ -254,6 +297,8 @@ class UAS_Vse_Render(PropertyGroup):
             newClip.frame_final_start = frame_final_start
             newClip.channel = channelInd + 1
 
+        utils_vse.invalidateChannelsIndex(scene)
+
         return newClip
 
     # a clip is called a sequence in VSE
@@ -306,67 +351,24 @@ class UAS_Vse_Render(PropertyGroup):
             return camSeq
 
         def _new_images_sequence(scene, clipName, images_path, channelInd, atFrame):
-            """ Find the name template for the specified images sequence in order to create it
+            """ Find the images of the specified images sequence in order to create it
             """
-            import re
-            from pathlib import Path
-
             seq = None
-            p = Path(images_path)
-            folder, name = p.parent, str(p.name)
-
-            mov_name = ""
-            # Find frame padding. Either using # formating or printf formating
-            file_re = ""
-            padding_match = re.match(".*?(#+).*", name)
-            if not padding_match:
-                padding_match = re.match(".*?%(\d\d)d.*", name)
-                if padding_match:
-                    padding_length = int(padding_match[1])
-                    file_re = re.compile(
-                        r"^{1}({0}){2}$".format(
-                            "\d" * padding_length, name[: padding_match.start(1) - 1], name[padding_match.end(1) + 1 :]
-                        )
-                    )
-                    mov_name = (
-                        str(p.stem)[: padding_match.start(1) - 1] + str(p.stem)[padding_match.end(1) + 1 :]
-                    )  # Removes the % and d which are not captured in the re.
-            else:
-                padding_length = len(padding_match[1])
-                file_re = re.compile(
-                    r"^{1}({0}){2}$".format(
-                        "\d" * padding_length, name[: padding_match.start(1)], name[padding_match.end(1) :]
-                    )
+            imagesSequence = utils_media.findImagesSequence(images_path)
+
+            if imagesSequence is not None:
+                frames = imagesSequence["frames"]
+                folder = Path(images_path).parent
+                seq = scene.sequence_editor.sequences.new_image(
+                    clipName, str(folder.joinpath(frames[imagesSequence["min_frame"]])), channelInd, atFrame
                 )
-                mov_name = str(p.stem)[: padding_match.start(1)] + str(p.stem)[padding_match.end(1) :]
-
-            if padding_match:
-                # scene.render.filepath = str(folder.joinpath(mov_name))
-
-                frames = dict()
-                max_frame = 0
-                min_frame = 999999999
-                for f in sorted(list(folder.glob("*"))):
-                    _folder, _name = f.parent, f.name
-                    re_match = file_re.match(_name)
-                    if re_match:
-                        frame_nb = int(re_match[1])
-                        max_frame = max(max_frame, frame_nb)
-                        min_frame = min(min_frame, frame_nb)
-
-                        frames[frame_nb] = f
-
-                frame_keys = list(frames.keys())  # As of python 3.7 should be in the insertion order.
-                if frames:
-                    seq = scene.sequence_editor.sequences.new_image(
-                        clipName, str(frames[frame_keys[0]]), channelInd, atFrame
-                    )
 
-                    for i in range(min_frame + 1, max_frame + 1):
-                        pp = frames.get(i, Path(""))
-                        seq.elements.append(pp.name)
+                # missing frames are added as empty elements
+                for i in range(imagesSequence["min_frame"] + 1, imagesSequence["max_frame"] + 1):
+                    seq.elements.append(frames.get(i, ""))
 
-                #   scene.frame_end = max_frame - min_frame + 1
+                if len(imagesSequence["missing_frames"]):
+                    print(f"   *** {len(imagesSequence['missing_frames'])} missing frame(s) in {images_path} ***")
 
             return seq
 
@@ -463,36 +465,19 @@ class UAS_Vse_Render(PropertyGroup):
 
     # wkip added to utils_vse
     def clearAllChannels(self, scene):
-        for seq in scene.sequence_editor.sequences:
-            scene.sequence_editor.sequences.remove(seq)
-
-        bpy.ops.sequencer.refresh_all()
+        utils_vse.clearAllChannels(scene)
 
     # wkip added to utils_vse
     def clearChannel(self, scene, channelIndex):
-        sequencesList = list()
-        for seq in scene.sequence_editor.sequences:
-            if channelIndex == seq.channel:
-                sequencesList.append(seq)
-
-        for seq in sequencesList:
-            scene.sequence_editor.sequences.remove(seq)
-
-        bpy.ops.sequencer.refresh_all()
+        utils_vse.clearChannel(scene, channelIndex)
 
     # wkip added to utils_vse
     def getChannelClips(self, scene, channelIndex):
-        sequencesList = list()
-        for seq in scene.sequence_editor.sequences:
-            if channelIndex == seq.channel:
-                sequencesList.append(seq)
-
-        return sequencesList
+        return utils_vse.getChannelClips(scene, channelIndex)
 
     def deselectChannel(self, scene, channelIndex):
-        for seq in scene.sequence_editor.sequences:
-            if channelIndex == seq.channel:
-                seq.select = False
+        for seq in utils_vse.getChannelClips(scene, channelIndex):
+            seq.select = False
 
     def deselectAllChannel(self, scene):
         for seq in scene.sequence_editor.sequences:
@@ -518,32 +503,15 @@ class UAS_Vse_Render(PropertyGroup):
 
     # wkip added to utils_vse
     def getChannelClipsNumber(self, scene, channelIndex):
-        sequencesList = self.getChannelClips(scene, channelIndex)
-        return len(sequencesList)
+        return len(utils_vse.getChannelsIndex(scene).get(channelIndex, []))
 
     # wkip added to utils_vse
     def changeClipsChannel(self, scene, sourceChannelIndex, targetChannelIndex):
-        sourceSequencesList = self.getChannelClips(scene, sourceChannelIndex)
-        targetSequencesList = list()
-
-        if len(sourceSequencesList):
-            targetSequencesList = self.getChannelClips(scene, targetChannelIndex)
-
-            # we need to clear the target channel before doing the switch otherwise some clips may get moved to another channel
-            if len(targetSequencesList):
-                self.clearChannel(self.parentScene, targetChannelIndex)
-
-            for clip in sourceSequencesList:
-                clip.channel = targetChannelIndex
-
-        return targetSequencesList
+        return utils_vse.changeClipsChannel(scene, sourceChannelIndex, targetChannelIndex)
 
     # wkip added to utils_vse
     def swapChannels(self, scene, channelIndexA, channelIndexB):
-        tempChannelInd = 0
-        self.changeClipsChannel(scene, channelIndexA, tempChannelInd)
-        self.changeClipsChannel(scene, channelIndexB, channelIndexA)
-        self.changeClipsChannel(scene, tempChannelInd, channelIndexB)
+        utils_vse.swapChannels(scene, channelIndexA, channelIndexB)
 
     def cropClipToCanvas(
         self, canvasWidth, canvasHeight, clip, clipWidth, clipHeight, clipRenderPercentage=100, mode="FIT_ALL"
@@ -683,7 +651,7 @@ class UAS_Vse_Render(PropertyGroup):
 
         sequenceScene.frame_end = self.get_frame_end_from_content(sequenceScene) - 1
 
-        bpy.ops.render.opengl(animation=True, sequencer=True, write_still=False)
+        self.renderSequencerAnimation(sequenceScene)
 
         # cleaning current file from temp scenes
         if not config.uasDebug_keepVSEContent:
@@ -832,7 +800,7 @@ class UAS_Vse_Render(PropertyGroup):
         #     f"Render New W: {sequenceScene.render.resolution_x} and H: {sequenceScene.render.resolution_y}, %: {sequenceScene.render.resolution_percentage}"
         # )
 
-        bpy.ops.render.opengl(animation=True, sequencer=True, write_still=False)
+        self.renderSequencerAnimation(sequenceScene)
 
         # cleaning current file from temp scenes
         if not config.uasDebug_keepVSEContent:
@@ -951,7 +919,7 @@ class UAS_Vse_Render(PropertyGroup):
         # Make "My New Scene" the active one
         bpy.context.window.scene = vse_scene
         if specificFrame is None:
-            bpy.ops.render.opengl(animation=True, sequencer=True)
+            self.renderSequencerAnimation(vse_scene)
         else:
             vse_scene.frame_set(1)
             bpy.ops.render.render(write_still=True)
@@ -414,6 +414,11 @@ class UAS_MT_VideoTracks_ToolsMenu(Menu):
         row.operator_context = "INVOKE_DEFAULT"
         row.operator("uas_video_tracks.remove_multiple_tracks", text="   Remove All Tracks").action = "ALL"
 
+        layout.separator()
+        row = layout.row(align=True)
+        row.operator_context = "INVOKE_DEFAULT"
+        row.operator("uas_video_tracks.regenerate_all_tracks", text="   Regenerate All Shot Manager Tracks")
+
         # import edits
         layout.separator()
         row = layout.row(align=True)
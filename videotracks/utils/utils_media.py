@@ -0,0 +1,497 @@
+# GPLv3 License
+#
+# Copyright (C) 2021 Ubisoft
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Media probing: type, duration, frame rate, resolution and audio streams of media files, with a persistent cache
+"""
+
+import os
+from pathlib import Path
+import json
+import re
+import shutil
+import struct
+import subprocess
+import wave
+
+import bpy
+
+
+###################
+# media types
+###################
+
+
+def getMediaTypeFromExtension(filePath):
+    """ Return the type of media according to the extension of the provided file path
+        Returned types: 'MOVIE', 'IMAGES_SEQUENCE', 'IMAGE', 'SOUND', 'UNKNOWN'
+    """
+    mediaType = "UNKNOWN"
+    if filePath is None:
+        return mediaType
+
+    mediaExt = Path(filePath.lower()).suffix
+    if mediaExt in (".mp4", ".avi", ".mov", ".mkv"):
+        mediaType = "MOVIE"
+    elif mediaExt in (".jpg", ".jpeg", ".png", ".tga", ".tif", ".tiff"):
+        if -1 != filePath.find("###"):
+            mediaType = "IMAGES_SEQUENCE"
+        else:
+            mediaType = "IMAGE"
+    elif mediaExt in (".mp3", ".wav", ".aif", ".aiff"):
+        mediaType = "SOUND"
+    return mediaType
+
+
+def getMediaType(filePath, saveCache=True):
+    """ Return the type of media, from its extension, or read from the media content when the extension is not
+        known and the file exists and can be probed
+        Returned types: 'MOVIE', 'IMAGES_SEQUENCE', 'IMAGE', 'SOUND', 'UNKNOWN'
+    """
+    if filePath is None or "" == filePath:
+        return "UNKNOWN"
+
+    # the extension is enough for the common formats, the media are probed only for the other ones
+    mediaType = getMediaTypeFromExtension(filePath)
+    if "UNKNOWN" == mediaType and -1 == filePath.find("#") and os.path.isfile(filePath):
+        mediaType = probeMedia(filePath, saveCache=saveCache)["type"]
+    return mediaType
+
+
+###################
+# images sequences
+###################
+
+# Files and images sequences of the scanned directories
+# Key is the directory path, value is a tupple (directory mtime at scan time, list of the file names,
+# {(prefix, padding, suffix): sequence or None})
+_directorySequencesCache = dict()
+
+
+def getDirectorySequence(folder, prefix, padding, suffix):
+    """ Return the images sequence of the folder made of the files named prefix + frame number + suffix, the frame
+        number having padding digits, or None if there is no such file
+        The sequence is a dictionary with:
+            - "prefix", "padding", "suffix": the parts of the file name around the frame number
+            - "frames": dictionary {frame number: file name}, ordered by frame number
+            - "min_frame", "max_frame": the range of frame numbers
+            - "missing_frames": the list of the frame numbers missing in the range
+        The prefix can end with digits (eg: img1 and 4 digits for img10001.png)
+        The directory is listed only once and the sequences are kept until the directory modification time changes
+        (files added, removed or renamed)
+    """
+    folder = os.path.normcase(os.path.abspath(folder))
+    try:
+        folderMTime = os.stat(folder).st_mtime_ns
+    except OSError:
+        return None
+
+    cachedScan = _directorySequencesCache.get(folder)
+    if cachedScan is None or cachedScan[0] != folderMTime:
+        with os.scandir(folder) as it:
+            fileNames = [entry.name for entry in it if entry.is_file()]
+        cachedScan = (folderMTime, fileNames, dict())
+        _directorySequencesCache[folder] = cachedScan
+
+    seqKey = (prefix, padding, suffix)
+    sequences = cachedScan[2]
+    if seqKey not in sequences:
+        frames = dict()
+        nameLength = len(prefix) + padding + len(suffix)
+        for name in cachedScan[1]:
+            if len(name) == nameLength and name.startswith(prefix) and name.endswith(suffix):
+                frameNumber = name[len(prefix) : len(prefix) + padding]
+                if frameNumber.isdigit() and frameNumber.isascii():
+                    frames[int(frameNumber)] = name
+
+        seq = None
+        if len(frames):
+            seq = {"prefix": prefix, "padding": padding, "suffix": suffix}
+            seq["frames"] = {frameNb: frames[frameNb] for frameNb in sorted(frames)}
+            seq["min_frame"] = min(frames)
+            seq["max_frame"] = max(frames)
+            seq["missing_frames"] = [f for f in range(seq["min_frame"], seq["max_frame"] + 1) if f not in frames]
+        sequences[seqKey] = seq
+
+    return sequences[seqKey]
+
+
+def findImagesSequence(imagesPath):
+    """ Return the images sequence matching the specified path, as described in getDirectorySequence(), or None
+        The frame number in the path can be specified either with # (eg: myImage_####.png) or in printf format
+        (eg: myImage_%04d.png)
+    """
+    p = Path(imagesPath)
+    folder, name = p.parent, str(p.name)
+
+    padding_match = re.match(".*?(#+).*", name)
+    if padding_match:
+        prefix, padding, suffix = name[: padding_match.start(1)], len(padding_match[1]), name[padding_match.end(1) :]
+    else:
+        padding_match = re.match(r".*?%(\d\d)d.*", name)
+        if not padding_match:
+            return None
+        # the % and d are not captured in the re
+        prefix, padding = name[: padding_match.start(1) - 1], int(padding_match[1])
+        suffix = name[padding_match.end(1) + 1 :]
+
+    return getDirectorySequence(str(folder), prefix, padding, suffix)
+
+
+def clearDirectorySequencesCache():
+    _directorySequencesCache.clear()
+
+
+###################
+# sound files
+###################
+
+
+def sliceWavFile(inputFile, slices):
+    """ Write parts of a WAV file to new WAV files, with the same format
+        slices: list of (output file, start time, end time), times being in seconds from the start of inputFile
+        The boundaries are rounded to the nearest sample, so that contiguous slices share their boundary sample
+        index and no sample is lost or duplicated. The input file is read by seeking to each slice, so only the
+        samples of the current slice are loaded in memory
+    """
+    with wave.open(inputFile, "rb") as src:
+        params = src.getparams()
+        sampleRate = src.getframerate()
+        numSamples = src.getnframes()
+
+        for outputFile, startTime, endTime in slices:
+            startSample = min(numSamples, max(0, round(startTime * sampleRate)))
+            endSample = min(numSamples, max(startSample, round(endTime * sampleRate)))
+
+            src.setpos(startSample)
+            with wave.open(outputFile, "wb") as dst:
+                dst.setparams(params)
+                # written by blocks of 10 seconds to bound the memory used by long slices
+                remainingSamples = endSample - startSample
+                while 0 < remainingSamples:
+                    numBlockSamples = min(remainingSamples, sampleRate * 10)
+                    dst.writeframes(src.readframes(numBlockSamples))
+                    remainingSamples -= numBlockSamples
+
+
+###################
+# media relocation
+###################
+
+
+class MediaRelocationIndex:
+    """ Index of the media files found in a set of folders, used to resolve the media of an edit that are not at the
+        place referenced by the edit file
+        Each folder is listed only once, with os.scandir, so that resolving a media is a dictionary lookup instead of
+        file system requests made for each clip. The folder of each referenced media is listed the first time it is
+        met, the search roots are listed recursively when the index is created
+        If checkSize or checkDuration is True then a candidate with the same name is used only if its size or
+        duration matches the expected one, when provided to resolve()
+        The media that cannot be resolved are kept in unresolvedMedia and reported by printUnresolvedReport()
+    """
+
+    def __init__(self, searchRoots=None, recursive=True, checkSize=False, checkDuration=False):
+        self.checkSize = checkSize
+        self.checkDuration = checkDuration
+        # normalized full paths of the files found in the indexed folders
+        self._filePaths = set()
+        # file name in lower case: list of the paths of the files with that name, in order of discovery
+        self._filesByName = dict()
+        self._scannedFolders = set()
+        self._resolvedMedia = dict()
+        self.unresolvedMedia = list()
+
+        for root in searchRoots or list():
+            if root is not None and "" != root:
+                self.addFolder(root, recursive=recursive)
+
+    def addFolder(self, folder, recursive=True):
+        """ Add the files of the folder to the index, the folder is listed only once
+        """
+        folders = [os.path.abspath(bpy.path.abspath(str(folder)))]
+        while len(folders):
+            currentFolder = folders.pop()
+            folderKey = os.path.normcase(currentFolder)
+            if folderKey in self._scannedFolders:
+                continue
+            self._scannedFolders.add(folderKey)
+
+            try:
+                with os.scandir(currentFolder) as it:
+                    for entry in it:
+                        if entry.is_dir():
+                            if recursive:
+                                folders.append(entry.path)
+                        elif entry.is_file():
+                            self._filePaths.add(os.path.normcase(entry.path))
+                            self._filesByName.setdefault(entry.name.lower(), list()).append(entry.path)
+            except OSError:
+                continue
+
+    def _isMatching(self, filePath, expectedSize, expectedDuration):
+        try:
+            if self.checkSize and expectedSize is not None and os.path.getsize(filePath) != expectedSize:
+                return False
+        except OSError:
+            return False
+        if self.checkDuration and expectedDuration is not None:
+            duration = probeMedia(filePath, saveCache=False)["duration"]
+            # tolerance of half a frame at 25 fps
+            if duration is not None and 0.02 < abs(duration - expectedDuration):
+                return False
+        return True
+
+    def resolve(self, mediaPath, expectedSize=None, expectedDuration=None):
+        """ Return the path of the media file to use for the specified media path, or None if it cannot be found
+            The media path is kept when the file exists, otherwise a file with the same name is searched in the index
+            expectedSize is in bytes, expectedDuration in seconds
+        """
+        if mediaPath is None or "" == str(mediaPath):
+            return None
+        mediaPath = str(mediaPath)
+        mediaKey = (mediaPath, expectedSize, expectedDuration)
+        if mediaKey in self._resolvedMedia:
+            return self._resolvedMedia[mediaKey]
+
+        # images sequences are not files, they are checked by the importer
+        if -1 != mediaPath.find("#"):
+            self._resolvedMedia[mediaKey] = mediaPath
+            return mediaPath
+
+        folder, fileName = os.path.split(os.path.abspath(mediaPath))
+        self.addFolder(folder, recursive=False)
+
+        resolvedPath = None
+        if os.path.normcase(os.path.join(folder, fileName)) in self._filePaths:
+            if self._isMatching(mediaPath, expectedSize, expectedDuration):
+                resolvedPath = mediaPath
+        if resolvedPath is None:
+            for candidatePath in self._filesByName.get(fileName.lower(), list()):
+                if self._isMatching(candidatePath, expectedSize, expectedDuration):
+                    resolvedPath = candidatePath
+                    break
+
+        if resolvedPath is None:
+            self.unresolvedMedia.append(mediaPath)
+        self._resolvedMedia[mediaKey] = resolvedPath
+        return resolvedPath
+
+    def printUnresolvedReport(self):
+        """ Print the list of the media that could not be resolved, and save the probe cache if durations were checked
+        """
+        if self.checkDuration:
+            saveProbeCache()
+        if not len(self.unresolvedMedia):
+            return
+        print(f"\n    *** {len(self.unresolvedMedia)} media not found: ***")
+        for mediaPath in self.unresolvedMedia:
+            print(f"      - {mediaPath}")
+
+
+###################
+# media probe
+###################
+
+# Probe results by media key, see _getMediaKey()
+# The dictionary is kept in least recently used order, the oldest entries are removed above _probeCacheMaxEntries
+_probeCache = None
+_probeCacheModified = False
+_probeCacheMaxEntries = 5000
+
+
+def getProbeCacheFilePath():
+    cacheDir = bpy.utils.user_resource("CONFIG", path="videotracks")
+    return os.path.join(cacheDir, "media_probe_cache.json")
+
+
+def _loadProbeCache():
+    global _probeCache
+    if _probeCache is None:
+        _probeCache = dict()
+        cacheFile = getProbeCacheFilePath()
+        if os.path.isfile(cacheFile):
+            try:
+                with open(cacheFile, "r") as f:
+                    _probeCache = json.load(f)
+            except (OSError, ValueError):
+                print(f"*** Media probe cache cannot be read, it will be rebuilt: {cacheFile} ***")
+            _evictProbeCacheEntries()
+    return _probeCache
+
+
+def _evictProbeCacheEntries():
+    """ Remove the least recently used entries of the probe cache above _probeCacheMaxEntries
+    """
+    global _probeCacheModified
+    numEvicted = len(_probeCache) - _probeCacheMaxEntries
+    if 0 < numEvicted:
+        for mediaKey in list(_probeCache)[:numEvicted]:
+            del _probeCache[mediaKey]
+        _probeCacheModified = True
+
+
+def saveProbeCache():
+    """ Write the probe cache on disk if it has been modified
+    """
+    global _probeCacheModified
+    if not _probeCacheModified or _probeCache is None:
+        return
+
+    cacheFile = getProbeCacheFilePath()
+    try:
+        Path(cacheFile).parent.mkdir(parents=True, exist_ok=True)
+        with open(cacheFile, "w") as f:
+            json.dump(_probeCache, f)
+        _probeCacheModified = False
+    except OSError:
+        print(f"*** Media probe cache cannot be written: {cacheFile} ***")
+
+
+def clearProbeCache():
+    global _probeCache, _probeCacheModified
+    _probeCache = dict()
+    _probeCacheModified = True
+    saveProbeCache()
+
+
+def _getMediaKey(filePath):
+    """ The key changes when the file is modified, so that outdated entries are never used
+    """
+    stat = os.stat(filePath)
+    return f"{os.path.normcase(os.path.abspath(filePath))}|{stat.st_size}|{stat.st_mtime_ns}"
+
+
+def _newMediaInfo(mediaType="UNKNOWN"):
+    return {
+        "type": mediaType,
+        "duration": None,  # in seconds
+        "fps": None,
+        "resolution_x": None,
+        "resolution_y": None,
+        "audio_streams": 0,
+    }
+
+
+def _probeWithFFprobe(filePath):
+    ffprobe = shutil.which("ffprobe")
+    if ffprobe is None:
+        return None
+
+    try:
+        res = subprocess.run(
+            [ffprobe, "-v", "error", "-print_format", "json", "-show_format", "-show_streams", filePath],
+            capture_output=True,
+            timeout=30,
+        )
+        probe = json.loads(res.stdout)
+    except (OSError, ValueError, subprocess.SubprocessError):
+        return None
+
+    if "streams" not in probe:
+        return None
+
+    mediaInfo = _newMediaInfo()
+    # cover arts of sound files are reported as video streams
+    videoStreams = [
+        s
+        for s in probe["streams"]
+        if "video" == s.get("codec_type") and not s.get("disposition", dict()).get("attached_pic", 0)
+    ]
+    audioStreams = [s for s in probe["streams"] if "audio" == s.get("codec_type")]
+    formatName = probe.get("format", dict()).get("format_name", "")
+
+    mediaInfo["audio_streams"] = len(audioStreams)
+    if "duration" in probe.get("format", dict()):
+        mediaInfo["duration"] = float(probe["format"]["duration"])
+
+    if len(videoStreams):
+        stream = videoStreams[0]
+        mediaInfo["resolution_x"] = stream.get("width")
+        mediaInfo["resolution_y"] = stream.get("height")
+        if formatName.endswith("_pipe") or "image2" == formatName:
+            mediaInfo["type"] = "IMAGE"
+            mediaInfo["duration"] = None
+        else:
+            mediaInfo["type"] = "MOVIE"
+            num, _, den = stream.get("r_frame_rate", "0/1").partition("/")
+            if 0 != float(den or 1):
+                mediaInfo["fps"] = float(num) / float(den or 1)
+    elif len(audioStreams):
+        mediaInfo["type"] = "SOUND"
+
+    return mediaInfo
+
+
+def _probeWithHeaders(filePath):
+    """ Fallback used when ffprobe is not available: read the headers of the formats supported by the standard library
+        and use the extension for the others
+    """
+    mediaInfo = _newMediaInfo(getMediaTypeFromExtension(filePath))
+    mediaExt = Path(filePath.lower()).suffix
+
+    try:
+        if ".wav" == mediaExt:
+            with wave.open(filePath, "rb") as w:
+                mediaInfo["duration"] = w.getnframes() / w.getframerate()
+                mediaInfo["audio_streams"] = 1
+        elif ".png" == mediaExt:
+            with open(filePath, "rb") as f:
+                header = f.read(24)
+            if header[:8] == b"\x89PNG\r\n\x1a\n":
+                mediaInfo["resolution_x"], mediaInfo["resolution_y"] = struct.unpack(">II", header[16:24])
+        elif "SOUND" == mediaInfo["type"]:
+            mediaInfo["audio_streams"] = 1
+    except (OSError, EOFError, wave.Error, struct.error):
+        pass
+
+    return mediaInfo
+
+
+def probeMedia(filePath, saveCache=True):
+    """ Return a dictionary with the type, duration (in seconds), fps, resolution and number of audio streams of the
+        specified media file
+        Results are cached on disk by path, size and modification time so a media is probed only once, the cache
+        keeps the _probeCacheMaxEntries most recently used media
+        Set saveCache to False when probing many files, and call saveProbeCache() at the end
+    """
+    global _probeCacheModified
+    probeCache = _loadProbeCache()
+
+    try:
+        mediaKey = _getMediaKey(filePath)
+    except OSError:
+        return _newMediaInfo(getMediaTypeFromExtension(filePath))
+
+    mediaInfo = probeCache.get(mediaKey)
+    if mediaInfo is not None:
+        if mediaKey == next(reversed(probeCache)):
+            return mediaInfo
+        # moved to the end of the cache as the most recently used entry, the new order has to be saved
+        del probeCache[mediaKey]
+        probeCache[mediaKey] = mediaInfo
+    else:
+        mediaInfo = _probeWithFFprobe(filePath)
+        if mediaInfo is None:
+            mediaInfo = _probeWithHeaders(filePath)
+        probeCache[mediaKey] = mediaInfo
+        _evictProbeCacheEntries()
+
+    _probeCacheModified = True
+    if saveCache:
+        saveProbeCache()
+
+    return mediaInfo
@@ -20,6 +20,13 @@ To do: module description here.
 """
 
 import os
+from collections import deque
+import hashlib
+from pathlib import Path
+import shutil
+import subprocess
+import tempfile
+import time
 
 import bpy
 from bpy.types import Operator
@@ -35,6 +42,450 @@ def isRenderPathValid(scene):
     return filePathIsValid
 
 
+###################
+# render cache
+###################
+
+_renderHashFileExtension = ".vthash"
+
+
+def _getStripMediaPaths(strip):
+    if "MOVIE" == strip.type:
+        return [strip.filepath]
+    elif "SOUND" == strip.type:
+        return [strip.sound.filepath] if strip.sound is not None else []
+    elif "IMAGE" == strip.type:
+        return [os.path.join(strip.directory, elem.filename) for elem in strip.elements]
+    return []
+
+
+# strip properties that do not change the rendered content, or that are hashed separately
+_hashIgnoredStripProperties = {
+    "rna_type",
+    "select",
+    "select_left_handle",
+    "select_right_handle",
+    "lock",
+    "show_expanded",
+    "elements",
+    "sequences",
+    "proxy",
+}
+
+
+def _getRNAStructInfo(struct, depth, ignoredPaths=None, path=""):
+    """ Return a string made of the values of the RNA properties of struct, nested structs and collections being
+        described up to the specified depth. IDs and strips are described by their name
+        ignoredPaths: set of the data paths, relative to struct, of the properties to skip
+    """
+    info = list()
+    for prop in struct.bl_rna.properties:
+        identifier = prop.identifier
+        if identifier in _hashIgnoredStripProperties:
+            continue
+        if ignoredPaths is not None and path + identifier in ignoredPaths:
+            continue
+        value = getattr(struct, identifier, None)
+        if "POINTER" == prop.type:
+            if value is None:
+                info.append(f"{identifier}=None")
+            elif isinstance(value, (bpy.types.ID, bpy.types.Sequence)):
+                info.append(f"{identifier}={value.name}")
+            elif 0 < depth:
+                structInfo = _getRNAStructInfo(value, depth - 1, ignoredPaths, path + identifier + ".")
+                info.append(f"{identifier}=({structInfo})")
+        elif "COLLECTION" == prop.type:
+            if 0 < depth:
+                items = [_getRNAStructInfo(item, depth - 1) for item in value]
+                info.append(f"{identifier}=[{';'.join(items)}]")
+        elif getattr(prop, "is_array", False):
+            info.append(f"{identifier}={tuple(value)}")
+        elif isinstance(value, set):
+            # enum flags, sorted since the order of a set changes from a Python process to another
+            info.append(f"{identifier}={sorted(value)}")
+        else:
+            info.append(f"{identifier}={value}")
+    return ",".join(info)
+
+
+def _getStripsAnimationInfo(scene):
+    """ Return a dictionary {strip name: (list of descriptions of the F-curves and drivers animating the strip,
+        set of the data paths of the animated properties, relative to the strip)}
+    """
+    animInfo = dict()
+    animData = scene.animation_data
+    if animData is None:
+        return animInfo
+
+    fcurves = list(animData.action.fcurves) if animData.action is not None else list()
+    fcurves += list(animData.drivers)
+    prefix = 'sequence_editor.sequences_all["'
+    for fcurve in fcurves:
+        if not fcurve.data_path.startswith(prefix):
+            continue
+        stripName, propPath = fcurve.data_path[len(prefix) :].split('"]', 1)
+        fcurveInfo = f"{fcurve.data_path}|{fcurve.array_index}|{fcurve.mute}|{fcurve.extrapolation}"
+        fcurveInfo += "|" + ";".join(
+            f"{tuple(k.co)},{k.interpolation},{tuple(k.handle_left)},{tuple(k.handle_right)}"
+            for k in fcurve.keyframe_points
+        )
+        if fcurve.driver is not None:
+            fcurveInfo += f"|{fcurve.driver.type}|{fcurve.driver.expression}"
+        stripAnimInfo = animInfo.setdefault(stripName, (list(), set()))
+        stripAnimInfo[0].append(fcurveInfo)
+        stripAnimInfo[1].add(propPath.lstrip("."))
+    return animInfo
+
+
+def getSequencerStripsHashInfo(scene):
+    """ Return the description of each strip of the sequencer of the scene used by getSequencerRangeHash(): all the
+        strip settings (timing, channel, blending, volume, crop, transform, modifiers, effect settings...), the
+        F-curves and drivers animating them and their media files (path, size and modification time)
+        Call it once and pass the result to getSequencerRangeHash() when several ranges of the same sequencer content
+        are hashed, so that the strips are described only once
+        Return a list of tupples (frame_final_start, frame_final_end, description) sorted by strip name, the
+        description being None for scene strips
+    """
+    stripsInfo = list()
+    if scene.sequence_editor is None:
+        return stripsInfo
+
+    animInfo = _getStripsAnimationInfo(scene)
+    for strip in sorted(scene.sequence_editor.sequences_all, key=lambda s: s.name):
+        if "SCENE" == strip.type:
+            stripsInfo.append((strip.frame_final_start, strip.frame_final_end, None))
+            continue
+
+        # the animated properties are described by their F-curves, their current value depends on the current frame
+        fcurvesInfo, animatedPaths = animInfo.get(strip.name, (list(), set()))
+        stripInfo = f"{strip.name}|{strip.type}|{_getRNAStructInfo(strip, 4, ignoredPaths=animatedPaths)}"
+        stripInfo += "|" + "|".join(fcurvesInfo)
+        for mediaPath in _getStripMediaPaths(strip):
+            mediaPath = bpy.path.abspath(mediaPath)
+            try:
+                stat = os.stat(mediaPath)
+                stripInfo += f"|{mediaPath}|{stat.st_size}|{stat.st_mtime_ns}"
+            except OSError:
+                stripInfo += f"|{mediaPath}|missing"
+        stripsInfo.append((strip.frame_final_start, strip.frame_final_end, stripInfo))
+    return stripsInfo
+
+
+def getSequencerRangeHash(scene, frame_start, frame_end, extraInfo="", stripsHashInfo=None):
+    """ Return a hash of everything used to render the sequencer content of the scene in the specified range:
+        the strips overlapping the range, as described by getSequencerStripsHashInfo(), and the render settings of
+        the scene
+        extraInfo: string added to the hash, typically to identify the kind of export
+        stripsHashInfo: result of getSequencerStripsHashInfo() for the current state of the scene, computed if None
+        Return None if the range cannot be cached, which is the case when it contains scene strips since the
+        content of 3D scenes is not tracked
+    """
+    if scene.sequence_editor is None:
+        return None
+
+    hashInfo = list()
+    render = scene.render
+    hashInfo.append(
+        f"{extraInfo}|{frame_start}|{frame_end}|{render.resolution_x}|{render.resolution_y}"
+        f"|{render.resolution_percentage}|{render.fps}|{render.fps_base}|{render.image_settings.file_format}"
+        f"|{render.ffmpeg.format}|{render.ffmpeg.codec}|{render.ffmpeg.constant_rate_factor}"
+        f"|{render.ffmpeg.gopsize}|{render.ffmpeg.audio_codec}|{render.ffmpeg.audio_bitrate}"
+        f"|{render.ffmpeg.audio_channels}|{render.ffmpeg.audio_mixrate}|{render.use_file_extension}"
+        f"|{scene.view_settings.view_transform}|{scene.view_settings.look}|{scene.audio_volume}"
+    )
+
+    if stripsHashInfo is None:
+        stripsHashInfo = getSequencerStripsHashInfo(scene)
+    for stripStart, stripEnd, stripInfo in stripsHashInfo:
+        if stripStart <= frame_end and frame_start < stripEnd:
+            if stripInfo is None:
+                return None
+            hashInfo.append(stripInfo)
+
+    return hashlib.sha1("\n".join(hashInfo).encode("utf-8")).hexdigest()
+
+
+def isRenderUpToDate(outputFile, renderHash):
+    """ Return True if outputFile exists and has been rendered from the content identified by renderHash
+    """
+    if renderHash is None or not os.path.exists(outputFile):
+        return False
+    try:
+        with open(outputFile + _renderHashFileExtension, "r") as f:
+            return f.read().strip() == renderHash
+    except OSError:
+        return False
+
+
+def writeRenderHash(outputFile, renderHash):
+    """ Write the hash of the content of outputFile in a sidecar file next to it, or remove the sidecar file if
+        renderHash is None or outputFile has not been rendered
+    """
+    hashFile = outputFile + _renderHashFileExtension
+    try:
+        if renderHash is None or not os.path.exists(outputFile):
+            if os.path.exists(hashFile):
+                os.remove(hashFile)
+        else:
+            with open(hashFile, "w") as f:
+                f.write(renderHash)
+    except OSError:
+        print(f"*** Render hash file cannot be written: {hashFile} ***")
+
+
+###################
+# background Blender jobs
+###################
+
+
+def runBlenderJobs(blendFile, jobs, sceneName="", numWorkers=0, maxRetries=0, logDir=None):
+    """ Run jobs in a pool of background Blender processes opening blendFile
+        jobs: list of dictionaries with:
+            - "name": name of the job, used in the reports
+            - "script": python code run by the Blender process once the file is opened
+            - "output": path of the file that the job has to create
+        numWorkers: maximum number of simultaneous processes, 0 to use the number of CPUs
+        maxRetries: number of times a failed job is run again
+        logDir: folder where the output of each process is written, the folder of blendFile if None
+        A job fails when its process returns an error or when its output file has not been created
+        Return a list of results, in the order of the jobs, that are dictionaries with "name", "output",
+        "status" ("DONE" or "FAILED"), "attempts", "duration" (in seconds, for the last attempt) and "log" (path of
+        the output of the last attempt)
+    """
+    numWorkers = numWorkers if 0 < numWorkers else (os.cpu_count() or 1)
+    logDir = logDir if logDir is not None else os.path.dirname(blendFile)
+
+    results = [
+        {
+            "name": job["name"],
+            "output": job["output"],
+            "status": "PENDING",
+            "attempts": 0,
+            "duration": 0.0,
+            "log": os.path.join(logDir, f"job_{jobInd:04d}.log"),
+        }
+        for jobInd, job in enumerate(jobs)
+    ]
+    pendingJobs = deque(range(len(jobs)))
+    # job index: (process, log file, start time)
+    runningJobs = dict()
+
+    while len(pendingJobs) or len(runningJobs):
+        while len(pendingJobs) and len(runningJobs) < numWorkers:
+            jobInd = pendingJobs.popleft()
+            job = jobs[jobInd]
+            if os.path.exists(job["output"]):
+                os.remove(job["output"])
+
+            args = [bpy.app.binary_path, "-b", blendFile]
+            if "" != sceneName:
+                args += ["-S", sceneName]
+            args += ["--python-exit-code", "1", "--python-expr", job["script"]]
+
+            results[jobInd]["attempts"] += 1
+            logFile = open(results[jobInd]["log"], "w")
+            process = subprocess.Popen(args, stdout=logFile, stderr=subprocess.STDOUT)
+            runningJobs[jobInd] = (process, logFile, time.monotonic())
+
+        time.sleep(0.1)
+
+        for jobInd, (process, logFile, startTime) in list(runningJobs.items()):
+            if process.poll() is None:
+                continue
+
+            logFile.close()
+            del runningJobs[jobInd]
+            results[jobInd]["duration"] = time.monotonic() - startTime
+
+            if 0 == process.returncode and os.path.exists(jobs[jobInd]["output"]):
+                results[jobInd]["status"] = "DONE"
+                print(f"   - {jobs[jobInd]['name']}: done in {results[jobInd]['duration']:.1f}s")
+            elif results[jobInd]["attempts"] <= maxRetries:
+                print(f"   - {jobs[jobInd]['name']}: failed, retrying ({logFile.name})")
+                pendingJobs.append(jobInd)
+            else:
+                results[jobInd]["status"] = "FAILED"
+                print(f"   *** {jobs[jobInd]['name']}: failed after {results[jobInd]['attempts']} attempt(s) ***")
+                print(f"       Log: {logFile.name}")
+
+    return results
+
+
+def writeBlendFileForJobs(scene, blendFile):
+    """ Write the specified scene and its dependencies to blendFile, so that it can be opened by runBlenderJobs()
+    """
+    bpy.data.libraries.write(blendFile, {scene}, path_remap="ABSOLUTE", fake_user=True)
+
+
+###################
+# parallel sequencer render
+###################
+
+# Python code run by each background worker before rendering its chunk of frames.
+# The chunks are rendered without sound with the ffmpeg container and codec of the scene, so that they can be
+# concatenated without re-encoding. Background processes have no OpenGL context, so the chunks are rendered with the
+# render engine of the scenes used by the scene strips instead of their OpenGL preview
+_workerRenderScript = """
+import bpy
+scene = bpy.context.scene
+scene.frame_start = {frame_start}
+scene.frame_end = {frame_end}
+scene.render.use_sequencer = True
+scene.render.use_compositing = False
+scene.render.use_file_extension = False
+scene.render.ffmpeg.audio_codec = "NONE"
+scene.render.filepath = {filepath!r}
+bpy.ops.render.render(animation=True)
+"""
+
+
+# file extension of the video chunks for each container of scene.render.ffmpeg.format
+_ffmpegFormatExtensions = {
+    "MPEG1": ".mpg",
+    "MPEG2": ".mpg",
+    "MPEG4": ".mp4",
+    "AVI": ".avi",
+    "QUICKTIME": ".mov",
+    "DV": ".dv",
+    "OGG": ".ogv",
+    "MKV": ".mkv",
+    "FLASH": ".flv",
+    "WEBM": ".webm",
+}
+
+# ffmpeg encoder for each value of scene.render.ffmpeg.audio_codec
+_ffmpegAudioEncoders = {
+    "AAC": "aac",
+    "AC3": "ac3",
+    "FLAC": "flac",
+    "MP2": "mp2",
+    "MP3": "libmp3lame",
+    "OPUS": "libopus",
+    "PCM": "pcm_s16le",
+    "VORBIS": "libvorbis",
+}
+
+_ffmpegAudioChannels = {"MONO": 1, "STEREO": 2, "SURROUND4": 4, "SURROUND51": 6, "SURROUND71": 8}
+
+
+def getFfmpegAudioArgs(scene):
+    """ Return the ffmpeg arguments encoding the audio stream with the audio settings of scene.render.ffmpeg
+        Return None if the scene has no audio codec or if its codec is not supported
+    """
+    settings = scene.render.ffmpeg
+    encoder = _ffmpegAudioEncoders.get(settings.audio_codec)
+    if encoder is None:
+        return None
+
+    args = ["-c:a", encoder, "-ar", str(settings.audio_mixrate)]
+    args += ["-ac", str(_ffmpegAudioChannels.get(settings.audio_channels, 2))]
+    if settings.audio_codec not in ("PCM", "FLAC"):
+        args += ["-b:a", f"{settings.audio_bitrate}k"]
+    return args
+
+
+def getSequencerRenderChunks(frame_start, frame_end, numChunks, minChunkDuration=24):
+    """ Split the inclusive frame range into at most numChunks contiguous chunks of at least minChunkDuration frames
+        Return a list of (chunk start, chunk end) tupples
+    """
+    numFrames = frame_end - frame_start + 1
+    numChunks = max(1, min(numChunks, numFrames // max(1, minChunkDuration)))
+    chunkDuration, remainder = divmod(numFrames, numChunks)
+
+    chunks = list()
+    chunkStart = frame_start
+    for i in range(numChunks):
+        chunkEnd = chunkStart + chunkDuration - 1 + (1 if i < remainder else 0)
+        chunks.append((chunkStart, chunkEnd))
+        chunkStart = chunkEnd + 1
+    return chunks
+
+
+def renderSequencerParallel(scene, outputFile, numWorkers=0):
+    """ Render the sequencer content of the specified scene to its ffmpeg video output, using background Blender
+        processes
+        The scene is written in a temporary .blend file, its frame range is split into chunks rendered in parallel
+        with the ffmpeg settings of the scene, then the chunks are concatenated without re-encoding and muxed by ffmpeg
+        with the sound mixdown of the scene, encoded with the audio settings of the scene
+        numWorkers: number of Blender processes, 0 to use the number of CPUs
+        Return True if the render succeeded, False if it could not be done (eg: ffmpeg not found, output is not an
+        ffmpeg video) so that the caller can fall back to a standard render
+    """
+    if "FFMPEG" != scene.render.image_settings.file_format:
+        print("*** Parallel render: the output of the scene is not an ffmpeg video ***")
+        return False
+
+    chunkExtension = _ffmpegFormatExtensions.get(scene.render.ffmpeg.format)
+    if chunkExtension is None:
+        print(f"*** Parallel render: unsupported video container: {scene.render.ffmpeg.format} ***")
+        return False
+
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        print("*** Parallel render: ffmpeg executable not found ***")
+        return False
+
+    numWorkers = numWorkers if 0 < numWorkers else (os.cpu_count() or 1)
+    chunks = getSequencerRenderChunks(scene.frame_start, scene.frame_end, numWorkers)
+    startTime = time.monotonic()
+    print(f"\nParallel render of {scene.name}: {len(chunks)} chunk(s), frames {scene.frame_start} to {scene.frame_end}")
+
+    tempDir = tempfile.mkdtemp(prefix="videotracks_render_")
+    keepTempDir = False
+    try:
+        blendFile = os.path.join(tempDir, "sequence.blend")
+        writeBlendFileForJobs(scene, blendFile)
+
+        # sound is mixed once for the whole range since audio chunks cannot be concatenated without gaps
+        audioFile = None
+        audioArgs = getFfmpegAudioArgs(scene)
+        if audioArgs is not None and any(seq.type == "SOUND" for seq in scene.sequence_editor.sequences_all):
+            audioFile = os.path.join(tempDir, "sound.wav")
+            previousScene = bpy.context.window.scene
+            bpy.context.window.scene = scene
+            bpy.ops.sound.mixdown(filepath=audioFile, check_existing=False, container="WAV", codec="PCM")
+            bpy.context.window.scene = previousScene
+
+        jobs = list()
+        chunkFiles = list()
+        for i, (chunkStart, chunkEnd) in enumerate(chunks):
+            chunkFile = os.path.join(tempDir, f"chunk_{i:04d}{chunkExtension}")
+            chunkFiles.append(chunkFile)
+            script = _workerRenderScript.format(frame_start=chunkStart, frame_end=chunkEnd, filepath=chunkFile)
+            jobs.append({"name": f"Chunk {i} ({chunkStart}-{chunkEnd})", "script": script, "output": chunkFile})
+
+        results = runBlenderJobs(blendFile, jobs, sceneName=scene.name, numWorkers=len(chunks), maxRetries=1)
+        if any("FAILED" == res["status"] for res in results):
+            # the folder is kept since it contains the logs of the failed chunks
+            keepTempDir = True
+            print(f"*** Parallel render: some chunks failed, logs kept in {tempDir} ***")
+            return False
+
+        concatListFile = os.path.join(tempDir, "chunks.txt")
+        with open(concatListFile, "w") as f:
+            for chunkFile in chunkFiles:
+                f.write(f"file '{Path(chunkFile).as_posix()}'\n")
+
+        # each chunk starts with a key frame so the video streams are concatenated as they are
+        args = [ffmpeg, "-y", "-v", "error", "-f", "concat", "-safe", "0", "-i", concatListFile]
+        if audioFile is not None:
+            args += ["-i", audioFile, "-map", "0:v", "-map", "1:a"] + audioArgs + ["-shortest"]
+        args += ["-c:v", "copy", outputFile]
+
+        Path(outputFile).parent.mkdir(parents=True, exist_ok=True)
+        res = subprocess.run(args, capture_output=True)
+        if 0 != res.returncode:
+            print(f"*** Parallel render: concatenation failed ***\n{res.stderr.decode(errors='replace')}")
+            return False
+
+    finally:
+        if not keepTempDir:
+            shutil.rmtree(tempDir, ignore_errors=True)
+
+    print(f"Parallel render done in {time.monotonic() - startTime:.1f}s: {outputFile}")
+    return True
+
+
 class Utils_LaunchRender(Operator):
     bl_idname = "utils.launchrender"
     bl_label = "Render"
@@ -20,7 +20,15 @@ To do: module description here.
 """
 
 import os
+from bisect import bisect_right
+import time
+
+import numpy as np
+
 import bpy
+from bpy.app.handlers import persistent
+
+from videotracks.utils import utils_handlers
 
 
 ###################
@@ -65,40 +73,89 @@ def showSecondsInVSE(showSeconds, workspace=None):
                         space_data.show_seconds = showSeconds
 
 
+###################
+# channels index
+###################
+
+# Per-scene index of the top level sequences of the VSE, grouped by channel.
+# Key is the scene pointer, value is a tupple (number of sequences at build time, {channel: [sequences]})
+_channelsIndexCache = dict()
+
+
+def getChannelsIndex(scene):
+    """ Return a dictionary {channel index: list of the sequences of this channel} for the top level sequences of
+        the VSE of the specified scene
+        The index is built once in a single pass over the sequences and kept until it is invalidated, either
+        by invalidateChannelsIndex() or by the depsgraph and undo handlers registered by this module
+        Do not modify the returned dictionary
+    """
+    if scene.sequence_editor is None:
+        return dict()
+
+    sequences = scene.sequence_editor.sequences
+    key = scene.as_pointer()
+    cachedIndex = _channelsIndexCache.get(key)
+
+    # the number of sequences is checked as a cheap way to catch additions and removals done outside this module
+    if cachedIndex is None or cachedIndex[0] != len(sequences):
+        channelsIndex = dict()
+        for seq in sequences:
+            channelsIndex.setdefault(seq.channel, []).append(seq)
+        cachedIndex = (len(sequences), channelsIndex)
+        _channelsIndexCache[key] = cachedIndex
+
+    return cachedIndex[1]
+
+
+def invalidateChannelsIndex(scene=None):
+    """ Invalidate the channels index of the specified scene, or of all the scenes if scene is None
+        Must be called by any code that adds, removes or moves sequences and then queries the channels
+        before the depsgraph has been updated
+    """
+    if scene is None:
+        _channelsIndexCache.clear()
+    else:
+        _channelsIndexCache.pop(scene.as_pointer(), None)
+
+
+@persistent
+def _invalidateChannelsIndex_depsgraph_handler(scene, depsgraph=None):
+    if depsgraph is None or depsgraph.id_type_updated("SCENE"):
+        invalidateChannelsIndex()
+
+
+@persistent
+def _invalidateChannelsIndex_handler(*args):
+    invalidateChannelsIndex()
+
+
 ###################
 # vse sequences
 ###################
 
 
 def clearChannel(scene, channelIndex):
-    sequencesList = list()
-    for seq in scene.sequence_editor.sequences:
-        if channelIndex == seq.channel:
-            sequencesList.append(seq)
+    sequencesList = list(getChannelsIndex(scene).get(channelIndex, []))
     for seq in sequencesList:
         scene.sequence_editor.sequences.remove(seq)
+    invalidateChannelsIndex(scene)
     bpy.ops.sequencer.refresh_all()
 
 
 def clearAllChannels(scene):
     for seq in scene.sequence_editor.sequences:
         scene.sequence_editor.sequences.remove(seq)
+    invalidateChannelsIndex(scene)
     bpy.ops.sequencer.refresh_all()
 
 
 def getChannelClips(scene, channelIndex):
-    sequencesList = list()
-    for seq in scene.sequence_editor.sequences:
-        if channelIndex == seq.channel:
-            sequencesList.append(seq)
-    return sequencesList
+    return list(getChannelsIndex(scene).get(channelIndex, []))
 
 
 def getNumUsedChannels(scene):
-    numChannels = 0
-    for i, seq in enumerate(scene.sequence_editor.sequences):
-        numChannels = max(seq.channel, numChannels)
-    return numChannels
+    channelsIndex = getChannelsIndex(scene)
+    return max(channelsIndex.keys()) if len(channelsIndex) else 0
 
 
 def changeClipsChannel(scene, sourceChannelIndex, targetChannelIndex):
@@ -112,24 +169,91 @@ def changeClipsChannel(scene, sourceChannelIndex, targetChannelIndex):
         if len(targetSequencesList):
             clearChannel(scene, targetChannelIndex)
 
-        for clip in sourceSequencesList:
-            clip.channel = targetChannelIndex
+        remapChannels(scene, {sourceChannelIndex: targetChannelIndex})
 
     return targetSequencesList
 
 
+def remapChannels(scene, mapping, numChannels=32):
+    """ Move the content of several channels at once
+        mapping is a dictionary {source channel index: target channel index}. The channels that are not in mapping are
+        not modified, so the target channels not also used as sources have to be free
+        The moves are ordered so that a channel is never moved onto a channel that still has to be moved away, and
+        cycles (such as swaps) are broken with a single free channel, so that each clip is moved once in most cases
+        Clips remapped outside of [1, numChannels] are removed
+        Return the number of moved clips
+    """
+    channelsIndex = getChannelsIndex(scene)
+
+    # the index is read once before any clip is moved
+    pendingMoves = dict()
+    channelsClips = dict()
+    for sourceInd, targetInd in mapping.items():
+        if sourceInd != targetInd and len(channelsIndex.get(sourceInd, [])):
+            pendingMoves[sourceInd] = targetInd
+            channelsClips[sourceInd] = list(channelsIndex[sourceInd])
+
+    if not len(pendingMoves):
+        return 0
+
+    def _getFreeChannel():
+        for ch in range(numChannels, 0, -1):
+            if ch not in pendingMoves and ch not in pendingMoves.values() and not len(channelsIndex.get(ch, [])):
+                return ch
+        # same fallback as the previous implementation of swapChannels
+        return 0
+
+    numMovedClips = 0
+    while len(pendingMoves):
+        readyMoves = [src for src, tgt in pendingMoves.items() if tgt not in pendingMoves]
+
+        if not len(readyMoves):
+            # only cycles remain: park one channel on a free channel to break its cycle
+            sourceInd = next(iter(pendingMoves))
+            tempChannelInd = _getFreeChannel()
+            for clip in channelsClips[sourceInd]:
+                clip.channel = tempChannelInd
+            numMovedClips += len(channelsClips[sourceInd])
+            channelsClips[tempChannelInd] = channelsClips.pop(sourceInd)
+            pendingMoves[tempChannelInd] = pendingMoves.pop(sourceInd)
+            continue
+
+        for sourceInd in readyMoves:
+            targetInd = pendingMoves.pop(sourceInd)
+            clips = channelsClips.pop(sourceInd)
+            if not 1 <= targetInd <= numChannels:
+                print(f"VSE Remap Channels: *** Clips in channel {sourceInd} are removed ***")
+                for clip in clips:
+                    scene.sequence_editor.sequences.remove(clip)
+            else:
+                for clip in clips:
+                    clip.channel = targetInd
+                numMovedClips += len(clips)
+
+    invalidateChannelsIndex(scene)
+    return numMovedClips
+
+
 def swapChannels(scene, channelIndexA, channelIndexB):
-    tempChannelInd = 0
-    changeClipsChannel(scene, channelIndexA, tempChannelInd)
-    changeClipsChannel(scene, channelIndexB, channelIndexA)
-    changeClipsChannel(scene, tempChannelInd, channelIndexB)
+    remapChannels(scene, {channelIndexA: channelIndexB, channelIndexB: channelIndexA})
+
+
+def moveChannel(scene, fromIndex, toIndex):
+    """ Move the content of channel fromIndex to channel toIndex and shift the channels in between by one,
+        the same way a collection item is moved
+    """
+    if fromIndex == toIndex:
+        return
+    step = 1 if fromIndex > toIndex else -1
+    mapping = {ch: ch + step for ch in range(toIndex, fromIndex, step)}
+    mapping[fromIndex] = toIndex
+    remapChannels(scene, mapping)
 
 
 def muteChannel(scene, channelIndex, mute):
     if scene.sequence_editor is not None:
-        for i, seq in enumerate(scene.sequence_editor.sequences):
-            if channelIndex == seq.channel:
-                seq.mute = mute
+        for seq in getChannelClips(scene, channelIndex):
+            seq.mute = mute
 
 
 def setChannelAlpha(scene, channelIndex, alpha):
@@ -150,14 +274,12 @@ def setChannelVolume(scene, channelIndex, volume):
 
 def insertChannel(scene, channelIndex):
     numChannels = 32
-    for ch in range(numChannels, channelIndex - 1, -1):
-        channelClips = getChannelClips(scene, ch)
+    channelsIndex = getChannelsIndex(scene)
+    if len(channelsIndex.get(numChannels, [])):
+        print("VSE Insert Channel: *** Clips in channel 32 will be removed ***")
 
-        if 32 == ch and len(channelClips):
-            print("VSE Insert Channel: *** Clips in channel 32 will be removed ***")
-
-        for clip in channelClips:
-            clip.channel = ch + 1
+    mapping = {ch: ch + 1 for ch in channelsIndex.keys() if channelIndex <= ch}
+    remapChannels(scene, mapping, numChannels=numChannels)
 
 
 def duplicateChannel(scene, sourceChannelIndex, targetChannelIndex):
@@ -179,9 +301,11 @@ def duplicateChannel(scene, sourceChannelIndex, targetChannelIndex):
         clip.select = True
     bpy.ops.sequencer.duplicate()
 
-    for c in scene.sequence_editor.sequences:
-        if c.select:
-            c.channel = targetChannelIndex
+    # the duplicates are the only selected clips and are all moved in one pass
+    for c in [c for c in scene.sequence_editor.sequences if c.select]:
+        c.channel = targetChannelIndex
+
+    invalidateChannelsIndex(scene)
 
 
 def removeChannel(scene, channelIndex):
@@ -189,8 +313,294 @@ def removeChannel(scene, channelIndex):
 
     clearChannel(scene, channelIndex)
 
-    for ch in range(channelIndex + 1, numChannels + 1):
-        channelClips = getChannelClips(scene, ch)
+    mapping = {ch: ch - 1 for ch in getChannelsIndex(scene).keys() if channelIndex < ch}
+    remapChannels(scene, mapping, numChannels=numChannels)
+
+
+###################
+# strips animation
+###################
+
+
+def thinKeyframes(frames, values, tolerance):
+    """ Return the indices of the keyframes to keep so that the linear interpolation of the kept keyframes does not
+        differ from any of the removed ones by more than tolerance
+        The keyframes are simplified with the Ramer-Douglas-Peucker algorithm, the distance being measured on the
+        values only: each range is split at its keyframe the farthest from the segment joining its bounds until
+        all the keyframes of the range are within tolerance
+        frames and values are numpy arrays sorted by frame
+    """
+    numKeys = len(frames)
+    if numKeys <= 2 or tolerance <= 0.0:
+        return np.arange(numKeys)
+
+    keep = np.zeros(numKeys, dtype=bool)
+    keep[0] = keep[-1] = True
+    ranges = [(0, numKeys - 1)]
+    while len(ranges):
+        firstInd, lastInd = ranges.pop()
+        if lastInd - firstInd < 2:
+            continue
+
+        innerFrames = frames[firstInd + 1 : lastInd]
+        frameRange = frames[lastInd] - frames[firstInd]
+        ratios = (innerFrames - frames[firstInd]) / frameRange if 0 != frameRange else np.zeros(len(innerFrames))
+        interpolatedValues = values[firstInd] + ratios * (values[lastInd] - values[firstInd])
+        errors = np.abs(values[firstInd + 1 : lastInd] - interpolatedValues)
+        farthestInd = int(np.argmax(errors))
+        if tolerance < errors[farthestInd]:
+            splitInd = firstInd + 1 + farthestInd
+            keep[splitInd] = True
+            ranges.append((firstInd, splitInd))
+            ranges.append((splitInd, lastInd))
+
+    return np.flatnonzero(keep)
+
+
+def setStripVolumeKeyframes(scene, strip, keyframes, tolerance=0.0):
+    """ Animate the volume of the sound strip with the specified list of paired values (Frame, Value)
+        The F-curve of the strip is written directly: all the keyframe points are allocated at once and filled with
+        foreach_set, instead of calling keyframe_insert() for each keyframe. The keyframes use a linear interpolation
+        tolerance: if not 0, the keyframes are reduced to the ones needed for their linear interpolation to stay
+        within this tolerance of the original values, see thinKeyframes()
+        Return the F-curve
+    """
+    if keyframes is None or not len(keyframes):
+        return None
+
+    keyArray = np.array(keyframes, dtype=np.float32).reshape(-1, 2)
+    keyArray = keyArray[np.argsort(keyArray[:, 0], kind="stable")]
+    # a single key per frame, the last one wins as with keyframe_insert()
+    _, lastIndicesReversed = np.unique(keyArray[::-1, 0], return_index=True)
+    keyArray = keyArray[np.sort(len(keyArray) - 1 - lastIndicesReversed)]
+    keyArray = keyArray[thinKeyframes(keyArray[:, 0], keyArray[:, 1], tolerance)]
+
+    if scene.animation_data is None:
+        scene.animation_data_create()
+    if scene.animation_data.action is None:
+        scene.animation_data.action = bpy.data.actions.new(scene.name + "Action")
+    action = scene.animation_data.action
+
+    dataPath = strip.path_from_id("volume")
+    fcurve = action.fcurves.find(dataPath)
+    if fcurve is not None:
+        action.fcurves.remove(fcurve)
+    fcurve = action.fcurves.new(dataPath)
+
+    fcurve.keyframe_points.add(len(keyArray))
+    coords = keyArray.ravel()
+    fcurve.keyframe_points.foreach_set("co", coords)
+    fcurve.keyframe_points.foreach_set("handle_left", coords)
+    fcurve.keyframe_points.foreach_set("handle_right", coords)
+    # the curve played by Blender has to be the linear interpolation that thinKeyframes() keeps within tolerance
+    linearInterpolation = bpy.types.Keyframe.bl_rna.properties["interpolation"].enum_items["LINEAR"].value
+    fcurve.keyframe_points.foreach_set("interpolation", [linearInterpolation] * len(keyArray))
+    # sorts the points and computes the handles
+    fcurve.update()
+
+    strip.volume = float(keyArray[-1, 1])
+    return fcurve
+
+
+###################
+# strips batch creation
+###################
+
 
-        for clip in channelClips:
-            clip.channel = ch - 1
+class StripsBatchBuilder:
+    """ Create a large number of strips in a single pass
+        The strips are first described with addClip(), then build() resolves the overlaps on these descriptions
+        and creates the strips in the timeline order of each channel. Each strip is created and trimmed in an empty
+        staging channel and then moved to its channel, where its final range is free, so that Blender never has to
+        shuffle a strip when it is created or trimmed. Mute state, volume and keyframes are set afterwards.
+        The channels index invalidation and the sequencer refresh are done once at the end
+        Timings of each phase are printed by build()
+    """
+
+    def __init__(self, scene, numChannels=32, volumeKeyframesTolerance=0.0):
+        self.scene = scene
+        self.numChannels = numChannels
+        self.volumeKeyframesTolerance = volumeKeyframesTolerance
+        self.clipSpecs = list()
+        self._collectStartTime = time.perf_counter()
+
+    def addClip(
+        self,
+        mediaPath,
+        channelInd,
+        atFrame,
+        offsetStart=0,
+        offsetEnd=0,
+        finalDuration=-1,
+        maxFinalDuration=-1,
+        clipName="",
+        importVideo=True,
+        importAudio=False,
+        mute=False,
+        volume=None,
+        volumeKeyframes=None,
+    ):
+        """ Describe a strip to create, with the same placement parameters as UAS_Vse_Render.createNewClip()
+            maxFinalDuration: if the created strip is longer then its final duration is reduced to this value
+            volumeKeyframes is a list of paired values (Frame, Value)
+            Overlaps are resolved only for the strips with a known final duration (finalDuration or
+            maxFinalDuration), the others are left to Blender
+        """
+        duration = finalDuration if -1 != finalDuration else maxFinalDuration
+        self.clipSpecs.append(
+            {
+                "media_path": mediaPath,
+                "channel": channelInd,
+                "at_frame": atFrame,
+                "offset_start": offsetStart,
+                "offset_end": offsetEnd,
+                "final_duration": finalDuration,
+                "max_final_duration": maxFinalDuration,
+                "final_start": atFrame + offsetStart,
+                "final_end": atFrame + offsetStart + duration if -1 != duration else None,
+                "clip_name": clipName,
+                "import_video": importVideo,
+                "import_audio": importAudio,
+                "mute": mute,
+                "volume": volume,
+                "volume_keyframes": volumeKeyframes,
+            }
+        )
+
+    def _resolveOverlaps(self):
+        """ Move each strip that would overlap another one to the first channel above where it fits, as Blender
+            does when shuffling, but computed once on the strips descriptions
+        """
+        # per channel: sorted lists of the starts and ends of the occupied ranges, the ranges not overlapping
+        occupied = dict()
+
+        def _isFree(channel, start, end):
+            starts, ends = occupied.setdefault(channel, (list(), list()))
+            ind = bisect_right(starts, start)
+            if 0 < ind and start < ends[ind - 1]:
+                return False
+            return not (ind < len(starts) and starts[ind] < end)
+
+        def _occupy(channel, start, end):
+            starts, ends = occupied.setdefault(channel, (list(), list()))
+            ind = bisect_right(starts, start)
+            starts.insert(ind, start)
+            ends.insert(ind, end)
+
+        if self.scene.sequence_editor is not None:
+            for clip in self.scene.sequence_editor.sequences:
+                _occupy(clip.channel, clip.frame_final_start, clip.frame_final_end)
+
+        for spec in sorted(self.clipSpecs, key=lambda s: (s["channel"], s["final_start"])):
+            if spec["final_end"] is None:
+                continue
+            channel = spec["channel"]
+            while channel < self.numChannels and not _isFree(channel, spec["final_start"], spec["final_end"]):
+                channel += 1
+            if _isFree(channel, spec["final_start"], spec["final_end"]):
+                spec["channel"] = channel
+                _occupy(channel, spec["final_start"], spec["final_end"])
+
+    def _getStagingChannel(self):
+        """ Return the highest channel used neither by the existing strips nor by the described ones, None if there
+            is no such channel
+        """
+        usedChannels = {spec["channel"] for spec in self.clipSpecs}
+        if self.scene.sequence_editor is not None:
+            usedChannels.update(clip.channel for clip in self.scene.sequence_editor.sequences)
+        for channel in range(self.numChannels, 0, -1):
+            if channel not in usedChannels:
+                return channel
+        return None
+
+    def build(self):
+        """ Create the strips described with addClip() and return them, in the order of their description
+        """
+        vse_render = bpy.context.window_manager.UAS_vse_render
+        if self.scene.sequence_editor is None:
+            self.scene.sequence_editor_create()
+
+        phaseTimes = [("collect", time.perf_counter() - self._collectStartTime)]
+
+        startTime = time.perf_counter()
+        self._resolveOverlaps()
+        phaseTimes.append(("overlaps", time.perf_counter() - startTime))
+
+        # created in the timeline order of each channel, the consecutive strips of a channel using the same media
+        # being created one after the other so that the media stays in the cache
+        startTime = time.perf_counter()
+        newClips = [None] * len(self.clipSpecs)
+        specIndices = sorted(
+            range(len(self.clipSpecs)), key=lambda i: (self.clipSpecs[i]["channel"], self.clipSpecs[i]["final_start"])
+        )
+        stagingChannel = self._getStagingChannel()
+        for specInd in specIndices:
+            spec = self.clipSpecs[specInd]
+            # a movie imported with both video and audio creates 2 strips, in 2 channels, so it is created in place
+            useStaging = stagingChannel is not None and not (spec["import_video"] and spec["import_audio"])
+            newClip = vse_render.createNewClip(
+                self.scene,
+                spec["media_path"],
+                stagingChannel if useStaging else spec["channel"],
+                spec["at_frame"],
+                offsetStart=spec["offset_start"],
+                offsetEnd=spec["offset_end"],
+                final_duration=spec["final_duration"],
+                clipName=spec["clip_name"],
+                importVideo=spec["import_video"],
+                importAudio=spec["import_audio"],
+            )
+            if newClip is not None:
+                if -1 != spec["max_final_duration"] and spec["max_final_duration"] < newClip.frame_final_duration:
+                    newClip.frame_final_duration = spec["max_final_duration"]
+                if useStaging:
+                    newClip.channel = spec["channel"]
+            newClips[specInd] = newClip
+        phaseTimes.append(("creation", time.perf_counter() - startTime))
+
+        startTime = time.perf_counter()
+        for spec, newClip in zip(self.clipSpecs, newClips):
+            if newClip is None:
+                continue
+            newClip.mute = spec["mute"]
+            if spec["volume"] is not None and hasattr(newClip, "volume"):
+                newClip.volume = spec["volume"]
+            if spec["volume_keyframes"]:
+                setStripVolumeKeyframes(
+                    self.scene, newClip, spec["volume_keyframes"], tolerance=self.volumeKeyframesTolerance
+                )
+
+        invalidateChannelsIndex(self.scene)
+        try:
+            bpy.ops.sequencer.refresh_all()
+        except RuntimeError:
+            # the operator needs a sequencer context, not available in background mode
+            pass
+        phaseTimes.append(("finalization", time.perf_counter() - startTime))
+
+        timingsStr = ", ".join([f"{name}: {duration:.2f}s" for name, duration in phaseTimes])
+        print(f"   Strips batch: {len([c for c in newClips if c is not None])} strips created - {timingsStr}")
+
+        self.clipSpecs = list()
+        return newClips
+
+
+def register():
+    utils_handlers.removeAllHandlerOccurences(
+        _invalidateChannelsIndex_depsgraph_handler, handlerCateg=bpy.app.handlers.depsgraph_update_post
+    )
+    bpy.app.handlers.depsgraph_update_post.append(_invalidateChannelsIndex_depsgraph_handler)
+
+    for handlerCateg in (bpy.app.handlers.undo_post, bpy.app.handlers.redo_post, bpy.app.handlers.load_post):
+        utils_handlers.removeAllHandlerOccurences(_invalidateChannelsIndex_handler, handlerCateg=handlerCateg)
+        handlerCateg.append(_invalidateChannelsIndex_handler)
+
+
+def unregister():
+    utils_handlers.removeAllHandlerOccurences(
+        _invalidateChannelsIndex_depsgraph_handler, handlerCateg=bpy.app.handlers.depsgraph_update_post
+    )
+    for handlerCateg in (bpy.app.handlers.undo_post, bpy.app.handlers.redo_post, bpy.app.handlers.load_post):
+        utils_handlers.removeAllHandlerOccurences(_invalidateChannelsIndex_handler, handlerCateg=handlerCateg)
+
+    invalidateChannelsIndex()